@@ -0,0 +1,317 @@
+import hashlib
+import http.client
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+from agents.feed_fetcher import HOST_MIN_INTERVAL, USER_AGENT, HostRateLimiter
+from agents.html_cleaner import extract_main_text
+from db.fetch import fetch_articles_without_body
+from db.insertion import save_article_bodies, save_body_fetch_errors
+
+# Body fetch stage: replaces the feed summary in news_articles.content with
+# the text of the linked article page
+BODY_CONCURRENCY = 8       # pages downloaded in parallel
+PER_HOST_CONCURRENCY = 2   # at most this many of them from the same site
+BODY_TIMEOUT = 20          # socket timeout (seconds) for one request
+MAX_BODY_BYTES = 2 * 1024 * 1024
+MAX_REDIRECTS = 5
+REDIRECTS = (301, 302, 303, 307, 308)
+BODY_BATCH = 200           # articles per fetch_pending_bodies run
+BODY_CACHE_DIR = "./body_cache"
+MAX_BODY_ATTEMPTS = 5      # "error" results before an article keeps its summary for good
+BODY_RETRY_BASE = 600      # seconds; the n-th retry waits BODY_RETRY_BASE * 2**(n - 1)
+
+# status: "ok" (text extracted, may be empty), "skipped" (robots.txt, 4xx,
+# not HTML, too large: cached, never retried) or "error" (network/5xx: retried
+# with backoff, up to MAX_BODY_ATTEMPTS times)
+BodyFetch = namedtuple("BodyFetch", ["url", "status", "text"])
+
+_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+
+
+def decode_body(body, headers):
+    """Decompresses (gzip/deflate) and decodes a response body to str."""
+    encoding = headers.get("content-encoding", "").lower()
+    if encoding in ("gzip", "x-gzip", "deflate"):
+        wbits = 16 + zlib.MAX_WBITS if "gzip" in encoding else zlib.MAX_WBITS
+        try:
+            body = zlib.decompressobj(wbits).decompress(body, MAX_BODY_BYTES)
+        except zlib.error:
+            body = zlib.decompressobj(-zlib.MAX_WBITS).decompress(body, MAX_BODY_BYTES)  # raw deflate
+
+    charset = None
+    match = re.search(r"charset=([\w-]+)", headers.get("content-type", ""), re.I)
+    if match:
+        charset = match.group(1)
+    else:
+        match = _CHARSET.search(body[:4096])
+        if match:
+            charset = match.group(1).decode("ascii")
+    try:
+        return body.decode(charset or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+class KeepAliveSession:
+    """
+    Minimal HTTP/1.1 client over http.client: each thread keeps one
+    persistent connection per (scheme, host) and asks for gzip. A request on
+    a reused connection the server already closed is retried once on a
+    fresh one. `request` is a single round trip; `get` also follows redirects.
+    """
+
+    def __init__(self, timeout=BODY_TIMEOUT, max_bytes=MAX_BODY_BYTES):
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._opened = []
+        self._lock = threading.Lock()
+
+    def _connection(self, scheme, netloc, fresh=False):
+        connections = self._local.__dict__.setdefault("connections", {})
+        conn = connections.get((scheme, netloc))
+        if conn is None or fresh:
+            if conn is not None:
+                conn.close()
+            cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = cls(netloc, timeout=self.timeout)
+            connections[(scheme, netloc)] = conn
+            with self._lock:
+                self._opened.append(conn)
+        return conn
+
+    def request(self, url):
+        """(status, headers, raw body) of one GET, redirects not followed."""
+        parts = urlsplit(url)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        headers = {
+            "User-Agent": USER_AGENT,
+            "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5",
+            "Accept-Encoding": "gzip, deflate",
+        }
+        for attempt in range(2):
+            conn = self._connection(parts.scheme, parts.netloc, fresh=attempt > 0)
+            reused = conn.sock is not None
+            try:
+                conn.request("GET", path, headers=headers)
+                resp = conn.getresponse()
+                body = resp.read(self.max_bytes + 1)
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()
+                if reused and attempt == 0:
+                    continue  # stale keep-alive connection
+                raise
+            except Exception:
+                conn.close()
+                raise
+            if not resp.isclosed() or resp.will_close:
+                conn.close()  # body over max_bytes left unread, or server closes anyway
+            return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+
+    def get(self, url):
+        """(status, headers, raw body, final url), following up to MAX_REDIRECTS redirects."""
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers, body = self.request(url)
+            if status in REDIRECTS and headers.get("location"):
+                url = urljoin(url, headers["location"])
+                continue
+            return status, headers, body, url
+        raise http.client.HTTPException(f"Too many redirects for {url}")
+
+    def close(self):
+        with self._lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened = []
+
+
+class RobotsCache:
+    """robots.txt of each site, fetched once through the session and rate limiter."""
+
+    def __init__(self, session, rate_limiter):
+        self.session = session
+        self.rate_limiter = rate_limiter
+        self._parsers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _parser(self, root):
+        with self._lock:
+            lock = self._locks.setdefault(root, threading.Lock())
+        with lock:
+            if root not in self._parsers:
+                parser = RobotFileParser(f"{root}/robots.txt")
+                try:
+                    self.rate_limiter.wait(root)
+                    status, headers, body, _ = self.session.get(f"{root}/robots.txt")
+                except (OSError, http.client.HTTPException):
+                    status = None
+                if status == 200:
+                    parser.parse(decode_body(body, headers).splitlines())
+                elif status in (401, 403):
+                    parser.disallow_all = True
+                else:
+                    parser.allow_all = True  # no robots.txt (or unreachable): everything allowed
+                self._parsers[root] = parser
+            return self._parsers[root]
+
+    def check(self, url):
+        """(allowed, crawl delay in seconds or None) for our user agent."""
+        parts = urlsplit(url)
+        parser = self._parser(f"{parts.scheme}://{parts.netloc}")
+        delay = parser.crawl_delay(USER_AGENT)
+        return parser.can_fetch(USER_AGENT, url), float(delay) if delay else None
+
+
+class BodyCache:
+    """
+    URL-keyed on-disk cache of fetch outcomes (one small JSON file per url,
+    sharded by hash prefix), so no page is downloaded twice, across runs.
+    Transient errors are not cached.
+    """
+
+    def __init__(self, cache_dir=BODY_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, url):
+        try:
+            with open(self._path(url), "r", encoding="utf-8") as f:
+                record = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return BodyFetch(url, record["status"], record["text"])
+
+    def put(self, result):
+        path = self._path(result.url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"url": result.url, "status": result.status, "text": result.text,
+                       "fetched_at": time.time()}, f)
+        os.replace(tmp_path, path)
+
+
+class BodyFetcher:
+    """
+    Downloads article pages on a bounded thread pool over keep-alive
+    connections, honoring robots.txt (including Crawl-delay), spacing
+    requests per host, and capping concurrent requests per host. Redirects
+    are followed hop by hop, so a page moved to another site goes through
+    that site's robots.txt, rate limit and host slots too.
+    """
+
+    def __init__(self, max_concurrency=BODY_CONCURRENCY, per_host=PER_HOST_CONCURRENCY,
+                 host_min_interval=HOST_MIN_INTERVAL, cache_dir=BODY_CACHE_DIR, timeout=BODY_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.per_host = per_host
+        self.session = KeepAliveSession(timeout)
+        self.rate_limiter = HostRateLimiter(host_min_interval)
+        self.robots = RobotsCache(self.session, self.rate_limiter)
+        self.cache = BodyCache(cache_dir)
+        self._host_slots = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            return self._host_slots.setdefault(host, threading.BoundedSemaphore(self.per_host))
+
+    def _download(self, url):
+        location = url
+        for _ in range(MAX_REDIRECTS + 1):
+            allowed, crawl_delay = self.robots.check(location)
+            if not allowed:
+                return BodyFetch(url, "skipped", "")
+
+            with self._slot(location):
+                self.rate_limiter.wait(location, crawl_delay)
+                try:
+                    status, headers, body = self.session.request(location)
+                except (OSError, http.client.HTTPException) as e:
+                    print(f"⚠️ Failed to fetch {location}: {e}")
+                    return BodyFetch(url, "error", "")
+
+            if status not in REDIRECTS or not headers.get("location"):
+                break
+            location = urljoin(location, headers["location"])
+        else:
+            return BodyFetch(url, "skipped", "")  # redirect loop
+
+        if status == 429 or status >= 500:
+            return BodyFetch(url, "error", "")
+        if status != 200 or len(body) > MAX_BODY_BYTES or "html" not in headers.get("content-type", "html"):
+            return BodyFetch(url, "skipped", "")
+        return BodyFetch(url, "ok", extract_main_text(decode_body(body, headers)))
+
+    def fetch(self, url):
+        cached = self.cache.get(url)
+        if cached is not None:
+            return cached
+        result = self._download(url)
+        if result.status != "error":
+            self.cache.put(result)
+        return result
+
+    def fetch_many(self, urls):
+        """{url: BodyFetch} for every url, fetched concurrently."""
+        urls = list(dict.fromkeys(urls))
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+                return dict(zip(urls, pool.map(self.fetch, urls)))
+        finally:
+            self.session.close()
+
+
+def fetch_pending_bodies(limit=BODY_BATCH, fetcher=None):
+    """
+    Pipeline stage: fetches the pages of articles still holding only their
+    feed summary and stores the extracted body as their content (when it is
+    longer than the summary). Changed articles are re-embedded in the vector
+    DB. Articles that hit a transient error are retried with exponential
+    backoff, and keep their summary after MAX_BODY_ATTEMPTS failures.
+    """
+    rows = fetch_articles_without_body(limit)
+    if not rows:
+        print("No articles waiting for their body.")
+        return 0
+
+    fetcher = fetcher or BodyFetcher()
+    results = fetcher.fetch_many(url for _, _, url, _ in rows)
+
+    updates, errors = [], []
+    for article_id, published_at, url, content in rows:
+        result = results[url]
+        if result.status == "error":
+            errors.append((article_id, published_at))
+            continue
+        body = result.text if result.status == "ok" and len(result.text) > len(content or "") else None
+        updates.append((article_id, published_at, body))
+    save_article_bodies(updates)
+    save_body_fetch_errors(errors, MAX_BODY_ATTEMPTS, BODY_RETRY_BASE)
+
+    changed = [article_id for article_id, _, body in updates if body is not None]
+    if changed:
+        from db.vector_db import reindex_in_vector_db  # loads FAISS and the embedder
+        reindex_in_vector_db(changed)
+
+    fetched = len(changed)
+    print(f"📰 Fetched {fetched} article bodies ({len(updates) - fetched} kept their summary, "
+          f"{len(rows) - len(updates)} to retry)")
+    return fetched
+
+
+if __name__ == "__main__":
+    fetch_pending_bodies()
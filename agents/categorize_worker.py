@@ -0,0 +1,65 @@
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from agents.categorizer import BATCH_CONCURRENCY, BATCH_SIZE, categorize_claimed
+from agents.fast_classifier import fast_classifier
+from db.categorize_queue import (LEASE_SECONDS, categorize_queue_stats, claim_categorize_jobs,
+                                 open_categorize_jobs, worker_name)
+
+# Queue consumers for categorize_jobs (db/categorize_queue.py). Each worker
+# thread claims a batch, categorizes it with categorize_batch and acknowledges
+# it; start more threads, processes or machines to scale out.
+#   python -m agents.categorize_worker [threads] [--follow]
+WORKER_THREADS = int(os.getenv("categorize_workers", 4))
+CLAIM_BATCH = BATCH_SIZE * BATCH_CONCURRENCY  # one claim fills one categorize_batch call
+IDLE_SECONDS = 5                              # --follow: wait between polls of an empty queue
+
+
+def work(stop, batch=CLAIM_BATCH, follow=False, lease_seconds=LEASE_SECONDS):
+    """
+    One worker loop: claim, categorize, acknowledge. Returns the number of
+    articles categorized. Stops when the queue is empty, unless `follow`.
+    """
+    worker = worker_name()
+    categorized = 0
+    while not stop.is_set():
+        jobs = claim_categorize_jobs(worker, batch, lease_seconds)
+        if not jobs:
+            if not follow:
+                break
+            stop.wait(IDLE_SECONDS)
+            continue
+
+        articles = open_categorize_jobs(jobs)
+        if not articles:
+            continue
+        try:
+            results = categorize_claimed(worker, articles)
+        except Exception as e:
+            print(f"⚠️ Worker {worker} failed a batch of {len(articles)}: {e}")
+            continue
+        categorized += len(results)
+    return categorized
+
+
+def run_workers(threads=WORKER_THREADS, batch=CLAIM_BATCH, follow=False):
+    """Drains the queue with `threads` parallel workers; returns the number of articles categorized."""
+    print(f"🧵 Starting {threads} categorize workers, queue: {categorize_queue_stats()}")
+    stop = threading.Event()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(work, stop, batch, follow) for _ in range(threads)]
+        try:
+            categorized = sum(future.result() for future in futures)
+        except KeyboardInterrupt:
+            stop.set()
+            categorized = sum(future.result() for future in futures)
+    print(f"✅ Workers categorized {categorized} articles "
+          f"({fast_classifier.escalation_rate():.1%} escalated to the LLM), queue: {categorize_queue_stats()}")
+    return categorized
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    run_workers(int(args[0]) if args else WORKER_THREADS, follow="--follow" in sys.argv)
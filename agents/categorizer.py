@@ -73,9 +73,18 @@
 from langchain_core.prompts import ChatPromptTemplate
 import json
 import re
-from db.insertion import save_category
+from db.insertion import save_category, save_categories_bulk
+from db.categorize_queue import claim_categorize_jobs, fail_categorize_jobs, open_categorize_jobs, worker_name
+from agents.fast_classifier import fast_classifier, article_text
 from llm_node import llm
 
+CATEGORIES = ["Finance", "Economy", "Seasonal", "Sports", "Politics", "Global", "Other"]
+
+# Batch mode: several articles per LLM call, several calls in flight
+BATCH_SIZE = 10          # articles packed into one prompt
+BATCH_CONCURRENCY = 4    # prompts sent to the LLM in parallel
+MAX_BODY_CHARS = 1500    # per-article body budget inside a packed prompt
+
 
 def json_formatter(llm_response: str):
     """
@@ -106,6 +115,19 @@ def categorize_node(state):
 
     title = state.get("title", "No Title")
     content = state.get("content", "dummyyyyyyyyyyy")
+    published_at = state.get("published_at")
+
+    # Obvious cases are answered by the local embedding classifier, no LLM call
+    fast = fast_classifier.classify(title, content)
+    if fast:
+        category, confidence = fast
+        save_category(article_id, category, confidence, source="fast", published_at=published_at)
+        print(f"⚡ Fast-path category '{category}' (confidence: {confidence:.2f}) for article {article_id}")
+        state["category"] = category
+        state["confidence"] = confidence
+        state["category_source"] = "fast"
+        state["step"] = "categorize"
+        return state
 
     prompt_template = """
     You are a financial news classifier.
@@ -135,15 +157,144 @@ def categorize_node(state):
     confidence = float(result.get("confidence", 0.0))
 
     # Save category in the database
-    save_category(article_id, category, confidence)
+    save_category(article_id, category, confidence, published_at=published_at)
     print(f"✅ Saved category '{category}' (confidence: {confidence}) for article {article_id}")
 
+    state["category"] = category
+    state["confidence"] = confidence
+    state["category_source"] = "llm"
     state["step"] = "categorize"
     print("-----------------------------------------")
     print(state)
     return state
 
 
+BATCH_PROMPT_TEMPLATE = """
+You are a financial news classifier.
+Task: For EACH article below, return the most relevant category.
+
+Categories: {categories}
+
+Respond ONLY with a JSON array, one object per article, in this format:
+[
+  {{"article_id": <id>, "category": "<one of the categories>", "confidence": <0.0 - 1.0>}}
+]
+
+Articles:
+{articles}
+"""
+
+
+def build_batch_prompt(articles):
+    blocks = []
+    for article_id, title, content, *_ in articles:
+        body = (content or "")[:MAX_BODY_CHARS]
+        blocks.append(f"[article_id={article_id}]\nTitle: {title}\nBody: {body}")
+    return BATCH_PROMPT_TEMPLATE.format(categories=", ".join(CATEGORIES), articles="\n\n".join(blocks))
+
+
+def parse_batch_response(llm_response, article_ids):
+    """
+    Extracts the JSON array from a batch response.
+    Returns {article_id: (category, confidence)} for the requested articles
+    the response covers; unknown categories become "Other". Articles it
+    leaves out (or a malformed response) are not in the result, so they stay
+    uncategorized and are retried.
+    """
+    parsed = {}
+    match = re.search(r"\[.*\]", llm_response, re.DOTALL)
+    if match:
+        try:
+            for item in json.loads(match.group()):
+                try:
+                    category = item.get("category", "Other")
+                    if category not in CATEGORIES:
+                        category = "Other"
+                    parsed[int(item["article_id"])] = (category, float(item.get("confidence", 0.0)))
+                except (KeyError, TypeError, ValueError, AttributeError):
+                    continue
+        except json.JSONDecodeError:
+            print("⚠️ Failed to parse batch JSON.")
+    else:
+        print("⚠️ No JSON array found in LLM response.")
+
+    return {article_id: parsed[article_id] for article_id in article_ids if article_id in parsed}
+
+
+def categorize_batch(articles, batch_size=BATCH_SIZE, max_concurrency=BATCH_CONCURRENCY, model=None):
+    """
+    Categorizes many articles with few LLM calls and one DB write.
+    articles: list of (article_id, title, content, published_at)
+    Articles are packed `batch_size` per prompt and up to `max_concurrency`
+    prompts run at once. Articles of a prompt that errors, or that its
+    response leaves out, are not saved (still uncategorized) so they are
+    retried on the next run.
+    Returns {article_id: (category, confidence)}.
+    """
+    model = model or llm
+
+    # Confident cases are resolved locally, only the rest go to the LLM
+    results = {}
+    fast_ids = set()
+    escalated = []
+    fast = fast_classifier.classify_many([article_text(title, content) for _, title, content, _ in articles])
+    for article, prediction in zip(articles, fast):
+        if prediction:
+            results[article[0]] = prediction
+            fast_ids.add(article[0])
+        else:
+            escalated.append(article)
+
+    chunks = [escalated[i:i + batch_size] for i in range(0, len(escalated), batch_size)]
+
+    prompts = [build_batch_prompt(chunk) for chunk in chunks]
+    responses = model.batch(prompts, config={"max_concurrency": max_concurrency}, return_exceptions=True) if prompts else []
+
+    for chunk, response in zip(chunks, responses):
+        if isinstance(response, Exception):
+            print(f"⚠️ Batch of {len(chunk)} articles failed: {response}")
+            continue
+        results.update(parse_batch_response(response.content, [a[0] for a in chunk]))
+
+    published_at = {article[0]: article[3] for article in articles}
+    save_categories_bulk((article_id, category, confidence, "fast" if article_id in fast_ids else "llm",
+                          published_at[article_id])
+                         for article_id, (category, confidence) in results.items())
+    print(f"✅ Categorized {len(results)}/{len(articles)} articles "
+          f"({len(fast_ids)} fast-path, {len(chunks)} LLM calls)")
+    return results
+
+
+def categorize_claimed(worker, articles, **kwargs):
+    """
+    categorize_batch for articles whose categorize jobs `worker` has claimed
+    (db/categorize_queue.py): saved results remove their jobs, the articles
+    left uncategorized are released for a retry with backoff. Reports the
+    fast-path escalation rate so far, i.e. the share of articles the local
+    classifier handed to the LLM.
+    """
+    try:
+        results = categorize_batch(articles, **kwargs)
+    except Exception as e:
+        fail_categorize_jobs(worker, [article_id for article_id, *_ in articles], e)
+        raise
+    fail_categorize_jobs(worker, [article_id for article_id, *_ in articles if article_id not in results],
+                         "not categorized: LLM call failed, or its response was malformed or left the article out")
+    print(f"📈 Fast-path escalation rate: {fast_classifier.escalation_rate():.1%} of articles sent to the LLM")
+    return results
+
+
+def categorize_pending(limit=500, **kwargs):
+    """
+    Categorizes up to `limit` queued articles in one go. Jobs are claimed
+    like agents/categorize_worker.py does, so this can run next to the
+    workers without categorizing the same articles twice.
+    """
+    worker = worker_name()
+    articles = open_categorize_jobs(claim_categorize_jobs(worker, limit))
+    return categorize_claimed(worker, articles, **kwargs) if articles else {}
+
+
 # Optional standalone test
 if __name__ == "__main__":
     from langgraph.graph import MessagesState
@@ -0,0 +1,37 @@
+import json
+import re
+from llm_node import llm
+
+
+def extract_events(state):
+    """
+    LangGraph node: extract market-relevant events from the article
+    (event extraction prompt in prompts/prompt.yaml).
+    """
+    print("🧩 Extracting events...")
+    title = state.get("title", "")
+    content = state.get("content", "")
+
+    prompt = f"""
+    Extract market-relevant events and implied actors from the article. Output a JSON array, each item:
+    - event_summary: short summary
+    - affected_industries: list (e.g., "umbrella manufacturers", "banking", "steel")
+    - implied_signal: "positive"|"negative"|"neutral"
+    - confidence: 0.0-1.0
+
+    Article title: {title}
+    Article text: {content}
+    """
+
+    response = llm.invoke(prompt)
+    events = []
+    match = re.search(r"\[.*\]", response.content, re.DOTALL)
+    if match:
+        try:
+            events = json.loads(match.group())
+        except json.JSONDecodeError:
+            print("⚠️ Failed to parse events JSON.")
+
+    state["events"] = events
+    state["step"] = "extract_events"
+    return state
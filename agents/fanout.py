@@ -0,0 +1,59 @@
+from langgraph.types import Send
+from db.vector_db import retrieve_articles
+from db.fetch import fetch_articles_by_ids
+from db.categorize_queue import claim_categorize_jobs, open_categorize_jobs, worker_name
+from agents.categorizer import categorize_node
+from agents.summarizer import summarize_article
+from agents.extractor import extract_events
+
+
+def fetch_candidates(state):
+    """
+    Map/reduce entry node: collects every candidate article instead of just
+    the best hit. With a query, all top_k retrieval results are kept (in rank
+    order); without one, up to top_k queued articles are claimed from the
+    categorize job queue, so articles leased by categorize workers are
+    skipped (an article whose branch fails is retried once its lease expires).
+    """
+    query = state.get("query", "")
+    top_k = state.get("top_k", 5)
+
+    if query:
+        print(f"🔎 Fetching top {top_k} articles for query: {query}")
+        # One round trip for all hits, rank order preserved
+        hits = retrieve_articles(query, top_k=top_k)
+        candidates = [(article_id, title, content, published_at)
+                      for article_id, title, content, _, published_at
+                      in fetch_articles_by_ids([a for a, _ in hits], [p for _, p in hits])]
+    else:
+        print(f"📥 Claiming up to {top_k} uncategorized articles")
+        candidates = open_categorize_jobs(claim_categorize_jobs(worker_name(), limit=top_k))
+
+    if not candidates:
+        raise ValueError("No candidate articles found.")
+    return {"candidates": candidates, "step": "fetch_candidates"}
+
+
+def fan_out(state):
+    """Conditional edge: one process_article branch per candidate."""
+    return [
+        Send("process_article", {"rank": rank, "article_id": article_id, "title": title, "content": content,
+                                 "published_at": published_at})
+        for rank, (article_id, title, content, published_at) in enumerate(state["candidates"])
+    ]
+
+
+def process_article(article):
+    """Worker branch: categorize, summarize and extract events for one article."""
+    article = dict(article)
+    article = categorize_node(article)
+    article = summarize_article(article)
+    article = extract_events(article)
+    return {"results": [article]}
+
+
+def reduce_results(state):
+    """Reduce node: gathers the per-article branches back into rank order."""
+    articles = sorted(state.get("results", []), key=lambda a: a["rank"])
+    print(f"✅ Processed {len(articles)} articles in parallel")
+    return {"articles": articles, "step": "reduce"}
@@ -0,0 +1,134 @@
+import os
+import threading
+
+import numpy as np
+
+from db.fetch import fetch_labeled_articles
+from embedding_node import embedder
+
+CENTROIDS_PATH = "./vector_store/category_centroids.npz"
+FAST_PATH_THRESHOLD = float(os.getenv("fast_path_threshold", 0.85))  # min probability to skip the LLM
+TEMPERATURE = 0.05         # softmax temperature over cosine similarities
+MIN_LABEL_CONFIDENCE = 0.7 # only learn from confident LLM labels
+MIN_SAMPLES = 5            # categories with fewer labeled articles are left to the LLM
+
+
+def article_text(title, content):
+    # Same text as the vector index, so the embedding cache is shared
+    return f"{title}\n\n{content}"
+
+
+class FastPathClassifier:
+    """
+    Nearest-centroid classifier over MiniLM embeddings, trained on the
+    categories the LLM has already assigned (never on its own predictions).
+    Confident predictions are answered locally; anything under `threshold`
+    is escalated to the LLM.
+    """
+
+    def __init__(self, path=CENTROIDS_PATH, threshold=FAST_PATH_THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.labels = None
+        self.centroids = None
+        self.stats = {"fast": 0, "escalated": 0}
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def _load(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if os.path.exists(self.path):
+                        data = np.load(self.path)
+                        self.labels = [str(l) for l in data["labels"]]
+                        self.centroids = data["centroids"]
+                    self._loaded = True
+
+    def fit(self, vectors, labels):
+        vectors = np.array(vectors, dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        labels = np.asarray(labels)
+
+        names, counts = np.unique(labels, return_counts=True)
+        names = [n for n, c in zip(names, counts) if c >= MIN_SAMPLES]
+        centroids = np.stack([vectors[labels == n].mean(axis=0) for n in names]) if names else None
+        if centroids is not None:
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+
+        with self._lock:
+            self.labels, self.centroids, self._loaded = list(names), centroids, True
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        np.savez(self.path, labels=np.array(self.labels), centroids=self.centroids)
+
+    def predict_proba(self, vectors):
+        """(n, n_labels) softmax probabilities over cosine similarity to each centroid."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors = vectors / (np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12)
+        logits = vectors @ self.centroids.T / TEMPERATURE
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def classify_many(self, texts):
+        """
+        Returns one (category, confidence) per text, or None where the
+        prediction is not confident enough and the LLM should decide.
+        """
+        self._load()
+        if self.centroids is None or len(self.labels) < 2 or not texts:
+            self._count(0, len(texts))
+            return [None] * len(texts)
+
+        probs = self.predict_proba(embedder.embed_array(texts))
+        best = probs.argmax(axis=1)
+        results = []
+        for row, idx in enumerate(best):
+            confidence = float(probs[row, idx])
+            if confidence >= self.threshold:
+                results.append((self.labels[idx], confidence))
+            else:
+                results.append(None)
+
+        fast = sum(r is not None for r in results)
+        self._count(fast, len(results) - fast)
+        return results
+
+    def _count(self, fast, escalated):
+        # classify_many runs on the categorize worker threads
+        with self._lock:
+            self.stats["fast"] += fast
+            self.stats["escalated"] += escalated
+
+    def classify(self, title, content):
+        return self.classify_many([article_text(title, content)])[0]
+
+    def escalation_rate(self):
+        with self._lock:
+            fast, escalated = self.stats["fast"], self.stats["escalated"]
+        total = fast + escalated
+        return escalated / total if total else 0.0
+
+
+fast_classifier = FastPathClassifier()
+
+
+def train_fast_classifier():
+    """Refits the centroids from the LLM-assigned categories stored in news_articles."""
+    rows = fetch_labeled_articles(min_confidence=MIN_LABEL_CONFIDENCE)
+    if not rows:
+        print("No labeled articles to train on yet.")
+        return
+    vectors = embedder.embed_array([article_text(title, content) for title, content, _ in rows])
+    fast_classifier.fit(vectors, [category for _, _, category in rows])
+    if fast_classifier.centroids is None:
+        print(f"Not enough labeled articles per category (need {MIN_SAMPLES}).")
+        return
+    fast_classifier.save()
+    print(f"✅ Trained fast-path classifier on {len(rows)} articles: {fast_classifier.labels}")
+
+
+if __name__ == "__main__":
+    train_fast_classifier()
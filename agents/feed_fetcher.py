@@ -0,0 +1,188 @@
+import hashlib
+import heapq
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.error import HTTPError
+from urllib.parse import urlparse
+from urllib.request import Request, urlopen
+
+import feedparser
+
+# Fetch stage tuning
+MAX_CONCURRENCY = 8        # feeds downloaded in parallel
+FEED_TIMEOUT = 20          # seconds allowed for one feed download
+HOST_MIN_INTERVAL = 1.0    # seconds between two requests to the same host
+USER_AGENT = "news-trust-agent/0.1 (+rss ingestion)"
+CHUNK_SIZE = 64 * 1024
+SEEN_ENTRIES_MAX = 1000    # entry keys remembered per feed, well above any feed's length
+
+# status: "updated", "unchanged" (same body / nothing new) or "not_modified" (HTTP 304)
+# validators: state to persist once the entries have been stored
+FeedFetch = namedtuple("FeedFetch", ["entries", "status", "validators"])
+
+
+class HostRateLimiter:
+    """
+    Spaces out requests to the same host by at least `min_interval` seconds.
+    reserve() books the host's next free slot and returns how long to wait
+    for it, so a scheduler can start the request later instead of parking a
+    worker thread; wait() is the blocking form.
+    """
+
+    def __init__(self, min_interval=HOST_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def reserve(self, url, min_interval=None):
+        """
+        Seconds until the reserved slot for `url`'s host. `min_interval`
+        overrides the default for this host, e.g. a robots.txt Crawl-delay.
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + max(self.min_interval, min_interval or 0)
+        return slot - now
+
+    def wait(self, url, min_interval=None):
+        delay = self.reserve(url, min_interval)
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _read_with_deadline(resp, deadline):
+    chunks = []
+    while True:
+        if time.monotonic() > deadline:
+            raise TimeoutError("feed download exceeded its deadline")
+        chunk = resp.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def entry_key(entry):
+    """Stable identity of a feed entry: its guid, falling back to the link."""
+    return entry.get("id") or entry.get("link")
+
+
+def _new_entries(entries, state):
+    """
+    Entries whose key is not among the feed's seen keys, in feed order. Works
+    whatever order the feed lists its entries in (oldest first, reshuffled...).
+    """
+    seen = set(state.get("seen_entry_ids") or ())
+    return [entry for entry in entries if entry_key(entry) not in seen]
+
+
+def _seen_entry_ids(entries, state):
+    """Keys of the current entries plus the most recent previously seen ones, at most SEEN_ENTRIES_MAX."""
+    keys = [key for key in map(entry_key, entries) if key]
+    current = set(keys)
+    keys += [key for key in state.get("seen_entry_ids") or () if key not in current]
+    return list(dict.fromkeys(keys))[:SEEN_ENTRIES_MAX]
+
+
+def fetch_feed(url, timeout=FEED_TIMEOUT, rate_limiter=None, state=None):
+    """
+    Downloads one feed and parses it with feedparser.
+    `timeout` bounds the whole download, not just each socket read.
+    With a previous `state` (see FeedStateStore) the request is conditional,
+    and parsing is skipped on a 304 or when the body is byte-identical;
+    only entries not seen on an earlier poll are returned.
+    """
+    state = state or {}
+    if rate_limiter is not None:
+        rate_limiter.wait(url)
+
+    request_headers = {"User-Agent": USER_AGENT}
+    if state.get("etag"):
+        request_headers["If-None-Match"] = state["etag"]
+    if state.get("last_modified"):
+        request_headers["If-Modified-Since"] = state["last_modified"]
+
+    deadline = time.monotonic() + timeout
+    try:
+        with urlopen(Request(url, headers=request_headers), timeout=timeout) as resp:
+            body = _read_with_deadline(resp, deadline)
+            headers = {k.lower(): v for k, v in resp.headers.items()}
+    except HTTPError as e:
+        if e.code == 304:
+            return FeedFetch([], "not_modified", {})
+        raise
+
+    validators = {
+        "etag": headers.get("etag"),
+        "last_modified": headers.get("last-modified"),
+        "body_hash": hashlib.sha1(body).hexdigest(),
+    }
+    if validators["body_hash"] == state.get("body_hash"):
+        return FeedFetch([], "unchanged", validators)
+
+    headers["content-location"] = url
+    feed = feedparser.parse(body, response_headers=headers)
+    entries = _new_entries(feed.entries, state)
+    if feed.entries:
+        validators["seen_entry_ids"] = _seen_entry_ids(feed.entries, state)
+    return FeedFetch(entries, "updated" if entries else "unchanged", validators)
+
+
+def iter_feed_entries(feeds, max_concurrency=MAX_CONCURRENCY, timeout=FEED_TIMEOUT,
+                      host_min_interval=HOST_MIN_INTERVAL, state_store=None):
+    """
+    Fetches every feed in `feeds` ({source: [url, ...]}) on a bounded thread
+    pool and yields (source, url, entries) as soon as each feed is parsed,
+    so the caller can start inserting while slower feeds are still downloading.
+    Feeds that fail or time out are reported and skipped.
+
+    Per-host spacing is planned up front: each feed is submitted to the pool
+    only once its host slot is due, so no worker sleeps on the rate limit
+    while feeds of other hosts are waiting.
+
+    With a `state_store`, only new entries are yielded, unchanged feeds are
+    skipped, and a feed's state is saved after the caller has consumed its
+    entries, so a crash mid-insert re-fetches them on the next run.
+    """
+    rate_limiter = HostRateLimiter(host_min_interval)
+    start = time.monotonic()
+    schedule = [(start + rate_limiter.reserve(url), i, source, url)
+                for i, (source, url) in enumerate((source, url) for source, urls in feeds.items() for url in urls)]
+    heapq.heapify(schedule)
+
+    def fetch(url):
+        state = state_store.get(url) if state_store is not None else None
+        return fetch_feed(url, timeout, state=state)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+        futures = {}
+        while schedule or futures:
+            while schedule and schedule[0][0] <= time.monotonic():
+                _, _, source, url = heapq.heappop(schedule)
+                futures[pool.submit(fetch, url)] = (source, url)
+
+            until_due = max(0.0, schedule[0][0] - time.monotonic()) if schedule else None
+            if not futures:
+                time.sleep(until_due)
+                continue
+            done, _ = wait(futures, timeout=until_due, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source, url = futures.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"⚠️ Failed to fetch {url}: {e}")
+                    continue
+
+                if result.entries:
+                    yield source, url, result.entries
+                else:
+                    print(f"⏭️ No new entries in {url} ({result.status})")
+
+                if state_store is not None and result.validators:
+                    state_store.update(url, **result.validators)
@@ -0,0 +1,208 @@
+import calendar
+import heapq
+import itertools
+import os
+import random
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime
+
+from agents.body_fetcher import fetch_pending_bodies
+from agents.feed_fetcher import FEED_TIMEOUT, HOST_MIN_INTERVAL, HostRateLimiter, fetch_feed
+from agents.feed_state import FeedStateStore
+from agents.rss_feed import RSS_FEED, store_feed_entries
+from db.partitions import ensure_partitions, maintain_partitions
+
+# Long-running ingestion: every feed is polled at its own cadence, learned from
+# how often it publishes. Poll interval = TARGET_NEW_PER_POLL / publish rate,
+# where the rate is an EWMA of new entries per second seen at each poll, so a
+# feed is polled about once per new entry. Polls that find nothing feed a zero
+# into the average, so quiet feeds back off geometrically; errors back off
+# exponentially on top of that.
+SCHEDULER_WORKERS = 4        # feeds polled at the same time
+MIN_POLL_INTERVAL = int(os.getenv("feed_min_poll_seconds", 60))
+MAX_POLL_INTERVAL = int(os.getenv("feed_max_poll_seconds", 3600))
+DEFAULT_POLL_INTERVAL = 300  # until a feed's rate is known
+TARGET_NEW_PER_POLL = 1.0
+RATE_SMOOTHING = 0.3         # EWMA weight of the latest observation
+MAX_ERROR_BACKOFF = 6 * 3600
+POLL_JITTER = 0.1            # +/- fraction, keeps feeds of one host from polling in lockstep
+MAINTENANCE_INTERVAL = 3600  # partition upkeep (db/partitions.py)
+BODY_FETCH_INTERVAL = 600    # full-article body stage (agents/body_fetcher.py)
+WAKEUP_SECONDS = 1.0         # longest the loop sleeps before rechecking for shutdown
+
+
+def _timestamp_rate(entries):
+    """Entries per second implied by the published dates of a feed page, or None."""
+    times = sorted(calendar.timegm(e.published_parsed) for e in entries if e.get("published_parsed"))
+    if len(times) < 2 or times[-1] <= times[0]:
+        return None
+    return (len(times) - 1) / (times[-1] - times[0])
+
+
+class FeedJob:
+    """Polls one feed and learns its publish rate."""
+
+    def __init__(self, source, url, state):
+        self.source = source
+        self.url = url
+        self.rate = state.get("publish_rate")        # new entries per second (EWMA)
+        self.interval = state.get("poll_interval", DEFAULT_POLL_INTERVAL)
+        self.errors = 0
+        self.last_polled = None                      # wall-clock time of the last successful poll
+        if state.get("last_polled"):
+            self.last_polled = datetime.fromisoformat(state["last_polled"]).timestamp()
+
+    def first_delay(self):
+        """Resumes the learned cadence after a restart instead of polling everything at once."""
+        if self.last_polled is None:
+            return 0.0
+        return max(0.0, self.last_polled + self.interval - time.time())
+
+    def run(self, scheduler):
+        state = scheduler.state_store.get(self.url)
+        result = fetch_feed(self.url, scheduler.timeout, state=state)  # host slot reserved by the scheduler
+        inserted = 0
+        if result.entries:
+            print(f"📡 Fetched {len(result.entries)} entries from: {self.url} ({self.source})")
+            inserted = store_feed_entries(self.source, self.url, result.entries)
+
+        now = time.time()
+        if self.last_polled is not None and state.get("seen_entry_ids"):
+            observed = len(result.entries) / max(now - self.last_polled, 1.0)
+        else:
+            observed = _timestamp_rate(result.entries)  # first poll: every entry looks new
+        if observed is not None:
+            self.rate = observed if self.rate is None else (
+                RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * self.rate)
+        if self.rate:
+            self.interval = min(MAX_POLL_INTERVAL, max(MIN_POLL_INTERVAL, TARGET_NEW_PER_POLL / self.rate))
+        elif observed is not None:
+            self.interval = MAX_POLL_INTERVAL
+        self.last_polled = now
+        self.errors = 0
+
+        # Saved only once the entries are stored, like iter_feed_entries
+        scheduler.state_store.update(self.url, **result.validators,
+                                     publish_rate=self.rate, poll_interval=self.interval)
+        print(f"⏱️ {self.url}: {result.status}, {inserted} new, next poll in {self.interval / 60:.1f} min")
+        return self.interval
+
+    def failed(self, error):
+        self.errors += 1
+        delay = min(MAX_ERROR_BACKOFF, self.interval * 2 ** self.errors)
+        print(f"⚠️ Failed to fetch {self.url}: {error} (retry in {delay / 60:.1f} min)")
+        return delay
+
+
+class PeriodicJob:
+    """A pipeline stage run every `interval` seconds on the same worker pool."""
+
+    url = None  # no host to rate limit
+
+    def __init__(self, name, func, interval):
+        self.name = name
+        self.func = func
+        self.interval = interval
+
+    def first_delay(self):
+        return self.interval
+
+    def run(self, scheduler):
+        self.func()
+        return self.interval
+
+    def failed(self, error):
+        print(f"⚠️ {self.name} failed: {error}")
+        return self.interval
+
+
+class FeedScheduler:
+    """
+    Min-heap of (next run time, job) drained by a bounded worker pool. A job
+    is pushed back only after its run completes, so a feed is never polled
+    twice at once, and a slow feed never delays the others. A feed whose host
+    was polled too recently is not handed to a worker to sleep on: its host
+    slot is reserved and the job goes back on the heap until that slot.
+    """
+
+    def __init__(self, feeds=RSS_FEED, max_workers=SCHEDULER_WORKERS, timeout=FEED_TIMEOUT,
+                 host_min_interval=HOST_MIN_INTERVAL, state_store=None, fetch_bodies=True):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.rate_limiter = HostRateLimiter(host_min_interval)
+        self.state_store = state_store or FeedStateStore()
+        self._heap = []
+        self._seq = itertools.count()  # tie-breaker, jobs themselves are not comparable
+        self._stop = threading.Event()
+
+        for source, urls in feeds.items():
+            for url in urls:
+                job = FeedJob(source, url, self.state_store.get(url))
+                self._push(job, job.first_delay())
+        jobs = [PeriodicJob("partition maintenance", maintain_partitions, MAINTENANCE_INTERVAL)]
+        if fetch_bodies:
+            jobs.append(PeriodicJob("body fetch", fetch_pending_bodies, BODY_FETCH_INTERVAL))
+        for job in jobs:
+            self._push(job, job.first_delay())
+
+    def _push(self, job, delay, slot_reserved=False):
+        if not slot_reserved:
+            delay *= random.uniform(1 - POLL_JITTER, 1 + POLL_JITTER)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._seq), job, slot_reserved))
+
+    def _host_delay(self, job, slot_reserved):
+        """Seconds until the job's host slot; the slot is booked, not waited for."""
+        if slot_reserved or job.url is None:
+            return 0.0
+        return self.rate_limiter.reserve(job.url)
+
+    def stop(self, *_):
+        self._stop.set()
+
+    def run(self):
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, self.stop)
+        print(f"🔄 Scheduler started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} "
+              f"with {len(self._heap)} jobs")
+
+        # Today's news_articles partition must exist before inserting
+        ensure_partitions()
+
+        in_flight = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            try:
+                while not self._stop.is_set():
+                    while (self._heap and self._heap[0][0] <= time.monotonic()
+                           and len(in_flight) < self.max_workers):
+                        _, _, job, slot_reserved = heapq.heappop(self._heap)
+                        delay = self._host_delay(job, slot_reserved)
+                        if delay > 0:
+                            self._push(job, delay, slot_reserved=True)
+                            continue
+                        in_flight[pool.submit(job.run, self)] = job
+
+                    timeout = WAKEUP_SECONDS
+                    if self._heap and len(in_flight) < self.max_workers:
+                        timeout = min(timeout, max(0.0, self._heap[0][0] - time.monotonic()))
+                    if not in_flight:
+                        self._stop.wait(timeout)
+                        continue
+
+                    done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job = in_flight.pop(future)
+                        try:
+                            delay = future.result()
+                        except Exception as e:
+                            delay = job.failed(e)
+                        self._push(job, delay)
+            except KeyboardInterrupt:
+                self.stop()
+            print(f"🛑 Stopping scheduler, waiting for {len(in_flight)} running jobs")
+
+
+if __name__ == "__main__":
+    FeedScheduler().run()
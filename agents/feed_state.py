@@ -0,0 +1,44 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+FEED_STATE_PATH = "./feed_cache/feed_state.json"
+
+
+class FeedStateStore:
+    """
+    Persistent per-URL polling state, kept in a small JSON file:
+      etag, last_modified -> validators sent back as conditional GET headers
+      body_hash           -> hash of the last downloaded body
+      seen_entry_ids      -> guids/links of the entries already ingested, most
+                             recent first
+      last_polled         -> when the feed was last stored
+      publish_rate, poll_interval -> cadence learned by agents/feed_scheduler.py
+    """
+
+    def __init__(self, path=FEED_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._state = json.load(f)
+
+    def get(self, url):
+        with self._lock:
+            return dict(self._state.get(url, {}))
+
+    def update(self, url, **fields):
+        with self._lock:
+            entry = self._state.setdefault(url, {})
+            entry.update({k: v for k, v in fields.items() if v is not None})
+            entry["last_polled"] = datetime.now().isoformat()
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f, indent=2)
+        os.replace(tmp_path, self.path)  # atomic, a crash never leaves half a file
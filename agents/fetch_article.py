@@ -1,5 +1,5 @@
 from db.vector_db import retrieve_articles
-from db.fetch import fetch_article_by_id
+from db.fetch import fetch_articles_by_ids
 
 def fetch_relevant_articles(state):
     """
@@ -15,19 +15,18 @@ def fetch_relevant_articles(state):
     if not results:
         raise ValueError("No relevant articles found.")
 
-    # Take the first article metadata
-    article_id = results[0]
-
-    # Fetch full article details from DB
-    article = fetch_article_by_id(article_id)
-    if article:
+    # Fetch all hits in one query (rank order kept) and take the best one still in the DB
+    articles = fetch_articles_by_ids([a for a, _ in results], [p for _, p in results])
+    if articles:
+        article = articles[0]
         article_id, title, content, url, published_at = article
         state["article_id"] = article_id
         state["title"] = title
         state["content"] = content
+        state["published_at"] = published_at
         print(f"✅ Fetched Article ID: {article_id}, Title: {title}")
     else:
-        raise ValueError(f"Article with ID {article_id} not found.")
+        raise ValueError(f"Articles with IDs {results} not found.")
 
     state["step"] = "fetch_relevant_articles"
     print("-----------------------------------------")
@@ -0,0 +1,222 @@
+import re
+from html.entities import html5
+from html.parser import HTMLParser
+
+# Streaming replacement for BeautifulSoup(html, "html.parser").get_text().strip():
+# same html.parser events, same entity and whitespace rules, but no tree.
+NON_TEXT_TAGS = frozenset({"script", "style", "template", "rt", "rp"})  # bs4 leaves their strings out of get_text()
+PRESERVE_WHITESPACE_TAGS = frozenset({"pre", "textarea"})
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem", "meta",
+    "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame", "image", "isindex",
+    "nextid", "spacer",
+})
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+REPLACEMENT_CHARACTER = "\ufffd"
+
+# Named entities without their ';' (html.parser hands them over that way), first spelling wins
+ENTITIES = {}
+for _name, _character in sorted(html5.items()):
+    ENTITIES.setdefault(_name[:-1] if _name.endswith(";") else _name, _character)
+
+# &#128; - &#159; are taken to be windows-1252 bytes, as browsers do
+C1_REPLACEMENTS = {}
+for _code in range(0x80, 0xa0):
+    try:
+        C1_REPLACEMENTS[_code] = bytes([_code]).decode("cp1252")
+    except UnicodeDecodeError:
+        pass
+
+_DECIMAL_REF = re.compile("^([0-9]+)(.*)")
+_HEX_REF = re.compile("^([0-9a-f]+)(.*)")
+
+
+def numeric_reference(name):
+    """(character, trailing data) for the body of a &#...; reference."""
+    base, pattern = 10, _DECIMAL_REF
+    if name.startswith(("x", "X")):
+        name, base, pattern = name[1:], 16, _HEX_REF
+    try:
+        code = int(name, base)
+        extra = ""
+    except ValueError:
+        match = pattern.search(name)
+        if match is None:
+            return "", name
+        code, extra = int(match.group(1), base), match.group(2)
+
+    if code == 0 or code > 0x10ffff or 0xd800 <= code <= 0xdfff:
+        return REPLACEMENT_CHARACTER, extra
+    return C1_REPLACEMENTS.get(code) or chr(code), extra
+
+
+class _TextExtractor(HTMLParser):
+    """
+    Collects the text get_text() would return, string by string: runs of
+    data between two events form one string, and a string made only of
+    ASCII whitespace collapses to "\\n" or " " (outside <pre>/<textarea>).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.strings = []
+        self._data = []
+        self._stack = []
+        self._open = {}
+        self._hidden = 0        # open NON_TEXT_TAGS
+        self._preserve = 0      # open PRESERVE_WHITESPACE_TAGS
+        self._closed_void = []  # void tags whose explicit end tag is still to be swallowed
+
+    def _flush(self, keep=None):
+        if self._data:
+            text = "".join(self._data)
+            self._data = []
+            if not self._preserve and not text.strip(ASCII_SPACES):
+                text = "\n" if "\n" in text else " "
+            if keep if keep is not None else not self._hidden:
+                self.strings.append(text)
+
+    def _push(self, tag):
+        self._stack.append(tag)
+        self._open[tag] = self._open.get(tag, 0) + 1
+        self._hidden += tag in NON_TEXT_TAGS
+        self._preserve += tag in PRESERVE_WHITESPACE_TAGS
+
+    def _pop_to(self, tag):
+        self._flush()
+        while self._open.get(tag):
+            popped = self._stack.pop()
+            self._open[popped] -= 1
+            self._hidden -= popped in NON_TEXT_TAGS
+            self._preserve -= popped in PRESERVE_WHITESPACE_TAGS
+            if popped == tag:
+                break
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        self._push(tag)
+        if tag in VOID_TAGS:
+            self._pop_to(tag)
+            self._closed_void.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self._flush()
+        self._push(tag)
+        self._pop_to(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self._closed_void:
+            self._closed_void.remove(tag)
+        else:
+            self._pop_to(tag)
+
+    def handle_data(self, data):
+        self._data.append(data)
+
+    def handle_charref(self, name):
+        self._data.extend(numeric_reference(name))
+
+    def handle_entityref(self, name):
+        self._data.append(ENTITIES.get(name, f"&{name}"))
+
+    def unknown_decl(self, data):
+        # CDATA sections count as text, other declarations don't
+        self._flush()
+        if data.upper().startswith("CDATA["):
+            self._data.append(data[len("CDATA["):])
+            self._flush(keep=True)
+
+    def handle_comment(self, data):
+        self._flush()
+
+    def handle_decl(self, decl):
+        self._flush()
+
+    def handle_pi(self, data):
+        self._flush()
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def clean_text(html_text):
+    """Plain text of a feed title/summary, equal to BeautifulSoup's get_text().strip()."""
+    if "<" not in html_text and "&" not in html_text:
+        return html_text.strip()
+    parser = _TextExtractor()
+    parser.feed(html_text)
+    parser.close()
+    return "".join(parser.strings).strip()
+
+
+# Main-text extraction for full article pages (see agents/body_fetcher.py)
+BOILERPLATE_TAGS = frozenset({
+    "script", "style", "template", "noscript", "nav", "header", "footer", "aside", "form",
+    "figure", "figcaption", "button", "select", "svg", "iframe",
+})
+PARAGRAPH_TAGS = frozenset({"p", "h2", "h3", "li", "blockquote"})
+MIN_PARAGRAPH_CHARS = 40  # shorter blocks are bylines, share buttons, captions...
+
+
+class _MainTextExtractor(HTMLParser):
+    """
+    Collects paragraph-level text blocks outside boilerplate regions,
+    remembering which ones sit inside an <article> element.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []        # (text, inside <article>)
+        self._text = []
+        self._boilerplate = 0
+        self._article = 0
+        self._paragraph = 0
+
+    def _flush(self):
+        if self._text:
+            text = " ".join("".join(self._text).split())
+            self._text = []
+            if len(text) >= MIN_PARAGRAPH_CHARS:
+                self.blocks.append((text, self._article > 0))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BOILERPLATE_TAGS:
+            self._boilerplate += 1
+        elif tag == "article":
+            self._article += 1
+        elif tag in PARAGRAPH_TAGS:
+            self._flush()
+            self._paragraph += 1
+        elif tag == "br":
+            self._text.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in BOILERPLATE_TAGS:
+            self._boilerplate = max(0, self._boilerplate - 1)
+        elif tag == "article":
+            self._article = max(0, self._article - 1)
+        elif tag in PARAGRAPH_TAGS:
+            self._flush()
+            self._paragraph = max(0, self._paragraph - 1)
+
+    def handle_data(self, data):
+        if self._paragraph and not self._boilerplate:
+            self._text.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_main_text(html_text):
+    """
+    Body text of an article page: its paragraphs separated by blank lines,
+    preferring those inside <article> when the page has one.
+    """
+    parser = _MainTextExtractor()
+    parser.feed(html_text)
+    parser.close()
+    in_article = [text for text, inside in parser.blocks if inside]
+    blocks = in_article or [text for text, _ in parser.blocks]
+    return "\n\n".join(dict.fromkeys(blocks))  # drops repeated blocks (teasers, pull quotes)
@@ -1,8 +1,10 @@
 
-import feedparser
-from bs4 import BeautifulSoup
 from datetime import datetime
-from db.insertion import insert_articles
+from db.insertion import insert_articles_bulk
+from db.partitions import ensure_partitions
+from agents.feed_fetcher import iter_feed_entries
+from agents.feed_state import FeedStateStore
+from agents.html_cleaner import clean_text  # streaming stand-in for BeautifulSoup(...).get_text().strip()
 
 RSS_FEED= {
     "moneycontrol" : ["https://www.moneycontrol.com/rss/latestnews.xml"],
@@ -21,10 +23,25 @@ RSS_FEED= {
 
 CSV_FILE = "rssfeeds.csv"
 
-# Step 2: Function to clean text
-def clean_text(html_text):
-    soup = BeautifulSoup(html_text, "html.parser")
-    return soup.get_text().strip()
+def store_feed_entries(source, url, entries):
+    """
+    Cleans and inserts the entries of one feed; returns the number of new
+    articles. Every entry is stored: the feed state marks all of them as
+    seen, so an entry left out here would never come back.
+    """
+    batch = []
+    for entry in entries:
+        title=clean_text(entry.title)
+        summary=clean_text(entry.get("summary", ""))
+        link=entry.link
+        published=entry.get("published", datetime.now().isoformat())
+        batch.append((source, url, title, link, published, summary))
+
+    # One batch per feed: a few round trips and a single commit
+    result = insert_articles_bulk(batch)
+    print(f"    ✅ Inserted {len(result['inserted'])} articles, skipped {len(result['skipped'])} duplicates")
+    return len(result["inserted"])
+
 
 # Step 3: Fetch and save all RSS feeds
 def ingest_all_feeds():
@@ -33,26 +50,15 @@ def ingest_all_feeds():
 
     print(f"🔄 Running ingestion at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-    for source, urls in RSS_FEED.items():
-        print(f"Source: {source}")
-        for url in urls:
-            print(f"  URL: {url}")
-            print(f"📡 Fetching from: {url}")
-            feed = feedparser.parse(url)
-
-            for entry in feed.entries[:20]:  # Limit to last 20 per feed
-                source=source
-                title=clean_text(entry.title)
-                summary=clean_text(entry.get("summary", ""))
-                link=entry.link
-                published=entry.get("published", datetime.now().isoformat())
-
-                article_id= insert_articles(source,url,title,link,published,summary)
-                if article_id:
-                    cnt += 1
-                print(f"    ✅ Inserted article ID: {article_id} | Title: {title}")
-
+    # Today's news_articles partition must exist before inserting
+    ensure_partitions()
 
+    # Feeds are downloaded concurrently and handed over as soon as each one is parsed.
+    # ETag / Last-Modified and the newest seen entry are remembered per feed,
+    # so unchanged feeds cost a 304 and only new entries are inserted
+    for source, url, entries in iter_feed_entries(RSS_FEED, state_store=FeedStateStore()):
+        print(f"📡 Fetched {len(entries)} entries from: {url} ({source})")
+        cnt += store_feed_entries(source, url, entries)
 
     print(f"✅ Ingestion complete. Total articles inserted: {cnt}")
 
@@ -0,0 +1,93 @@
+from datetime import datetime
+
+import numpy as np
+
+from db.rating_cache import rating_cache
+
+# Weighting scheme from prompts/prompt.yaml:
+#   weight = source_rating_normalized * llm_confidence * recency_factor
+RECENCY_LAMBDA = 0.05   # recency_factor = exp(-lambda * hours_since_published)
+RATING_SCALE = 10.0     # ratings are 0-10
+TOP_K = 5
+
+
+def article_weights(published_at, source_ratings, confidences, now=None, lam=RECENCY_LAMBDA):
+    """
+    Normalized article weights, computed for all articles in one pass.
+    published_at: datetimes (None -> weight 0), source_ratings: 0-10,
+    confidences: 0-1. Returns a float64 array summing to 1 (or all zeros).
+    """
+    now = np.datetime64(now or datetime.now(), "s")
+    published = np.asarray(published_at, dtype="datetime64[s]")
+    hours = (now - published).astype(np.float64) / 3600.0
+    recency = np.exp(-lam * np.clip(hours, 0.0, None))
+    recency[np.isnat(published)] = 0.0
+
+    raw = (np.asarray(source_ratings, dtype=np.float64) / RATING_SCALE) \
+        * np.asarray(confidences, dtype=np.float64) * recency
+    total = raw.sum()
+    return raw / total if total > 0 else np.zeros_like(raw)
+
+
+def vote_stocks(pair_articles, pair_symbols, weights, top_k=TOP_K, symbol_names=None):
+    """
+    Weighted stock vote over article-company pairs.
+    pair_articles: article index of each pair (into `weights`)
+    pair_symbols:  company symbol of each pair, or integer ids into
+                   `symbol_names` (skips factorizing the strings)
+    A company's score is the sum of the weights of the articles naming it;
+    returns the top_k (symbol, score) pairs, best first. Equal scores are
+    ranked by symbol id (alphabetically for string symbols), also at the
+    top_k cut-off, so the vote does not depend on partition order.
+    """
+    pair_symbols = np.asarray(pair_symbols)
+    if pair_symbols.size == 0:
+        return []
+    if symbol_names is None:
+        symbol_names, symbol_ids = np.unique(pair_symbols, return_inverse=True)
+    else:
+        symbol_ids = pair_symbols.astype(np.intp, copy=False)
+    pair_weights = np.asarray(weights, dtype=np.float64)[np.asarray(pair_articles, dtype=np.intp)]
+    scores = np.bincount(symbol_ids, weights=pair_weights, minlength=len(symbol_names))
+
+    k = min(top_k, len(scores))
+    if k <= 0:
+        return []
+    kth = -np.partition(-scores, k - 1)[k - 1]  # k-th best score, O(n)
+    above = np.flatnonzero(scores > kth)
+    top = np.concatenate([above, np.flatnonzero(scores == kth)[:k - len(above)]])
+    top = top[np.lexsort((top, -scores[top]))]
+    return [(str(symbol_names[i]), float(scores[i])) for i in top]
+
+
+def weight_sources(state):
+    """
+    LangGraph node (weight_sources in agents/graph.yaml).
+    state["articles"]: dicts with source_id, category_id, published_at,
+    confidence and companies (symbols extracted for the article).
+    Adds each article's "weight" and the "top_stocks" vote to the state.
+    """
+    articles = state.get("articles", [])
+    if not articles:
+        state["top_stocks"] = []
+        return state
+
+    ratings = rating_cache.get_many([(a.get("source_id"), a.get("category_id")) for a in articles])
+    weights = article_weights(
+        [a.get("published_at") for a in articles],
+        ratings,
+        [a.get("confidence") or 0.0 for a in articles],
+    )
+    for article, weight in zip(articles, weights):
+        article["weight"] = float(weight)
+
+    pair_articles, pair_symbols = [], []
+    for i, article in enumerate(articles):
+        for symbol in article.get("companies", []):
+            pair_articles.append(i)
+            pair_symbols.append(symbol)
+
+    state["top_stocks"] = vote_stocks(pair_articles, pair_symbols, weights)
+    state["step"] = "weight_sources"
+    print(f"⚖️ Weighted {len(articles)} articles, top stocks: {state['top_stocks']}")
+    return state
@@ -0,0 +1,144 @@
+import os
+import socket
+import threading
+
+from psycopg2.extras import execute_values
+
+from db.connection import db_connection
+
+# Postgres-backed work queue of articles waiting for a category (table
+# categorize_jobs, migration 8 in db/creation.py). Any number of workers, on
+# any number of machines, claim disjoint batches with FOR UPDATE SKIP LOCKED.
+# A claim is a lease: the job turns invisible for LEASE_SECONDS and becomes
+# claimable again if its worker dies before acknowledging it.
+LEASE_SECONDS = int(os.getenv("categorize_lease_seconds", 300))
+MAX_ATTEMPTS = int(os.getenv("categorize_max_attempts", 5))
+RETRY_BASE_SECONDS = 30     # a failed job waits RETRY_BASE_SECONDS * 2**(attempts - 1)
+
+
+def worker_name():
+    """Identity recorded on claimed jobs: host, process and thread."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def enqueue_categorize_jobs(cur, articles):
+    """
+    Queues (article_id, published_at) pairs on the caller's cursor, so the jobs
+    commit (or roll back) together with the articles themselves.
+    """
+    if articles:
+        execute_values(cur, """
+            INSERT INTO categorize_jobs (article_id, published_at) VALUES %s
+            ON CONFLICT DO NOTHING;
+        """, articles)
+
+
+def claim_categorize_jobs(worker, limit=20, lease_seconds=LEASE_SECONDS):
+    """
+    Leases up to `limit` ready jobs to `worker`, oldest first; rows another
+    worker holds locked are skipped rather than waited on. Jobs that used up
+    MAX_ATTEMPTS (e.g. their workers kept crashing) are marked failed instead.
+    Returns [(article_id, title, content, published_at, already categorized)],
+    with None title/content when the article no longer exists. An article
+    whose content changed after it was categorized (its page body was
+    fetched) counts as not categorized.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            WITH ready AS (
+                SELECT article_id, published_at
+                FROM categorize_jobs
+                WHERE status = 'pending' AND visible_at <= now()
+                ORDER BY visible_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            ),
+            claimed AS (
+                UPDATE categorize_jobs AS j
+                SET status = CASE WHEN j.attempts >= %s THEN 'failed' ELSE 'pending' END,
+                    attempts = j.attempts + CASE WHEN j.attempts >= %s THEN 0 ELSE 1 END,
+                    visible_at = now() + make_interval(secs => %s),
+                    claimed_by = %s
+                FROM ready r
+                WHERE j.article_id = r.article_id AND j.published_at = r.published_at
+                RETURNING j.article_id, j.published_at, j.status
+            )
+            SELECT c.article_id, a.title, a.content, c.published_at,
+                   a.category_id IS NOT NULL
+                   AND (a.content_updated_at IS NULL OR a.categorized_at >= a.content_updated_at)
+            FROM claimed c
+            LEFT JOIN news_articles a ON a.article_id = c.article_id AND a.published_at = c.published_at
+            WHERE c.status = 'pending'
+            ORDER BY c.article_id;
+        """, (limit, MAX_ATTEMPTS, MAX_ATTEMPTS, lease_seconds, worker))
+        rows = cur.fetchall()
+        conn.commit()
+        cur.close()
+    return rows
+
+
+def open_categorize_jobs(jobs):
+    """
+    Settles the claimed `jobs` that need no work (article gone, e.g. expired
+    by retention, or categorized meanwhile) and returns the rest as
+    (article_id, title, content, published_at).
+    """
+    complete_categorize_jobs([article_id for article_id, title, _, _, done in jobs if title is None or done])
+    return [job[:4] for job in jobs if job[1] is not None and not job[4]]
+
+
+def complete_categorize_jobs(article_ids):
+    """Removes finished jobs (save_categories_bulk already does this for categorized articles)."""
+    if not article_ids:
+        return 0
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("DELETE FROM categorize_jobs WHERE article_id = ANY(%s);", (list(article_ids),))
+        deleted = cur.rowcount
+        conn.commit()
+        cur.close()
+    return deleted
+
+
+def fail_categorize_jobs(worker, article_ids, error):
+    """
+    Releases jobs `worker` could not finish: they become claimable again after
+    an exponential backoff, or are marked failed once out of attempts. Jobs
+    whose lease expired and were re-claimed by another worker are left alone.
+    """
+    if not article_ids:
+        return 0
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE categorize_jobs
+            SET status = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END,
+                visible_at = now() + make_interval(secs => %s * 2 ^ (attempts - 1)),
+                last_error = %s,
+                claimed_by = NULL
+            WHERE article_id = ANY(%s) AND claimed_by = %s;
+        """, (MAX_ATTEMPTS, RETRY_BASE_SECONDS, str(error)[:1000], list(article_ids), worker))
+        released = cur.rowcount
+        conn.commit()
+        cur.close()
+    return released
+
+
+def categorize_queue_stats():
+    """{status: count}, with pending split into 'ready' and 'leased'/'waiting'."""
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT CASE
+                       WHEN status <> 'pending' THEN status
+                       WHEN visible_at <= now() THEN 'ready'
+                       WHEN claimed_by IS NOT NULL THEN 'leased'
+                       ELSE 'waiting'
+                   END, count(*)
+            FROM categorize_jobs
+            GROUP BY 1;
+        """)
+        stats = dict(cur.fetchall())
+        cur.close()
+    return stats
@@ -1,5 +1,9 @@
 import psycopg2
+from psycopg2 import pool as pg_pool
+from contextlib import contextmanager
 from dotenv import load_dotenv
+import threading
+import time
 import os
 load_dotenv()
 
@@ -9,7 +13,32 @@ password = os.getenv("pass")
 host = os.getenv("host")
 port = os.getenv("port")
 
+# Pool sizing / behaviour
+pool_min = int(os.getenv("pool_min", 1))
+pool_max = int(os.getenv("pool_max", 10))
+pool_timeout = float(os.getenv("pool_timeout", 30))     # max seconds to wait for a free connection
+healthcheck_idle = float(os.getenv("pool_healthcheck_idle", 60))  # ping connections idle longer than this
+
+pool_metrics = {
+    "checkouts": 0,
+    "wait_total": 0.0,   # seconds spent waiting for a connection, summed
+    "wait_max": 0.0,
+    "exhausted": 0,      # checkouts that found no free connection and had to wait
+    "timeouts": 0,       # checkouts that gave up after pool_timeout
+    "discarded": 0,      # broken connections closed instead of reused
+}
+
+_pool = None
+_slots = None
+_last_used = {}
+_lock = threading.Lock()
+
+
 def get_connection():
+    """
+    Dedicated, unpooled connection. Only for connections that live for the
+    whole process (e.g. LISTEN); everything else should use db_connection().
+    """
     return psycopg2.connect(
         dbname=dbname,
         user=user,
@@ -17,3 +46,107 @@ def get_connection():
         host=host,
         port=port
     )
+
+
+def get_pool():
+    global _pool, _slots
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _slots = threading.BoundedSemaphore(pool_max)
+                _pool = pg_pool.ThreadedConnectionPool(
+                    pool_min, pool_max,
+                    dbname=dbname,
+                    user=user,
+                    password=password,
+                    host=host,
+                    port=port
+                )
+    return _pool
+
+
+def _is_healthy(conn):
+    if conn.closed:
+        return False
+    if time.monotonic() - _last_used.get(id(conn), 0) < healthcheck_idle:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+
+def _checkout(pool):
+    while True:
+        conn = pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        with _lock:
+            pool_metrics["discarded"] += 1
+        _last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+
+
+def _record_wait(wait, exhausted):
+    with _lock:
+        pool_metrics["checkouts"] += 1
+        pool_metrics["wait_total"] += wait
+        pool_metrics["wait_max"] = max(pool_metrics["wait_max"], wait)
+        if exhausted:
+            pool_metrics["exhausted"] += 1
+
+
+@contextmanager
+def db_connection():
+    """
+    Borrow a connection from the process-wide pool:
+
+        with db_connection() as conn:
+            cur = conn.cursor()
+            ...
+
+    Commits when the block exits normally, rolls back on an exception, and
+    always hands the connection back. Waits up to `pool_timeout` seconds
+    when all `pool_max` connections are in use.
+    """
+    pool = get_pool()
+
+    start = time.monotonic()
+    exhausted = not _slots.acquire(blocking=False)
+    if exhausted and not _slots.acquire(timeout=pool_timeout):
+        with _lock:
+            pool_metrics["timeouts"] += 1
+        raise pg_pool.PoolError(f"No database connection available after {pool_timeout}s")
+    _record_wait(time.monotonic() - start, exhausted)
+
+    conn = None
+    try:
+        conn = _checkout(pool)
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            # BaseException too: an abandoned streaming generator raises GeneratorExit here
+            if not conn.closed:
+                conn.rollback()
+            raise
+    finally:
+        if conn is not None:
+            if conn.closed:
+                _last_used.pop(id(conn), None)
+            else:
+                _last_used[id(conn)] = time.monotonic()
+            pool.putconn(conn, close=bool(conn.closed))
+        _slots.release()
+
+
+def pool_stats():
+    """Snapshot of the pool metrics, with the average checkout wait."""
+    with _lock:
+        stats = dict(pool_metrics)
+    stats["wait_avg"] = stats["wait_total"] / stats["checkouts"] if stats["checkouts"] else 0.0
+    stats["pool_min"], stats["pool_max"] = pool_min, pool_max
+    return stats
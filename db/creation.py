@@ -1,104 +1,320 @@
-from db.connection import get_connection
+from db.connection import db_connection
+from db.partitions import ensure_partitions
 
 
-# Create a cursor
-conn = get_connection()
-cur = conn.cursor()
+# Versioned schema migrations, applied in order and recorded in schema_migrations.
+# Never edit an applied migration; append a new one instead.
+MIGRATIONS = [
+    (1, "initial schema", [
+        """
+        CREATE TABLE IF NOT EXISTS news_sources (
+            source_id SERIAL PRIMARY KEY,
+            source_name VARCHAR(255) UNIQUE NOT NULL,
+            source_url TEXT
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS categories (
+            category_id SERIAL PRIMARY KEY,
+            category_name VARCHAR(100) UNIQUE NOT NULL
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS news_ratings (
+            rating_id SERIAL PRIMARY KEY,
+            source_id INT REFERENCES news_sources(source_id),
+            category_id INT REFERENCES categories(category_id),
+            rating FLOAT DEFAULT 5.0,
+            rating_count INT DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (source_id, category_id)
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS predictions (
+            prediction_id SERIAL PRIMARY KEY,
+            source_id INT REFERENCES news_sources(source_id),
+            category_id INT REFERENCES categories(category_id),
+            stock_symbol VARCHAR(20) NOT NULL,
+            predicted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            target_date DATE NOT NULL,
+            outcome VARCHAR(20) DEFAULT 'Pending'
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS feedback (
+            feedback_id SERIAL PRIMARY KEY,
+            prediction_id INT REFERENCES predictions(prediction_id),
+            user_id VARCHAR(50),
+            outcome VARCHAR(20) CHECK (outcome IN ('Correct', 'Wrong', 'Partial')),
+            rating INT CHECK (rating BETWEEN 1 AND 5),
+            feedback_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS prediction_sources (
+            id SERIAL PRIMARY KEY,
+            prediction_id INT REFERENCES predictions(prediction_id),
+            source_id INT REFERENCES news_sources(source_id),
+            article_url TEXT,
+            article_title TEXT,
+            source_rating FLOAT,
+            llm_confidence FLOAT,
+            weight FLOAT
+        );
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS agent_logs (
+            log_id SERIAL PRIMARY KEY,
+            event_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            node_name TEXT,
+            message JSONB
+        );
+        """,
 
-# Define schema creation queries
-queries = [
-    """
-    CREATE TABLE IF NOT EXISTS news_sources (
-        source_id SERIAL PRIMARY KEY,
-        source_name VARCHAR(255) UNIQUE NOT NULL,
-        source_url TEXT
-    );
-    """,
-    """
-    CREATE TABLE IF NOT EXISTS categories (
-        category_id SERIAL PRIMARY KEY,
-        category_name VARCHAR(100) UNIQUE NOT NULL
-    );
-    """,
-    """
-    CREATE TABLE IF NOT EXISTS news_ratings (
-        rating_id SERIAL PRIMARY KEY,
-        source_id INT REFERENCES news_sources(source_id),
-        category_id INT REFERENCES categories(category_id),
-        rating FLOAT DEFAULT 5.0,
-        rating_count INT DEFAULT 0,
-        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        UNIQUE (source_id, category_id)
-    );
-    """,
-    """
-    CREATE TABLE IF NOT EXISTS predictions (
-        prediction_id SERIAL PRIMARY KEY,
-        source_id INT REFERENCES news_sources(source_id),
-        category_id INT REFERENCES categories(category_id),
-        stock_symbol VARCHAR(20) NOT NULL,
-        predicted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        target_date DATE NOT NULL,
-        outcome VARCHAR(20) DEFAULT 'Pending'
-    );
-    """,
-    """
-    CREATE TABLE IF NOT EXISTS feedback (
-        feedback_id SERIAL PRIMARY KEY,
-        prediction_id INT REFERENCES predictions(prediction_id),
-        user_id VARCHAR(50),
-        outcome VARCHAR(20) CHECK (outcome IN ('Correct', 'Wrong', 'Partial')),
-        rating INT CHECK (rating BETWEEN 1 AND 5),
-        feedback_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    """,
-    """
-    CREATE TABLE IF NOT EXISTS prediction_sources (
-        id SERIAL PRIMARY KEY,
-        prediction_id INT REFERENCES predictions(prediction_id),
-        source_id INT REFERENCES news_sources(source_id),
-        article_url TEXT,
-        article_title TEXT,
-        source_rating FLOAT,
-        llm_confidence FLOAT,
-        weight FLOAT
-    );
-    """,
-    """
-    CREATE TABLE IF NOT EXISTS agent_logs (
-        log_id SERIAL PRIMARY KEY,
-        event_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        node_name TEXT,
-        message JSONB
-    );
-    """,
+        """
+        CREATE TABLE IF NOT EXISTS news_articles (
+            article_id SERIAL PRIMARY KEY,
+            source_id INT REFERENCES news_sources(source_id),
+            title TEXT NOT NULL,
+            content TEXT,
+            url TEXT,
+            published_at TIMESTAMP,
+            category_id INT REFERENCES categories(category_id),
+            llm_confidence FLOAT,
+            inserted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+    ]),
+    (2, "unique article urls", [
+        # Drop duplicate urls left by the old per-row insert, then enforce
+        # uniqueness (insert_articles_bulk relies on ON CONFLICT (url))
+        """
+        DELETE FROM news_articles a
+        USING news_articles b
+        WHERE a.url = b.url AND a.article_id > b.article_id;
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS news_articles_url_key ON news_articles (url);
+        """,
+    ]),
+    (3, "feedback applied_at", [
+        """
+        ALTER TABLE feedback ADD COLUMN IF NOT EXISTS applied_at TIMESTAMP;
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS feedback_pending_idx ON feedback (feedback_id) WHERE applied_at IS NULL;
+        """,
+    ]),
+    (4, "hot query indexes", [
+        # Range scans on publish time (fetch_todays_articles, indexing jobs)
+        """
+        CREATE INDEX IF NOT EXISTS news_articles_published_at_idx ON news_articles (published_at);
+        """,
+        # Work list of articles still waiting for a category
+        """
+        CREATE INDEX IF NOT EXISTS news_articles_uncategorized_idx ON news_articles (article_id)
+        WHERE category_id IS NULL;
+        """,
+        # rate_lookup: index-only scan for (source, category) -> rating
+        """
+        CREATE INDEX IF NOT EXISTS news_ratings_lookup_idx ON news_ratings (source_id, category_id)
+        INCLUDE (rating, rating_count);
+        """,
+        # Predictions due for evaluation by target date / outcome
+        """
+        CREATE INDEX IF NOT EXISTS predictions_target_outcome_idx ON predictions (target_date, outcome)
+        INCLUDE (source_id, category_id);
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS feedback_prediction_idx ON feedback (prediction_id);
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS prediction_sources_prediction_idx ON prediction_sources (prediction_id);
+        """,
+    ]),
+    # news_articles becomes range partitioned on published_at (partitions are
+    # created/retired by db/partitions.py). A partitioned table cannot have a
+    # unique index on url alone, so url dedupe moves to article_urls.
+    (5, "partition news_articles by published_at", [
+        """
+        CREATE TABLE IF NOT EXISTS article_urls (
+            url TEXT PRIMARY KEY,
+            first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        """,
+        """
+        INSERT INTO article_urls (url)
+        SELECT url FROM news_articles WHERE url IS NOT NULL
+        ON CONFLICT (url) DO NOTHING;
+        """,
+        """
+        ALTER TABLE news_articles RENAME TO news_articles_legacy;
+        ALTER INDEX news_articles_pkey RENAME TO news_articles_legacy_pkey;
+        DROP INDEX IF EXISTS news_articles_url_key;
+        DROP INDEX IF EXISTS news_articles_published_at_idx;
+        DROP INDEX IF EXISTS news_articles_uncategorized_idx;
+        ALTER SEQUENCE news_articles_article_id_seq OWNED BY NONE;
+        """,
+        """
+        CREATE TABLE news_articles (
+            article_id INT NOT NULL DEFAULT nextval('news_articles_article_id_seq'),
+            source_id INT REFERENCES news_sources(source_id),
+            title TEXT NOT NULL,
+            content TEXT,
+            url TEXT,
+            published_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            category_id INT REFERENCES categories(category_id),
+            llm_confidence FLOAT,
+            inserted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (article_id, published_at)
+        ) PARTITION BY RANGE (published_at);
+        ALTER SEQUENCE news_articles_article_id_seq OWNED BY news_articles.article_id;
+        """,
+        """
+        CREATE TABLE news_articles_default PARTITION OF news_articles DEFAULT;
+        """,
+        """
+        CREATE INDEX news_articles_published_at_idx ON news_articles (published_at);
+        CREATE INDEX news_articles_url_idx ON news_articles (url);
+        CREATE INDEX news_articles_uncategorized_idx ON news_articles (article_id) WHERE category_id IS NULL;
+        """,
+        # Existing rows land in the default partition; ensure_partitions() then
+        # moves them into their daily partitions
+        """
+        INSERT INTO news_articles (article_id, source_id, title, content, url, published_at,
+                                   category_id, llm_confidence, inserted_at)
+        SELECT article_id, source_id, title, content, url, COALESCE(published_at, inserted_at, CURRENT_TIMESTAMP),
+               category_id, llm_confidence, inserted_at
+        FROM news_articles_legacy;
+        """,
+        """
+        DROP TABLE news_articles_legacy;
+        """,
+    ]),
+    (6, "near-duplicate clusters", [
+        # 64-bit SimHash of title + content, and the article_id of the first
+        # article of the same story (its own id for a cluster representative)
+        """
+        ALTER TABLE news_articles ADD COLUMN IF NOT EXISTS fingerprint BIGINT,
+                                  ADD COLUMN IF NOT EXISTS cluster_id INT;
+        """,
+        """
+        UPDATE news_articles SET cluster_id = article_id WHERE cluster_id IS NULL;
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS news_articles_cluster_idx ON news_articles (cluster_id);
+        """,
+    ]),
+    (7, "article body fetch", [
+        # Set once agents/body_fetcher.py has tried the article's page (content
+        # then holds the full body instead of the feed summary, when it got one)
+        """
+        ALTER TABLE news_articles ADD COLUMN IF NOT EXISTS body_fetched_at TIMESTAMP;
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS news_articles_body_pending_idx ON news_articles (published_at)
+        WHERE body_fetched_at IS NULL;
+        """,
+    ]),
+    (8, "categorize job queue", [
+        # One row per cluster representative waiting for a category (see
+        # db/categorize_queue.py). Workers claim rows with FOR UPDATE SKIP LOCKED
+        # and lease them by pushing visible_at into the future; finished jobs
+        # are deleted, jobs out of attempts are kept as 'failed'
+        """
+        CREATE TABLE IF NOT EXISTS categorize_jobs (
+            article_id INT NOT NULL,
+            published_at TIMESTAMP NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            visible_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            claimed_by TEXT,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (article_id, published_at)
+        );
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS categorize_jobs_ready_idx ON categorize_jobs (visible_at)
+        WHERE status = 'pending';
+        """,
+        """
+        INSERT INTO categorize_jobs (article_id, published_at)
+        SELECT article_id, published_at
+        FROM news_articles
+        WHERE category_id IS NULL AND (cluster_id IS NULL OR cluster_id = article_id)
+        ON CONFLICT DO NOTHING;
+        """,
+    ]),
+    (9, "category provenance", [
+        # Who assigned category_id: 'llm' or 'fast' (agents/fast_classifier.py).
+        # llm_confidence only ever holds the LLM's confidence, the classifier's
+        # probability goes to fast_confidence. Earlier labels stay NULL (unknown)
+        # and are not used to train the classifier
+        """
+        ALTER TABLE news_articles ADD COLUMN IF NOT EXISTS category_source TEXT,
+                                  ADD COLUMN IF NOT EXISTS fast_confidence FLOAT;
+        """,
+    ]),
+    (10, "body fetch retries and content changes", [
+        # Transient body fetch errors back off until body_retry_at and give up
+        # after a few attempts (agents/body_fetcher.py). content_updated_at is
+        # set when the page text replaces the summary; an article categorized
+        # before that (categorized_at) is categorized again
+        """
+        ALTER TABLE news_articles ADD COLUMN IF NOT EXISTS body_fetch_attempts INT NOT NULL DEFAULT 0,
+                                  ADD COLUMN IF NOT EXISTS body_retry_at TIMESTAMP,
+                                  ADD COLUMN IF NOT EXISTS content_updated_at TIMESTAMP,
+                                  ADD COLUMN IF NOT EXISTS categorized_at TIMESTAMP;
+        """,
+    ]),
+    (11, "drop uncategorized work list index", [
+        # Categorization work comes from categorize_jobs now; nothing scans
+        # news_articles for category_id IS NULL anymore
+        """
+        DROP INDEX IF EXISTS news_articles_uncategorized_idx;
+        """,
+    ]),
+]
 
-    """
-    CREATE TABLE IF NOT EXISTS news_articles (
-        article_id SERIAL PRIMARY KEY,
-        source_id INT REFERENCES news_sources(source_id),
-        title TEXT NOT NULL,
-        content TEXT,
-        url TEXT,
-        published_at TIMESTAMP,
-        category_id INT REFERENCES categories(category_id),
-        llm_confidence FLOAT,
-        inserted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    );
-    """,
+MIGRATIONS_LOCK = 727001  # pg advisory lock id, keeps concurrent migrators serialized
 
 
-]
+def migrate():
+    """Applies every migration newer than the database's current version."""
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INT PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+        conn.commit()
+
+        for version, name, statements in MIGRATIONS:
+            # One transaction per migration, holding the lock until it commits
+            cur.execute("SELECT pg_advisory_xact_lock(%s);", (MIGRATIONS_LOCK,))
+            cur.execute("SELECT 1 FROM schema_migrations WHERE version = %s;", (version,))
+            if cur.fetchone():
+                conn.commit()
+                continue
+
+            for statement in statements:
+                cur.execute(statement)
+            cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s);", (version, name))
+            conn.commit()
+            print(f"✅ Applied migration {version}: {name}")
 
-# Execute each query
-for q in queries:
-    cur.execute(q)
+        cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations;")
+        print(f"✅ Schema is at version {cur.fetchone()[0]}")
+        cur.close()
 
-# Commit changes
-conn.commit()
+    # Partitions for today and the next few periods (and any rows parked in the default partition)
+    ensure_partitions()
 
-print("✅ Tables created successfully!")
 
-# Close cursor and connection
-cur.close()
-conn.close()
+if __name__ == "__main__":
+    migrate()
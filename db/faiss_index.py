@@ -0,0 +1,109 @@
+import math
+import os
+
+import faiss
+import numpy as np
+
+# Index tiers for the article vector DB (db/vector_db.py):
+#   flat  -> exact brute-force search, best for small corpora
+#   hnsw  -> graph index, no training, near-exact recall at a fraction of the scan
+#   ivfpq -> inverted lists over product-quantized codes, trained on a sample;
+#            the only tier whose memory stays small at millions of vectors
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+INDEX_TYPE = os.getenv("faiss_index_type", "auto")               # "auto" or one of INDEX_TYPES
+FLAT_MAX_VECTORS = int(os.getenv("faiss_flat_max", 50_000))      # auto: exact search up to this size
+HNSW_MAX_VECTORS = int(os.getenv("faiss_hnsw_max", 1_000_000))   # auto: HNSW up to this size, IVF-PQ beyond
+
+HNSW_M = 32                 # graph neighbors per node
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = int(os.getenv("faiss_ef_search", 64))
+IVF_NPROBE = int(os.getenv("faiss_nprobe", 16))
+PQ_BITS = 8                 # 256 centroids per sub-quantizer
+TRAIN_SAMPLE = 100_000      # vectors IVF-PQ is trained on
+MIN_TRAIN_PER_CENTROID = 39 # faiss warns below this many training points per centroid
+
+
+def choose_index_type(n_vectors, index_type=INDEX_TYPE):
+    """Index tier for a corpus of `n_vectors`; an explicit type wins over "auto"."""
+    if index_type == "auto":
+        if n_vectors <= FLAT_MAX_VECTORS:
+            index_type = "flat"
+        elif n_vectors <= HNSW_MAX_VECTORS:
+            index_type = "hnsw"
+        else:
+            index_type = "ivfpq"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown FAISS index type {index_type!r}, expected auto or one of {INDEX_TYPES}")
+    if index_type == "ivfpq" and n_vectors < MIN_TRAIN_PER_CENTROID * 2 ** PQ_BITS:
+        return "flat"  # too few vectors to train the quantizers on
+    return index_type
+
+
+def ivf_nlist(n_vectors):
+    """Number of inverted lists: ~4 * sqrt(n), capped so the training sample covers them."""
+    cap = max(1, min(n_vectors, TRAIN_SAMPLE) // MIN_TRAIN_PER_CENTROID)
+    return max(1, min(int(4 * math.sqrt(n_vectors)), cap))
+
+
+def pq_subquantizers(dim):
+    """Largest divisor of `dim` leaving at least 8 dimensions per sub-quantizer (48 for MiniLM's 384)."""
+    return next(m for m in range(max(1, dim // 8), 0, -1) if dim % m == 0)
+
+
+def new_index(dim, index_type, n_vectors=0):
+    """Empty L2 index of the given tier; ivfpq still has to be trained (see train_index)."""
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dim)
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return index
+    if index_type == "ivfpq":
+        quantizer = faiss.IndexFlatL2(dim)
+        return faiss.IndexIVFPQ(quantizer, dim, ivf_nlist(n_vectors), pq_subquantizers(dim), PQ_BITS)
+    raise ValueError(f"Unknown FAISS index type {index_type!r}")
+
+
+def train_index(index, sample):
+    if not index.is_trained:
+        index.train(np.ascontiguousarray(sample, dtype=np.float32))
+
+
+def tune_for_search(index, ef_search=HNSW_EF_SEARCH, nprobe=IVF_NPROBE):
+    """Sets the query-time recall/latency knobs, which are not stored in the index file."""
+    concrete = faiss.downcast_index(index)  # a view, `index` keeps owning the C++ object
+    if isinstance(concrete, faiss.IndexHNSW):
+        concrete.hnsw.efSearch = ef_search
+    elif isinstance(concrete, faiss.IndexIVF):
+        concrete.nprobe = nprobe
+    return index
+
+
+def live_search_params(index, live, ef_search=HNSW_EF_SEARCH, nprobe=IVF_NPROBE):
+    """
+    Per-query SearchParameters that only consider rows where `live` is True,
+    so deleted rows are filtered inside the search and never take one of the
+    k results. They replace the index's own knobs, so efSearch / nprobe are
+    set here as well. Rows past the end of `live` (an index that grew after
+    `live` was read) are never selected.
+    """
+    bitmap = np.packbits(np.asarray(live, dtype=bool), bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(bitmap), faiss.swig_ptr(bitmap))  # size in bytes
+    concrete = faiss.downcast_index(index)
+    if isinstance(concrete, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search)
+    elif isinstance(concrete, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=nprobe)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    params.referenced_objects = [selector, bitmap]  # FAISS only keeps pointers to them
+    return params
+
+
+def index_type_of(index):
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivfpq"
+    return "flat"
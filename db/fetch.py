@@ -1,46 +1,190 @@
-from db.connection import get_connection
+from db.connection import db_connection
 from psycopg2 import sql
+from collections import namedtuple, OrderedDict
+import threading
+
+ITERSIZE = 2000  # rows per keyset page (fetch_articles_after)
+
+Article = namedtuple("Article", ["article_id", "title", "content", "url", "published_at"])
+
+ARTICLE_CACHE_SIZE = 1024  # article rows kept in the process-local LRU
+
+# True once an article's content can no longer change: its page body was
+# fetched (or given up on), or it is never body-fetched (no url, or a
+# near-duplicate). Only such rows go into the LRU: the body fetcher runs in
+# another process and its writes would never reach this one's cache.
+CONTENT_FINAL_SQL = """
+    COALESCE(body_fetched_at IS NOT NULL OR url IS NULL OR cluster_id <> article_id, false)
+"""
+
+
+class _ArticleCache:
+    """Small thread-safe LRU of article rows keyed by article_id."""
+
+    def __init__(self, maxsize=ARTICLE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._rows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, article_ids):
+        with self._lock:
+            found = {}
+            for article_id in article_ids:
+                if article_id in self._rows:
+                    self._rows.move_to_end(article_id)
+                    found[article_id] = self._rows[article_id]
+            return found
+
+    def put_many(self, rows):
+        with self._lock:
+            for article_id, row in rows.items():
+                self._rows[article_id] = row
+                self._rows.move_to_end(article_id)
+            while len(self._rows) > self.maxsize:
+                self._rows.popitem(last=False)
+
+    def invalidate(self, article_ids):
+        with self._lock:
+            for article_id in article_ids:
+                self._rows.pop(article_id, None)
+
+
+article_cache = _ArticleCache()
 
 
 
 def fetch_table(table_name):
-    # Create a cursor
-    conn = get_connection()
-    cur = conn.cursor()
+    with db_connection() as conn:
+        cur = conn.cursor()
 
-    # Use psycopg2.sql for safe table name interpolation
-    query = sql.SQL("SELECT * FROM {table}").format(
-        table=sql.Identifier(table_name)
-    )
+        # Use psycopg2.sql for safe table name interpolation
+        query = sql.SQL("SELECT * FROM {table}").format(
+            table=sql.Identifier(table_name)
+        )
 
-    cur.execute(query)
-    rows = cur.fetchall()
+        cur.execute(query)
+        rows = cur.fetchall()
 
-    cur.close()
+        cur.close()
     return rows
 
 def fetch_todays_articles():
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT article_id, title, content, url, published_at
-        FROM news_articles
-        WHERE DATE(published_at) = CURRENT_DATE;
-    """)
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT article_id, title, content, url, published_at
+            FROM news_articles
+            -- range predicate, so the published_at index can be used
+            WHERE published_at >= CURRENT_DATE
+              AND published_at < CURRENT_DATE + INTERVAL '1 day';
+        """)
+        rows = cur.fetchall()
+        cur.close()
     return rows
 
 def fetch_article_by_id(article_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT article_id, title, content, url, published_at
-        FROM news_articles
-        WHERE article_id = %s;
-    """, (article_id,))
-    row = cur.fetchone()
-    cur.close()
-    conn.close()
-    return row
+    rows = fetch_articles_by_ids([article_id])
+    return rows[0] if rows else None
+
+def fetch_articles_by_ids(article_ids, published_at=None):
+    """
+    Rows (article_id, title, content, url, published_at) for `article_ids`,
+    in the order given (e.g. retrieval rank); ids that don't exist are left out.
+    published_at: the articles' publish times, parallel to article_ids; when
+    all are known only the partitions holding them are scanned.
+    Cached rows are served from the LRU, the rest in a single query; rows
+    whose content may still be replaced by the body fetcher are not cached.
+    """
+    article_ids = [int(a) for a in article_ids]
+    rows = article_cache.get_many(article_ids)
+    missing = list(dict.fromkeys(a for a in article_ids if a not in rows))
+
+    if missing:
+        dates = None
+        if published_at is not None and None not in published_at:
+            dates = sorted({d for a, d in zip(article_ids, published_at) if a not in rows})
+        with db_connection() as conn:
+            cur = conn.cursor()
+            if dates:
+                cur.execute(f"""
+                    SELECT article_id, title, content, url, published_at, {CONTENT_FINAL_SQL}
+                    FROM news_articles
+                    WHERE article_id = ANY(%s) AND published_at = ANY(%s);
+                """, (missing, dates))
+            else:
+                cur.execute(f"""
+                    SELECT article_id, title, content, url, published_at, {CONTENT_FINAL_SQL}
+                    FROM news_articles
+                    WHERE article_id = ANY(%s);
+                """, (missing,))
+            fetched = {row[0]: row for row in cur.fetchall()}
+            cur.close()
+        article_cache.put_many({a: row[:5] for a, row in fetched.items() if row[5]})
+        rows.update((a, row[:5]) for a, row in fetched.items())
+
+    return [rows[a] for a in article_ids if a in rows]
+
+
+def fetch_articles_without_body(limit=200):
+    """
+    (article_id, published_at, url, content) of cluster representatives whose
+    page has not been fetched yet, newest first; articles backing off after
+    a failed fetch wait until their body_retry_at.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT article_id, published_at, url, content
+            FROM news_articles
+            WHERE body_fetched_at IS NULL
+              AND (body_retry_at IS NULL OR body_retry_at <= now())
+              AND url IS NOT NULL
+              AND (cluster_id IS NULL OR cluster_id = article_id)
+            ORDER BY published_at DESC
+            LIMIT %s;
+        """, (limit,))
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+def fetch_labeled_articles(min_confidence=0.0, limit=20000):
+    """
+    (title, content, category_name) of articles the LLM categorized, newest
+    first. Fast-path labels are left out so the classifier never learns from
+    its own predictions.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT a.title, a.content, c.category_name
+            FROM news_articles a
+            JOIN categories c ON c.category_id = a.category_id
+            WHERE a.category_source = 'llm'
+              AND a.llm_confidence >= %s
+            ORDER BY a.article_id DESC
+            LIMIT %s;
+        """, (min_confidence, limit))
+        rows = cur.fetchall()
+        cur.close()
+    return rows
+
+
+def fetch_articles_after(after_id=0, limit=ITERSIZE):
+    """
+    One keyset page: up to `limit` articles with an id above `after_id`,
+    oldest first, as Article records. Near-duplicates are left out: only a
+    cluster's representative is embedded.
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT article_id, title, content, url, published_at
+            FROM news_articles
+            WHERE article_id > %s
+              AND (cluster_id IS NULL OR cluster_id = article_id)
+            ORDER BY article_id
+            LIMIT %s;
+        """, (after_id, limit))
+        rows = [Article._make(row) for row in cur.fetchall()]
+        cur.close()
+    return rows
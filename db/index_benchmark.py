@@ -0,0 +1,90 @@
+import sys
+import time
+
+import faiss
+import numpy as np
+
+from db.faiss_index import (HNSW_EF_SEARCH, IVF_NPROBE, choose_index_type, new_index,
+                            train_index, tune_for_search, TRAIN_SAMPLE)
+
+# Recall vs latency of the index tiers in db/faiss_index.py on a synthetic corpus.
+#   python -m db.index_benchmark [n_vectors] [dim]
+DIM = 384              # all-MiniLM-L6-v2
+N_VECTORS = 200_000
+N_QUERIES = 200
+N_TOPICS = 500         # clusters in the synthetic corpus, like stories covered by many feeds
+K = 10
+EF_SEARCH_SWEEP = (16, 32, 64, 128, 256)
+NPROBE_SWEEP = (1, 4, 16, 64)
+
+
+def synthetic_corpus(n, dim, n_queries=N_QUERIES, n_topics=N_TOPICS, seed=0):
+    """
+    Unit vectors scattered around random topic centers, roughly how sentence
+    embeddings of news clump. Queries are drawn from the same distribution.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_topics, dim)).astype(np.float32)
+    points = centers[rng.integers(n_topics, size=n + n_queries)]
+    points += 0.6 * rng.normal(size=points.shape).astype(np.float32)
+    points /= np.linalg.norm(points, axis=1, keepdims=True)
+    return np.ascontiguousarray(points[:n]), np.ascontiguousarray(points[n:])
+
+
+def recall_at_k(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+
+def measure(index, queries, truth, k=K):
+    """(recall@k, p50 ms, p95 ms), one query at a time like retrieve_articles."""
+    threads = faiss.omp_get_max_threads()
+    faiss.omp_set_num_threads(1)  # per-query latency, not throughput
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, rows = index.search(query[None, :], k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(rows[0])
+    faiss.omp_set_num_threads(threads)
+    return recall_at_k(found, truth), np.percentile(latencies, 50), np.percentile(latencies, 95)
+
+
+def build(index_type, corpus):
+    start = time.perf_counter()
+    index = new_index(corpus.shape[1], index_type, n_vectors=len(corpus))
+    if not index.is_trained:
+        sample = corpus[np.random.default_rng(1).choice(len(corpus), min(len(corpus), TRAIN_SAMPLE), replace=False)]
+        train_index(index, sample)
+    index.add(corpus)
+    return index, time.perf_counter() - start
+
+
+def run_benchmark(n=N_VECTORS, dim=DIM):
+    corpus, queries = synthetic_corpus(n, dim)
+    print(f"📊 {n} vectors x {dim} dims, {len(queries)} queries, recall@{K} "
+          f"(auto picks: {choose_index_type(n)})")
+
+    exact, build_s = build("flat", corpus)
+    _, truth = exact.search(queries, K)
+    _, p50, p95 = measure(exact, queries, truth)
+    print(f"{'index':<8}{'param':<14}{'build s':>9}{'recall':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    print(f"{'flat':<8}{'-':<14}{build_s:>9.1f}{1.0:>9.3f}{p50:>9.3f}{p95:>9.3f}")
+
+    hnsw, build_s = build("hnsw", corpus)
+    for ef in EF_SEARCH_SWEEP:
+        recall, p50, p95 = measure(tune_for_search(hnsw, ef_search=ef), queries, truth)
+        mark = " *" if ef == HNSW_EF_SEARCH else ""
+        print(f"{'hnsw':<8}{f'efSearch={ef}':<14}{build_s:>9.1f}{recall:>9.3f}{p50:>9.3f}{p95:>9.3f}{mark}")
+
+    if choose_index_type(n, "ivfpq") == "ivfpq":
+        ivfpq, build_s = build("ivfpq", corpus)
+        for nprobe in NPROBE_SWEEP:
+            recall, p50, p95 = measure(tune_for_search(ivfpq, nprobe=nprobe), queries, truth)
+            mark = " *" if nprobe == IVF_NPROBE else ""
+            print(f"{'ivfpq':<8}{f'nprobe={nprobe}':<14}{build_s:>9.1f}{recall:>9.3f}{p50:>9.3f}{p95:>9.3f}{mark}")
+    print("* current default")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:3]]
+    run_benchmark(*args)
@@ -1,137 +1,334 @@
-from db.connection import get_connection
+from db.connection import db_connection
+from db.fetch import article_cache
+from db.categorize_queue import enqueue_categorize_jobs
+from db.simhash import CLUSTER_WINDOW, match_distance, simhash, simhash_index
+from psycopg2.extras import execute_values
 import csv
 
+BULK_PAGE_SIZE = 1000  # rows per INSERT statement in insert_articles_bulk
+
+
+
+
+def save_category(article_id, category_name, confidence, source="llm", published_at=None):
+    """
+    source: "llm", or "fast" when the local classifier decided (its probability is then not stored as llm_confidence)
+    published_at: the article's publish time, so only the partitions holding it and its near-duplicates are scanned
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        # Ensure category exists
+        cur.execute("SELECT category_id FROM categories WHERE category_name = %s", (category_name,))
+        row = cur.fetchone()
+        if row:
+            category_id = row[0]
+        else:
+            cur.execute("INSERT INTO categories (category_name) VALUES (%s) RETURNING category_id;", (category_name,))
+            category_id = cur.fetchone()[0]
+
+        print(row)
+        print(category_id)
+        print(category_name)
+        print(confidence)
+
+        # Update article with classification, and the near-duplicates it represents
+        # (published within CLUSTER_WINDOW of it, see db/simhash.py)
+        window = ""
+        if published_at is not None:
+            window = cur.mogrify("AND published_at BETWEEN %s AND %s",
+                (published_at - CLUSTER_WINDOW, published_at + CLUSTER_WINDOW)).decode()
+        cur.execute(f"""
+            UPDATE news_articles
+            SET category_id = %s, category_source = %s, categorized_at = now(),
+                llm_confidence = CASE WHEN %s = 'llm' THEN %s END,
+                fast_confidence = CASE WHEN %s = 'fast' THEN %s END
+            WHERE (article_id = %s OR cluster_id = %s) {window}
+        """, (category_id, source, source, confidence, source, confidence, article_id, article_id))
+        cur.execute("DELETE FROM categorize_jobs WHERE article_id = %s;", (article_id,))
+
+        conn.commit()
+        cur.close()
 
 
 
-def save_category(article_id, category_name, confidence):
-    # Create a cursor
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # Ensure category exists
-    cur.execute("SELECT category_id FROM categories WHERE category_name = %s", (category_name,))
-    row = cur.fetchone()
-    if row:
-        category_id = row[0]
-    else:
-        cur.execute("INSERT INTO categories (category_name) VALUES (%s) RETURNING category_id;", (category_name,))
-        category_id = cur.fetchone()[0]
-
-    print(row)
-    print(category_id)
-    print(category_name)
-    print(confidence)
-
-    # Update article with classification
-    cur.execute("""
-        UPDATE news_articles
-        SET category_id = %s, llm_confidence = %s
-        WHERE article_id = %s
-    """, (category_id, confidence, article_id))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+def save_categories_bulk(results):
+    """
+    Writes many categorizations in one transaction. Near-duplicates of an
+    article (same cluster_id) get the same category.
+    results: iterable of (article_id, category_name, confidence, source, published_at),
+             source "llm" or "fast", published_at None when unknown (see save_category)
+    """
+    results = list(results)
+    if not results:
+        return 0
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        # Ensure every category exists, then resolve all ids at once
+        names = sorted({name for _, name, *_ in results})
+        execute_values(cur,
+            "INSERT INTO categories (category_name) VALUES %s ON CONFLICT (category_name) DO NOTHING;",
+            [(name,) for name in names])
+        cur.execute("SELECT category_name, category_id FROM categories WHERE category_name = ANY(%s);", (names,))
+        category_ids = dict(cur.fetchall())
+
+        # With every publish time known, the constant range lets Postgres prune
+        # the UPDATE to the partitions around the batch
+        window = ""
+        dates = [published_at for *_, published_at in results]
+        if None not in dates:
+            window = cur.mogrify("AND a.published_at BETWEEN %s AND %s",
+                (min(dates) - CLUSTER_WINDOW, max(dates) + CLUSTER_WINDOW)).decode()
+        execute_values(cur, f"""
+            UPDATE news_articles AS a
+            SET category_id = v.category_id, category_source = v.source, categorized_at = now(),
+                llm_confidence = CASE WHEN v.source = 'llm' THEN v.confidence END,
+                fast_confidence = CASE WHEN v.source = 'fast' THEN v.confidence END
+            FROM (VALUES %s) AS v(article_id, category_id, confidence, source, published_at)
+            WHERE (a.article_id = v.article_id OR a.cluster_id = v.article_id)
+              AND (v.published_at IS NULL OR a.published_at
+                   BETWEEN v.published_at::timestamp - make_interval(secs => {CLUSTER_WINDOW.total_seconds()})
+                       AND v.published_at::timestamp + make_interval(secs => {CLUSTER_WINDOW.total_seconds()}))
+              {window};
+        """, [
+            (article_id, category_ids[name], float(confidence), source, published_at)
+            for article_id, name, confidence, source, published_at in results
+        ], page_size=BULK_PAGE_SIZE)
+
+        # Categorized articles leave the work queue in the same transaction
+        cur.execute("DELETE FROM categorize_jobs WHERE article_id = ANY(%s);",
+            ([article_id for article_id, *_ in results],))
+
+        conn.commit()
+        cur.close()
+    return len(results)
+
+
+def save_article_bodies(results):
+    """
+    Marks articles as body-fetched, replacing their content with the page text.
+    results: iterable of (article_id, published_at, body), body None to keep
+             the current content (page unavailable or shorter than the summary)
+    Articles whose content changed are queued for categorization again (it
+    was decided on the summary) in the same transaction; re-embedding them is
+    up to the caller (db/vector_db.py reindex_in_vector_db).
+    """
+    results = list(results)
+    if not results:
+        return 0
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+        execute_values(cur, """
+            UPDATE news_articles AS a
+            SET content = COALESCE(v.body, a.content), body_fetched_at = now(), body_retry_at = NULL,
+                content_updated_at = CASE WHEN v.body IS NULL THEN a.content_updated_at ELSE now() END
+            FROM (VALUES %s) AS v(article_id, published_at, body)
+            WHERE a.article_id = v.article_id AND a.published_at = v.published_at;
+        """, results, page_size=BULK_PAGE_SIZE)
+        enqueue_categorize_jobs(cur, [
+            (article_id, published_at) for article_id, published_at, body in results if body is not None
+        ])
+        conn.commit()
+        cur.close()
 
+    article_cache.invalidate([article_id for article_id, _, _ in results])
+    return len(results)
+
+
+def save_body_fetch_errors(articles, max_attempts, retry_base_seconds):
+    """
+    Records a failed body fetch for (article_id, published_at) pairs: the
+    article is retried after retry_base_seconds * 2**(attempts - 1), and
+    after `max_attempts` failures it keeps its summary for good.
+    """
+    articles = list(articles)
+    if not articles:
+        return 0
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+        retry = cur.mogrify("""
+            body_fetch_attempts = a.body_fetch_attempts + 1,
+            body_retry_at = now() + make_interval(secs => %s * 2 ^ a.body_fetch_attempts),
+            body_fetched_at = CASE WHEN a.body_fetch_attempts + 1 >= %s THEN now() END
+        """, (retry_base_seconds, max_attempts)).decode()
+        execute_values(cur, f"""
+            UPDATE news_articles AS a
+            SET {retry}
+            FROM (VALUES %s) AS v(article_id, published_at)
+            WHERE a.article_id = v.article_id AND a.published_at = v.published_at;
+        """, articles, page_size=BULK_PAGE_SIZE)
+        conn.commit()
+        cur.close()
+    return len(articles)
 
 
 def insert_articles(source,url,title,link,published,summary):
-    conn = get_connection()
-    cur = conn.cursor()
-
-    # Ensure dummy source exists"
-
-    cur.execute("INSERT INTO news_sources (source_name, source_url) VALUES (%s, %s) ON CONFLICT DO NOTHING;",
-        (source, url))
-    conn.commit()
-    cur.execute("SELECT article_id FROM news_articles WHERE url = %s;", (link,))
-    existing = cur.fetchone()
-    if existing:
+    # Single-entry convenience wrapper, returns the new article_id or None on duplicate
+    result = insert_articles_bulk([(source, url, title, link, published, summary)])
+    if not result["inserted"]:
         print(f"⚠️ Duplicate found, skipping: {title}")
+        return None
+    return result["inserted"][0]
+
+
+def insert_articles_bulk(entries):
+    """
+    Inserts a batch of feed entries in a handful of round trips and one commit.
+    entries: iterable of (source, url, title, link, published, summary) tuples,
+             i.e. the same fields insert_articles takes.
+    Returns {"inserted": [article_id, ...], "skipped": [link, ...]} where skipped
+    holds links already stored (or repeated within the batch).
+    """
+    rows, skipped = {}, []
+    for entry in entries:
+        link = entry[3]
+        if link in rows:
+            skipped.append(link)
+        else:
+            rows[link] = entry
+    if not rows:
+        return {"inserted": [], "skipped": skipped}
+    # What each article's SimHash fingerprint is computed from
+    texts = {link: f"{title}\n{summary or ''}" for _, _, title, link, _, summary in rows.values()}
+
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        # Resolve every source of the batch at once
+        sources = {}
+        for source, url, *_ in rows.values():
+            sources.setdefault(source, url)
+        execute_values(cur,
+            "INSERT INTO news_sources (source_name, source_url) VALUES %s ON CONFLICT (source_name) DO NOTHING;",
+            list(sources.items()))
+        cur.execute("SELECT source_name, source_id FROM news_sources WHERE source_name = ANY(%s);",
+            (list(sources),))
+        source_ids = dict(cur.fetchall())
+
+        # Set-based dedupe: a url is claimed in article_urls (unique across all
+        # partitions of news_articles); only newly claimed urls are inserted
+        returned = execute_values(cur, """
+            WITH incoming (source_id, title, content, url, published_at, fingerprint) AS (VALUES %s),
+            claimed AS (
+                INSERT INTO article_urls (url)
+                SELECT url FROM incoming
+                ON CONFLICT (url) DO NOTHING
+                RETURNING url
+            )
+            INSERT INTO news_articles (source_id, title, content, url, published_at, fingerprint)
+            SELECT i.source_id, i.title, i.content, i.url, i.published_at::timestamp, i.fingerprint::bigint
+            FROM incoming i
+            JOIN claimed c ON c.url = i.url
+            RETURNING article_id, url, published_at, fingerprint;
+        """, [
+            (source_ids[source], title, summary, link, published, simhash(texts[link]))
+            for source, url, title, link, published, summary in rows.values()
+        ], page_size=BULK_PAGE_SIZE, fetch=True)
+
+        # Near-duplicates join the cluster of the first copy of the story and
+        # inherit its category, so only representatives are categorized/embedded
+        duplicates = 0
+        if returned:
+            order = {link: i for i, link in enumerate(rows)}
+            returned.sort(key=lambda r: order[r[1]])
+            clusters = simhash_index.assign(cur, [
+                (article_id, fp, published_at, match_distance(texts[link]))
+                for article_id, link, published_at, fp in returned
+            ])
+            duplicates = sum(cluster_id != article_id for article_id, (cluster_id, _) in clusters.items())
+            execute_values(cur, """
+                UPDATE news_articles AS a
+                SET cluster_id = v.cluster_id,
+                    category_id = r.category_id,
+                    category_source = r.category_source,
+                    llm_confidence = r.llm_confidence,
+                    fast_confidence = r.fast_confidence
+                FROM (VALUES %s) AS v(article_id, published_at, cluster_id, cluster_published_at)
+                LEFT JOIN news_articles r ON r.article_id = v.cluster_id AND r.published_at = v.cluster_published_at
+                                         AND r.article_id <> v.article_id
+                WHERE a.article_id = v.article_id AND a.published_at = v.published_at;
+            """, [
+                (article_id, published_at, *clusters[article_id])
+                for article_id, _, published_at, _ in returned
+            ], page_size=BULK_PAGE_SIZE)
+
+            # Representatives still need a category: queue them in the same
+            # transaction, so an article is never stored without its job
+            enqueue_categorize_jobs(cur, [
+                (article_id, published_at)
+                for article_id, _, published_at, _ in returned if clusters[article_id][0] == article_id
+            ])
+
+        conn.commit()
         cur.close()
-        conn.close()
-        return None  # No new insert
-    cur.execute("""
-        INSERT INTO news_articles (source_id, title, content, url, published_at)
-        VALUES (
-            (SELECT source_id FROM news_sources WHERE source_name=%s),
-            %s, %s, %s, %s
-        ) RETURNING article_id;
-    """, (
-        source,
-        title,
-        summary,
-        link,
-        published
-    ))
-
-    article_id = cur.fetchone()[0]
-
-    conn.commit()
-    cur.close()
-    conn.close()
-    return article_id
+
+    inserted_urls = {url for _, url, _, _ in returned}
+    skipped.extend(link for link in rows if link not in inserted_urls)
+    if duplicates:
+        print(f"🧬 {duplicates} near-duplicate articles joined existing clusters")
+    return {"inserted": [article_id for article_id, _, _, _ in returned], "skipped": skipped}
 
 
 def all_insertion():
-    # Create a cursor
-    conn = get_connection()
-    cur = conn.cursor()
-    # Example INSERTS
-    insert_queries = [
-        # Insert into news_sources
-        ("INSERT INTO news_sources (source_name, source_url) VALUES (%s, %s)",
-        ("Moneycontrol", "https://www.moneycontrol.com")),
+    with db_connection() as conn:
+        cur = conn.cursor()
+        # Example INSERTS
+        insert_queries = [
+            # Insert into news_sources
+            ("INSERT INTO news_sources (source_name, source_url) VALUES (%s, %s)",
+            ("Moneycontrol", "https://www.moneycontrol.com")),
 
-        ("INSERT INTO news_sources (source_name, source_url) VALUES (%s, %s)",
-        ("CNBC", "https://www.cnbc.com")),
+            ("INSERT INTO news_sources (source_name, source_url) VALUES (%s, %s)",
+            ("CNBC", "https://www.cnbc.com")),
 
-        # Insert into categories
-        ("INSERT INTO categories (category_name) VALUES (%s)",
-        ("Finance",)),
+            # Insert into categories
+            ("INSERT INTO categories (category_name) VALUES (%s)",
+            ("Finance",)),
 
-        ("INSERT INTO categories (category_name) VALUES (%s)",
-        ("Sports",)),
+            ("INSERT INTO categories (category_name) VALUES (%s)",
+            ("Sports",)),
 
-        ("INSERT INTO categories (category_name) VALUES (%s)",
-        ("Seasonal",)),
+            ("INSERT INTO categories (category_name) VALUES (%s)",
+            ("Seasonal",)),
 
-        # Insert into news_ratings
-        ("INSERT INTO news_ratings (source_id, category_id, rating) VALUES (%s, %s, %s)",
-        (1, 1, 7.5)),  # Moneycontrol, Finance
+            # Insert into news_ratings
+            ("INSERT INTO news_ratings (source_id, category_id, rating) VALUES (%s, %s, %s)",
+            (1, 1, 7.5)),  # Moneycontrol, Finance
 
-        ("INSERT INTO news_ratings (source_id, category_id, rating) VALUES (%s, %s, %s)",
-        (2, 2, 6.0)),  # CNBC, Sports
+            ("INSERT INTO news_ratings (source_id, category_id, rating) VALUES (%s, %s, %s)",
+            (2, 2, 6.0)),  # CNBC, Sports
 
-        # Insert into predictions
-        ("INSERT INTO predictions (source_id, category_id, stock_symbol, target_date) VALUES (%s, %s, %s, %s)",
-        (1, 1, "TCS", "2025-10-05")),
+            # Insert into predictions
+            ("INSERT INTO predictions (source_id, category_id, stock_symbol, target_date) VALUES (%s, %s, %s, %s)",
+            (1, 1, "TCS", "2025-10-05")),
 
-        # Insert into feedback
-        ("INSERT INTO feedback (prediction_id, user_id, outcome, rating) VALUES (%s, %s, %s, %s)",
-        (1, "user123", "Correct", 5)),
+            # Insert into feedback
+            ("INSERT INTO feedback (prediction_id, user_id, outcome, rating) VALUES (%s, %s, %s, %s)",
+            (1, "user123", "Correct", 5)),
 
-        # Insert into prediction_sources
-        ("INSERT INTO prediction_sources (prediction_id, source_id, article_url, article_title, source_rating, llm_confidence, weight) VALUES (%s, %s, %s, %s, %s, %s, %s)",
-        (1, 1, "https://moneycontrol.com/article", "TCS predicted to rise", 7.5, 0.85, 0.7)),
+            # Insert into prediction_sources
+            ("INSERT INTO prediction_sources (prediction_id, source_id, article_url, article_title, source_rating, llm_confidence, weight) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+            (1, 1, "https://moneycontrol.com/article", "TCS predicted to rise", 7.5, 0.85, 0.7)),
 
-        # Insert into agent_logs
-        ("INSERT INTO agent_logs (node_name, message) VALUES (%s, %s)",
-        ("PredictionNode", '{"event": "prediction_created", "prediction_id": 1}'))
-    ]
+            # Insert into agent_logs
+            ("INSERT INTO agent_logs (node_name, message) VALUES (%s, %s)",
+            ("PredictionNode", '{"event": "prediction_created", "prediction_id": 1}'))
+        ]
 
-    # Execute inserts
-    for query, data in insert_queries:
-        cur.execute(query, data)
+        # Execute inserts
+        for query, data in insert_queries:
+            cur.execute(query, data)
 
-    # Commit changes
-    conn.commit()
+        # Commit changes
+        conn.commit()
 
-    print("✅ Sample data inserted successfully!")
+        print("✅ Sample data inserted successfully!")
 
-    cur.close()
-    conn.close()
+        cur.close()
 
 if __name__ == "__main__":
     all_insertion()
\ No newline at end of file
@@ -0,0 +1,141 @@
+import os
+from datetime import date, datetime, timedelta
+from psycopg2 import sql
+from db.connection import db_connection
+
+# news_articles is range partitioned on published_at (see migration 5 in db/creation.py)
+PARENT = "news_articles"
+DEFAULT_PARTITION = "news_articles_default"
+PARTITION_PREFIX = "news_articles_p"
+ARCHIVE_PREFIX = "archived_news_articles_p"
+PARTITION_GRANULARITY = os.getenv("partition_granularity", "day")  # "day" or "week"; pick once, before data arrives
+PERIODS_AHEAD = 3                                                  # partitions created in advance
+RETENTION_DAYS = int(os.getenv("article_retention_days", 180))
+
+
+def _period_length():
+    return timedelta(days=7 if PARTITION_GRANULARITY == "week" else 1)
+
+
+def _period_start(day):
+    if PARTITION_GRANULARITY == "week":
+        return day - timedelta(days=day.weekday())  # weeks start on Monday
+    return day
+
+
+def _is_partitioned(cur):
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (PARENT,))
+    row = cur.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def _partitions(cur):
+    """{period start: partition name} of the attached range partitions."""
+    cur.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s);
+    """, (PARENT,))
+    partitions = {}
+    for (name,) in cur.fetchall():
+        if name.startswith(PARTITION_PREFIX):
+            partitions[datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m%d").date()] = name
+    return partitions
+
+
+def _create_partition(cur, start):
+    """
+    Creates the partition for [start, start + period), moving any rows that
+    already landed in the default partition for that range, then attaches it.
+    """
+    end = start + _period_length()
+    name = f"{PARTITION_PREFIX}{start:%Y%m%d}"
+    cur.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS);").format(
+        sql.Identifier(name), sql.Identifier(PARENT)))
+    cur.execute(sql.SQL("""
+        WITH moved AS (
+            DELETE FROM {default} WHERE published_at >= %s AND published_at < %s RETURNING *
+        )
+        INSERT INTO {partition} SELECT * FROM moved;
+    """).format(default=sql.Identifier(DEFAULT_PARTITION), partition=sql.Identifier(name)),
+        (start, end))
+    cur.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s);").format(
+        sql.Identifier(PARENT), sql.Identifier(name)), (start.isoformat(), end.isoformat()))
+    print(f"🗂️ Created partition {name} [{start}, {end})")
+
+
+def ensure_partitions(periods_ahead=PERIODS_AHEAD, retention_days=RETENTION_DAYS):
+    """
+    Makes sure partitions exist for the current period and `periods_ahead`
+    upcoming ones, and for any period (within retention) whose rows ended
+    up in the default partition, e.g. late or back-dated feed entries.
+    """
+    today = date.today()
+    cutoff = today - timedelta(days=retention_days)
+    with db_connection() as conn:
+        cur = conn.cursor()
+        if not _is_partitioned(cur):
+            cur.close()
+            return
+        existing = _partitions(cur)
+
+        wanted = {_period_start(today + _period_length() * k) for k in range(periods_ahead + 1)}
+        cur.execute(sql.SQL("SELECT DISTINCT published_at::date FROM {} WHERE published_at >= %s;").format(
+            sql.Identifier(DEFAULT_PARTITION)), (cutoff,))
+        wanted |= {_period_start(day) for (day,) in cur.fetchall()}
+
+        for start in sorted(wanted - set(existing)):
+            _create_partition(cur, start)
+            conn.commit()
+        cur.close()
+
+
+def detach_old_partitions(retention_days=RETENTION_DAYS, drop=False):
+    """
+    Retention: partitions entirely older than `retention_days` are detached
+    from news_articles (so scans and vacuum never see them again) and either
+    kept as archived_news_articles_p<date> tables or dropped. Their articles
+    are deleted from the vector DB first, so retrieval never returns ids
+    that are gone from news_articles.
+    """
+
+    cutoff = date.today() - timedelta(days=retention_days)
+    detached = []
+    with db_connection() as conn:
+        cur = conn.cursor()
+        if not _is_partitioned(cur):
+            cur.close()
+            return detached
+
+        for start, name in sorted(_partitions(cur).items()):
+            if start + _period_length() > cutoff:
+                break
+            cur.execute(sql.SQL("SELECT article_id FROM {};").format(sql.Identifier(name)))
+            article_ids = [article_id for (article_id,) in cur.fetchall()]
+            if article_ids:
+                from db.vector_db import delete_from_vector_db  # loads FAISS and the embedder
+                delete_from_vector_db(article_ids)
+            cur.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {};").format(
+                sql.Identifier(PARENT), sql.Identifier(name)))
+            if drop:
+                cur.execute(sql.SQL("DROP TABLE {};").format(sql.Identifier(name)))
+            else:
+                cur.execute(sql.SQL("ALTER TABLE {} RENAME TO {};").format(
+                    sql.Identifier(name), sql.Identifier(f"{ARCHIVE_PREFIX}{start:%Y%m%d}")))
+            conn.commit()
+            detached.append(name)
+        cur.close()
+
+    if detached:
+        print(f"📦 {'Dropped' if drop else 'Archived'} {len(detached)} partitions older than {cutoff}")
+    return detached
+
+
+def maintain_partitions():
+    ensure_partitions()
+    detach_old_partitions()
+
+
+if __name__ == "__main__":
+    maintain_partitions()
@@ -0,0 +1,78 @@
+import threading
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+from db.connection import db_connection, get_connection
+
+RATINGS_CHANNEL = "news_ratings_changed"
+DEFAULT_RATING = 5.0  # news_ratings.rating default: neutral 5/10
+
+
+def notify_ratings_changed(cur):
+    """Call inside any transaction that writes news_ratings; delivered on commit."""
+    cur.execute(f"NOTIFY {RATINGS_CHANNEL};")
+
+
+class RatingCache:
+    """
+    Process-local (source_id, category_id) -> rating map, loaded with one query.
+    A dedicated connection LISTENs on RATINGS_CHANNEL; every lookup polls it
+    without a round trip (it only reads what the server already pushed), and
+    the map is reloaded once after any rating write has committed.
+    """
+
+    def __init__(self):
+        self._ratings = None
+        self._listener = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _listen(self):
+        conn = get_connection()
+        conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {RATINGS_CHANNEL};")
+        self._listener = conn
+
+    def _invalidated(self):
+        try:
+            self._listener.poll()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # Lost the listener: notifications may have been missed, so reload
+            self._listener = None
+            return True
+        if self._listener.notifies:
+            self._listener.notifies.clear()
+            return True
+        return False
+
+    def _ensure_fresh(self):
+        with self._lock:
+            if self._listener is None:
+                self._listen()  # listen before loading so no write slips in between
+                self._ratings = None
+            elif self._invalidated():
+                self._ratings = None
+                if self._listener is None:
+                    self._listen()
+
+            if self._ratings is None:
+                with db_connection() as conn:
+                    cur = conn.cursor()
+                    cur.execute("SELECT source_id, category_id, rating FROM news_ratings;")
+                    self._ratings = {(s, c): r for s, c, r in cur.fetchall()}
+                    cur.close()
+                self.reloads += 1
+            return self._ratings
+
+    def get(self, source_id, category_id, default=DEFAULT_RATING):
+        return self._ensure_fresh().get((source_id, category_id), default)
+
+    def get_many(self, pairs, default=DEFAULT_RATING):
+        """Ratings for a list of (source_id, category_id) pairs, in order."""
+        ratings = self._ensure_fresh()
+        return [ratings.get(pair, default) for pair in pairs]
+
+
+rating_cache = RatingCache()
@@ -0,0 +1,140 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+
+
+# Near-duplicate detection for syndicated stories (same wire copy on several feeds).
+# Two articles are the same story when the 64-bit SimHashes of their text differ
+# in at most MAX_DISTANCE bits. Splitting the fingerprint into MAX_DISTANCE + 1
+# bands guarantees (pigeonhole) that such a pair agrees exactly on one band, so
+# a lookup only compares against the few fingerprints sharing a band value.
+#
+# A false match is silent data loss (the article is never categorized, embedded
+# or body-fetched), a missed one only costs an extra LLM call, so the threshold
+# is tight: over a bag of words, one changed token in an 8-word headline
+# ("Sensex rises 120 points..." vs "... 512 points...") lands within 7 bits a
+# third of the time, within 3 bits 2% of the time. Texts shorter than
+# MIN_FUZZY_TOKENS (bare templated headlines) only match an identical bag of words.
+FINGERPRINT_BITS = 64
+MAX_DISTANCE = int(os.getenv("simhash_max_distance", 3))  # unrelated texts differ in ~32 bits
+BANDS = MAX_DISTANCE + 1
+SHINGLE_SIZE = 1            # word n-grams hashed; longer ones push small wire-copy edits past MAX_DISTANCE
+MIN_FUZZY_TOKENS = 20
+LOOKBACK_DAYS = 3           # syndicated copies show up within days of each other
+CLUSTER_WINDOW = timedelta(days=LOOKBACK_DAYS)  # members are published this close to their representative
+RELOAD_SECONDS = 600        # picks up articles inserted by other processes
+_MASK = (1 << FINGERPRINT_BITS) - 1
+_TOKEN = re.compile(r"\w+")
+
+
+def _tokens(text):
+    return _TOKEN.findall(text.lower())
+
+
+def simhash(text):
+    """64-bit SimHash of `text` as a signed int (fits a Postgres BIGINT)."""
+    tokens = _tokens(text)
+    if len(tokens) >= SHINGLE_SIZE:
+        features = [" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    else:
+        features = tokens or [""]
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "little") for f in features],
+        dtype=np.uint64,
+    )
+    # Bitwise majority vote over all feature hashes
+    bits = np.unpackbits(hashes.view(np.uint8)).reshape(len(hashes), FINGERPRINT_BITS)
+    majority = (2 * bits.sum(axis=0, dtype=np.int64) > len(hashes)).astype(np.uint8)
+    return int(np.packbits(majority).view(np.int64)[0])
+
+
+def match_distance(text, max_distance=MAX_DISTANCE):
+    """Largest SimHash distance at which `text` may join a cluster: 0 for short texts."""
+    return max_distance if len(_tokens(text)) >= MIN_FUZZY_TOKENS else 0
+
+
+def hamming(a, b):
+    return ((a ^ b) & _MASK).bit_count()
+
+
+def _bands(fingerprint):
+    unsigned = fingerprint & _MASK
+    width = -(-FINGERPRINT_BITS // BANDS)
+    return [(band, (unsigned >> (band * width)) & ((1 << width) - 1)) for band in range(BANDS)]
+
+
+class SimHashIndex:
+    """
+    In-memory LSH index of recent fingerprints -> cluster, loaded from
+    news_articles (last LOOKBACK_DAYS) and kept current with this process's
+    inserts; reloaded every RELOAD_SECONDS so it stays bounded and sees other
+    writers. An article only joins a cluster whose representative was
+    published within CLUSTER_WINDOW of it, so cluster-wide updates can be
+    limited to a few partitions of news_articles.
+    """
+
+    def __init__(self, max_distance=MAX_DISTANCE, lookback_days=LOOKBACK_DAYS):
+        self.max_distance = max_distance
+        self.lookback_days = lookback_days
+        self._buckets = defaultdict(list)
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _load(self, cur):
+        cur.execute("""
+            SELECT a.fingerprint, a.cluster_id, r.published_at
+            FROM news_articles a
+            JOIN news_articles r ON r.article_id = a.cluster_id
+             AND r.published_at >= now() - make_interval(days => %s) - %s
+            WHERE a.published_at >= now() - make_interval(days => %s)
+              AND a.fingerprint IS NOT NULL;
+        """, (self.lookback_days, CLUSTER_WINDOW, self.lookback_days))
+        rows = cur.fetchall()
+        self._buckets = defaultdict(list)
+        for fingerprint, cluster_id, cluster_published_at in rows:
+            self._add(fingerprint, (cluster_id, cluster_published_at))
+        self._loaded_at = time.monotonic()
+
+    def _add(self, fingerprint, cluster):
+        for band in _bands(fingerprint):
+            self._buckets[band].append((fingerprint, cluster))
+
+    def _find(self, fingerprint, published_at, max_distance):
+        best, best_distance = None, min(max_distance, self.max_distance) + 1
+        for band in _bands(fingerprint):
+            for candidate, cluster in self._buckets.get(band, ()):
+                if abs(published_at - cluster[1]) > CLUSTER_WINDOW:
+                    continue
+                distance = hamming(fingerprint, candidate)
+                if distance < best_distance:
+                    best, best_distance = cluster, distance
+        return best
+
+    def assign(self, cur, articles):
+        """
+        articles: (article_id, fingerprint, published_at, max distance, see
+        match_distance) in insertion order; `cur` is the inserting
+        transaction's cursor, used when the index (re)loads.
+        Returns {article_id: (cluster_id, representative's published_at)}: the
+        cluster of the closest known near-duplicate, or the article itself
+        when it starts a new cluster.
+        """
+        clusters = {}
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at > RELOAD_SECONDS:
+                self._load(cur)
+            for article_id, fingerprint, published_at, max_distance in articles:
+                cluster = self._find(fingerprint, published_at, max_distance) or (article_id, published_at)
+                self._add(fingerprint, cluster)
+                clusters[article_id] = cluster
+        return clusters
+
+
+simhash_index = SimHashIndex()
@@ -1,51 +1,365 @@
 
+import json
+import os
+import threading
 from datetime import datetime
-from db.fetch import fetch_todays_articles
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+
+import faiss
+import numpy as np
+
+from db.fetch import fetch_articles_after, fetch_articles_by_ids
+from db.faiss_index import (INDEX_TYPE, TRAIN_SAMPLE, choose_index_type, index_type_of,
+                            live_search_params, new_index, train_index, tune_for_search)
+from embedding_node import embedder
+from file_lock import FileLock
+
+INDEX_PATH = "./vector_store/faiss_index"
+INDEX_FILE = os.path.join(INDEX_PATH, "vectors.faiss")   # raw FAISS index, no docstore
+ROW_IDS_FILE = os.path.join(INDEX_PATH, "row_ids.npy")   # int64 FAISS row -> article_id, -1 = deleted
+ROW_DATES_FILE = os.path.join(INDEX_PATH, "row_dates.npy")  # FAISS row -> published_at (NaT = unknown),
+                                                            # so lookups only touch the article's partition
+STATE_PATH = os.path.join(INDEX_PATH, "index_state.json")
+LEGACY_FILES = ("index.faiss", "index.pkl")              # old LangChain layout (pickled docstore)
+EMBED_BATCH = 500        # articles embedded and appended per step
+COMPACT_RATIO = 0.2      # compact once deleted rows exceed this share of the index
+DELETED = -1
+
+# Writers (store, delete, compact/rebuild) run one at a time across processes;
+# readers need no lock, every file is replaced atomically
+index_lock = FileLock(os.path.join(INDEX_PATH, ".lock"))
+
+# Queries map the index and row ids instead of reading them into memory
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+def get_embeddings():
+    """
+    The shared embedder (see embedding_node.py): loaded once per process,
+    batched, and memoized by content hash so re-indexed articles are free.
+    """
+    return embedder
+
+
+def _load_state():
+    """
+    Sidecar state of the persistent index:
+      last_article_id -> high-water mark, everything up to it is indexed
+      tombstones      -> article ids deleted before they were indexed (skipped
+                         when the high-water mark reaches them); indexed ones
+                         are marked DELETED in row_ids instead
+      reindex         -> [article_id, published_at] of indexed articles whose
+                         text changed; their old rows are already DELETED and
+                         the next store appends them again
+    """
+    if os.path.exists(STATE_PATH):
+        with open(STATE_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {"last_article_id": 0, "tombstones": [], "reindex": []}
+
+
+def _save_state(state):
+    os.makedirs(INDEX_PATH, exist_ok=True)
+    tmp_path = f"{STATE_PATH}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def _read_index(mmap=False):
+    if mmap:
+        try:
+            return faiss.read_index(INDEX_FILE, MMAP_FLAGS)
+        except RuntimeError:
+            pass  # index type without mmap support, read it into memory
+    return faiss.read_index(INDEX_FILE)
+
+
+def _load_row_dates(row_ids, mmap_mode=None):
+    """published_at per row; NaT for rows indexed before row dates were recorded."""
+    if os.path.exists(ROW_DATES_FILE):
+        row_dates = np.load(ROW_DATES_FILE, mmap_mode=mmap_mode)
+        if len(row_dates) == len(row_ids):
+            return row_dates
+    return np.full(len(row_ids), np.datetime64("NaT"), dtype="datetime64[us]")
+
+
+def _datetimes(row_dates):
+    return [d.item() for d in row_dates]  # NaT -> None
+
+
+def _load_index():
+    """(index, row_ids, row_dates) for appending, or (None, None, None) when there is no index yet."""
+    if not os.path.exists(INDEX_FILE) or not os.path.exists(ROW_IDS_FILE):
+        return None, None, None
+    row_ids = np.load(ROW_IDS_FILE)
+    return _read_index(), row_ids, _load_row_dates(row_ids)
+
+
+def _save_index(index, row_ids, row_dates):
+    # Index first, row dates and ids next, state last: readers reload on the state file
+    os.makedirs(INDEX_PATH, exist_ok=True)
+    faiss.write_index(index, f"{INDEX_FILE}.tmp")
+    os.replace(f"{INDEX_FILE}.tmp", INDEX_FILE)
+    with open(f"{ROW_DATES_FILE}.tmp", "wb") as f:
+        np.save(f, np.asarray(row_dates, dtype="datetime64[us]"))
+    os.replace(f"{ROW_DATES_FILE}.tmp", ROW_DATES_FILE)
+    _save_row_ids(row_ids)
+
+
+def _save_row_ids(row_ids):
+    with open(f"{ROW_IDS_FILE}.tmp", "wb") as f:
+        np.save(f, np.asarray(row_ids, dtype=np.int64))
+    os.replace(f"{ROW_IDS_FILE}.tmp", ROW_IDS_FILE)
+
+
+def _texts(articles):
+    # Same text as before the layout change, so the embedding cache still hits
+    return [f"{a[1]}\n\n{a[2]}" for a in articles]
 
 
 def store_in_vector_db():
-    print(f"🚀 Storing today's articles in vector DB ({datetime.now().date()})")
-
-    articles = fetch_todays_articles()
-    if not articles:
-        print("No new articles found for today.")
-        return
-
-    # Using HuggingFace sentence transformer embeddings
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-
-    docs, metadatas = [], []
-    for article_id, title, content, url, published_at in articles:
-        text = f"{title}\n\n{content}"
-        docs.append(text)
-        metadatas.append({
-            "article_id": article_id,
-            "title": title,
-            "url": url,
-            "published_at": str(published_at)
-        })
-
-    # Create or load FAISS index
-    vector_db = FAISS.from_texts(texts=docs, embedding=embeddings, metadatas=metadatas)
-    vector_db.save_local("./vector_store/faiss_index")  # save index locally
-    print(f"✅ Stored {len(docs)} articles in FAISS vector DB.")
+    """
+    Appends articles inserted since the last run to the persistent FAISS index.
+    Only articles above the stored article_id high-water mark are embedded,
+    plus the changed ones queued by reindex_in_vector_db.
+    """
+    with index_lock:
+        print(f"🚀 Updating vector DB ({datetime.now().date()})")
 
-def retrieve_articles(query, top_k=5):
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        state = _load_state()
+        index, row_ids, row_dates = _load_index()
+        if index is None and state["last_article_id"]:
+            # Index written in the old pickled-docstore layout: rebuild from scratch
+            print("♻️ No raw FAISS index found, re-indexing all articles")
+            state["last_article_id"] = 0
+            for name in LEGACY_FILES:
+                if os.path.exists(os.path.join(INDEX_PATH, name)):
+                    os.remove(os.path.join(INDEX_PATH, name))
+        added = 0
+
+        # Indexed articles whose text changed (see reindex_in_vector_db)
+        reindex = state.get("reindex", []) if index is not None else []
+        while reindex:
+            batch, reindex = reindex[:EMBED_BATCH], reindex[EMBED_BATCH:]
+            vectors, found, dates = _embed_ids([a for a, _ in batch],
+                                               [datetime.fromisoformat(d) if d else None for _, d in batch])
+            if found:
+                index.add(vectors)
+                row_ids = np.concatenate([row_ids, np.array(found, dtype=np.int64)])
+                row_dates = np.concatenate([row_dates, np.array(dates, dtype="datetime64[us]")])
+                _save_index(index, row_ids, row_dates)
+            state["reindex"] = reindex
+            _save_state(state)
+            added += len(found)
+        state["reindex"] = []
+
+        # Page through everything above the high-water mark, EMBED_BATCH at a time;
+        # each page is its own short query, nothing stays open while embedding
+        while True:
+            articles = fetch_articles_after(state["last_article_id"], EMBED_BATCH)
+            if not articles:
+                break
 
-    # Load FAISS index
-    vector_db = FAISS.load_local("./vector_store/faiss_index", embeddings, allow_dangerous_deserialization=True)
+            hwm = articles[-1].article_id
+            tombstones = set(state["tombstones"])
+            articles = [a for a in articles if a.article_id not in tombstones]
+            state["tombstones"] = [a for a in state["tombstones"] if a > hwm]
+            state["last_article_id"] = hwm
+            if not articles:
+                _save_state(state)
+                continue
 
-    results = vector_db.similarity_search(query, k=top_k)
-    article_ids = [r.metadata['article_id'] for r in results]
+            vectors = embedder.embed_array(_texts(articles))
+            if index is None:
+                # Sized for this first batch; the tier is revisited once the backfill is done
+                index = new_index(vectors.shape[1], choose_index_type(len(articles)))
+                row_ids = np.empty(0, dtype=np.int64)
+                row_dates = np.empty(0, dtype="datetime64[us]")
+            index.add(vectors)
+            row_ids = np.concatenate([row_ids, np.array([a.article_id for a in articles], dtype=np.int64)])
+            row_dates = np.concatenate([row_dates, np.array([a.published_at for a in articles], dtype="datetime64[us]")])
+
+            # Persist after every batch so an interrupted backfill resumes where it stopped
+            _save_index(index, row_ids, row_dates)
+            _save_state(state)
+            added += len(articles)
+
+        if not added:
+            print("No new articles to index.")
+            return
+        print(f"✅ Indexed {added} new or changed articles (high-water mark: article {state['last_article_id']}).")
+
+        live = np.count_nonzero(row_ids != DELETED)
+        if choose_index_type(live) != index_type_of(index):
+            rebuild_vector_db()  # the corpus outgrew (or shrank below) the current index tier
+        elif len(row_ids) - live > COMPACT_RATIO * len(row_ids):
+            compact_vector_db()
+
+
+def delete_from_vector_db(article_ids):
+    """
+    Deletes articles from retrieval right away: indexed rows are marked
+    DELETED in row_ids (and physically removed on the next compaction),
+    ids not indexed yet are remembered so they never get indexed.
+    """
+    with index_lock:
+        article_ids = {int(a) for a in article_ids}
+        state = _load_state()
+        if os.path.exists(ROW_IDS_FILE):
+            row_ids = np.load(ROW_IDS_FILE)
+            row_ids[np.isin(row_ids, list(article_ids))] = DELETED
+            _save_row_ids(row_ids)
+        pending = {a for a in article_ids if a > state["last_article_id"]}
+        state["tombstones"] = sorted(set(state["tombstones"]) | pending)
+        state["reindex"] = [item for item in state.get("reindex", []) if item[0] not in article_ids]
+        _save_state(state)
+        print(f"🪦 Deleted {len(article_ids)} articles from the vector DB.")
+
+
+def reindex_in_vector_db(article_ids):
+    """
+    Re-embeds articles whose text changed (e.g. the page body replaced the
+    feed summary): their current rows are marked DELETED right away and the
+    next store_in_vector_db appends them with the new text. Articles not
+    indexed yet need nothing, they are embedded from the new text anyway.
+    """
+    with index_lock:
+        if not os.path.exists(ROW_IDS_FILE):
+            return 0
+        row_ids = np.load(ROW_IDS_FILE)
+        rows = np.flatnonzero(np.isin(row_ids, [int(a) for a in article_ids]))
+        if not len(rows):
+            return 0
+        dates = _datetimes(_load_row_dates(row_ids)[rows])
+        state = _load_state()
+        state["reindex"] = state.get("reindex", []) + [
+            [int(article_id), published_at.isoformat() if published_at else None]
+            for article_id, published_at in zip(row_ids[rows], dates)
+        ]
+        row_ids[rows] = DELETED
+        _save_row_ids(row_ids)
+        _save_state(state)
+    print(f"♻️ Queued {len(rows)} changed articles for re-embedding.")
+    return len(rows)
+
+
+def compact_vector_db():
+    """Physically removes the DELETED rows from the index."""
+    with index_lock:
+        if os.path.exists(ROW_IDS_FILE) and np.count_nonzero(np.load(ROW_IDS_FILE) == DELETED):
+            rebuild_vector_db()
+
+
+def _embed_ids(article_ids, published_at):
+    """(vectors, article_ids found, their published_at) for the given articles, in order, via the embedding cache."""
+    articles = fetch_articles_by_ids(article_ids, published_at)
+    return embedder.embed_array(_texts(articles)), [a[0] for a in articles], [a[4] for a in articles]
+
+
+def rebuild_vector_db(index_type=INDEX_TYPE):
+    """
+    Rebuilds the index from its live rows, dropping DELETED ones, as the tier
+    chosen for the live corpus size (see db/faiss_index.py). Articles are
+    re-read from Postgres and re-embedded, which the embedding cache answers
+    without running the model. IVF-PQ is first trained on a random sample.
+    """
+    with index_lock:
+        index, row_ids, row_dates = _load_index()
+        if index is None:
+            return
+        live, live_dates = row_ids[row_ids != DELETED], row_dates[row_ids != DELETED]
+        target = choose_index_type(len(live), index_type)
+        rebuilt = new_index(index.d, target, n_vectors=len(live))
+        del index
+
+        if not rebuilt.is_trained:
+            rng = np.random.default_rng()
+            sample = rng.choice(len(live), size=min(len(live), TRAIN_SAMPLE), replace=False)
+            vectors = [_embed_ids(live[sample[i:i + EMBED_BATCH]], _datetimes(live_dates[sample[i:i + EMBED_BATCH]]))[0]
+                       for i in range(0, len(sample), EMBED_BATCH)]
+            train_index(rebuilt, np.vstack(vectors))
+
+        rebuilt_ids, rebuilt_dates = [], []
+        for start in range(0, len(live), EMBED_BATCH):
+            vectors, found, dates = _embed_ids(live[start:start + EMBED_BATCH],
+                                               _datetimes(live_dates[start:start + EMBED_BATCH]))
+            if found:
+                rebuilt.add(vectors)
+                rebuilt_ids.extend(found)
+                rebuilt_dates.extend(dates)
+
+        _save_index(rebuilt, rebuilt_ids, rebuilt_dates)
+        _save_state(_load_state())  # bump the state file so retrievers reload
+        print(f"🧹 Rebuilt vector DB as {target} ({len(rebuilt_ids)} articles, "
+              f"removed {len(row_ids) - len(rebuilt_ids)}).")
+
+
+class VectorRetriever:
+    """
+    Long-lived query side of the vector DB. The index and row ids are
+    memory-mapped on the first query; they are re-mapped only when the state
+    file changes on disk (every store/delete/compact rewrites it).
+    Queries run concurrently against a snapshot of the loaded index.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot_data = None
+        self._version = None
+
+    def _disk_version(self):
+        try:
+            return os.stat(STATE_PATH).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _snapshot(self):
+        version = self._disk_version()
+        if self._snapshot_data is None or version != self._version:
+            with self._lock:
+                if self._snapshot_data is None or version != self._version:
+                    if os.path.exists(INDEX_FILE) and os.path.exists(ROW_IDS_FILE):
+                        row_ids = np.load(ROW_IDS_FILE, mmap_mode="r")
+                        row_dates = _load_row_dates(row_ids, mmap_mode="r")
+                        live = row_ids != DELETED
+                        n_live = int(np.count_nonzero(live))
+                        index = tune_for_search(_read_index(mmap=True))
+                        # Deleted rows are skipped inside the search via an IDSelector
+                        params = live_search_params(index, live) if n_live < len(row_ids) else None
+                        self._snapshot_data = (index, row_ids, row_dates, n_live, params)
+                        print(f"📦 Mapped {index_type_of(index)} FAISS index ({len(row_ids)} vectors)")
+                    else:
+                        self._snapshot_data = (None, None, None, 0, None)
+                    self._version = version
+        return self._snapshot_data
+
+    def search(self, query, top_k=5):
+        """(article_id, published_at) of the top_k nearest articles, best first."""
+        index, row_ids, row_dates, n_live, params = self._snapshot()
+        if index is None or not n_live:
+            return []
+
+        k = min(top_k, n_live)
+        query_vector = np.asarray([embedder.embed_query(query)], dtype=np.float32)
+        _, rows = index.search(query_vector, k, params=params)
+        rows = rows[0][(rows[0] >= 0) & (rows[0] < len(row_ids))]
+        rows = rows[row_ids[rows] != DELETED][:top_k]
+        return list(zip((int(a) for a in row_ids[rows]), _datetimes(row_dates[rows])))
+
+
+retriever = VectorRetriever()
+
+
+def retrieve_articles(query, top_k=5):
+    """(article_id, published_at) of the top_k nearest articles, best first."""
+    hits = retriever.search(query, top_k=top_k)
     print("🔎 Retrieved relevant articles:" )
 
-    for r in results:
-        print(f"  - {r.metadata['title']} ({r.metadata['url']})")
+    # Titles come from Postgres; the rows stay in fetch.py's LRU for the caller
+    for article_id, title, _, url, _ in fetch_articles_by_ids([a for a, _ in hits], [p for _, p in hits]):
+        print(f"  - {title} ({url})")
 
-    return article_ids
+    return hits
 
 if __name__ == "__main__":
     store_in_vector_db()
@@ -0,0 +1,171 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+import torch
+from langchain_core.embeddings import Embeddings
+from sentence_transformers import SentenceTransformer
+
+from file_lock import FileLock
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+BATCH_SIZE = int(os.getenv("embed_batch_size", 64))
+TORCH_THREADS = int(os.getenv("embed_threads", os.cpu_count() or 1))
+CACHE_DIR = "./vector_store/embedding_cache"
+
+
+def content_hash(text):
+    """Cache key of a document: sha1 of the exact text embedded (title + content)."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def model_cache_dir(cache_dir, model_name):
+    """One cache per model, so switching models never reuses stale vectors."""
+    return os.path.join(cache_dir, model_name.replace("/", "__"))
+
+
+class EmbeddingCache:
+    """
+    Append-only on-disk vector store keyed by content hash, shared by every
+    process embedding with the same model:
+      vectors.f32 -> raw float32 rows, read back through a memmap
+      keys.txt    -> one content hash per line, line n == row n
+    Writers hold an exclusive file lock and first catch up with the rows
+    other processes appended, so the two files always stay aligned. Vectors
+    are written before their keys; rows left without a key by a crash are
+    truncated away by the next writer.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, dim=None):
+        self.cache_dir = cache_dir
+        self.dim = dim
+        self._vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self._keys_path = os.path.join(cache_dir, "keys.txt")
+        self._rows = {}
+        self._n_rows = 0        # lines read from keys.txt (== rows in vectors.f32)
+        self._keys_offset = 0   # bytes of keys.txt read so far
+        self._memmap = None
+        self._lock = threading.Lock()
+        self._file_lock = FileLock(os.path.join(cache_dir, ".lock"))
+        with self._lock:
+            self._catch_up()
+
+    def _catch_up(self):
+        """Reads the keys appended since the last call, by this or any other process."""
+        if not os.path.exists(self._keys_path):
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._keys_offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # a line still being written is picked up next time
+        for key in data[:end].decode("utf-8").splitlines():
+            self._rows.setdefault(key, self._n_rows)
+            self._n_rows += 1
+        if end:
+            self._keys_offset += end
+            self._memmap = None  # re-map to include the new rows
+
+    def _vectors(self):
+        if self._memmap is None and self._n_rows:
+            self._memmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r",
+                                     shape=(self._n_rows, self.dim))
+        return self._memmap
+
+    def get_many(self, keys):
+        """Returns {key: vector} for the keys already cached."""
+        with self._lock:
+            if any(k not in self._rows for k in keys):
+                self._catch_up()
+            found = {k: self._rows[k] for k in keys if k in self._rows}
+            if not found:
+                return {}
+            vectors = self._vectors()
+            return {k: np.array(vectors[row]) for k, row in found.items()}
+
+    def put_many(self, keys, vectors):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock, self._file_lock:
+            self._catch_up()
+            fresh = [i for i, k in enumerate(keys) if k not in self._rows]
+            if not fresh:
+                return
+            # Drop vectors whose keys never made it to disk so rows stay aligned
+            expected = self._n_rows * self.dim * np.dtype(np.float32).itemsize
+            if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) > expected:
+                os.truncate(self._vectors_path, expected)
+            with open(self._vectors_path, "ab") as f:
+                f.write(vectors[fresh].tobytes())
+            with open(self._keys_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{keys[i]}\n" for i in fresh))
+            self._catch_up()
+
+
+class EmbeddingService(Embeddings):
+    """
+    Shared MiniLM embedder. Documents are embedded in batches of `batch_size`
+    on CPU with `threads` torch threads, and memoized by content hash so an
+    article is only ever embedded once. Queries are not cached.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, batch_size=BATCH_SIZE,
+                 threads=TORCH_THREADS, cache_dir=CACHE_DIR):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.threads = threads
+        self.cache_dir = cache_dir
+        self._model = None
+        self._cache = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    torch.set_num_threads(self.threads)
+                    model = SentenceTransformer(self.model_name, device="cpu")
+                    self._cache = EmbeddingCache(model_cache_dir(self.cache_dir, self.model_name),
+                                                 model.get_sentence_embedding_dimension())
+                    self._model = model
+        return self._model
+
+    def encode(self, texts):
+        """Embeds texts in batches, without touching the cache."""
+        model = self._load()
+        return model.encode(list(texts), batch_size=self.batch_size, convert_to_numpy=True,
+                            show_progress_bar=False).astype(np.float32)
+
+    def embed_array(self, texts):
+        """Embeds documents as a float32 (n, dim) array, reusing cached vectors."""
+        self._load()
+        keys = [content_hash(t) for t in texts]
+        cached = self._cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            fresh_keys = list(missing)
+            fresh = self.encode(missing.values())
+            self._cache.put_many(fresh_keys, fresh)
+            cached.update(zip(fresh_keys, fresh))
+
+        if not keys:
+            return np.empty((0, self._model.get_sentence_embedding_dimension()), dtype=np.float32)
+        return np.vstack([cached[k] for k in keys])
+
+    def embed_documents(self, texts):
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text):
+        return self.encode([text])[0].tolist()
+
+
+# Shared embedder, like `llm` in llm_node.py
+embedder = EmbeddingService()
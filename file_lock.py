@@ -0,0 +1,48 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of one process are serialized
+    fcntl = None
+
+
+class FileLock:
+    """
+    Exclusive lock shared by every process that opens the same `path`
+    (fcntl.flock) and every thread of this one. Re-entrant within a thread,
+    so a locked function can call another one taking the same lock.
+
+        with FileLock("./vector_store/faiss_index/.lock"):
+            ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "a")
+                if fcntl is not None:
+                    fcntl.flock(self._file, fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            self._file.close()  # closing drops the flock
+            self._file = None
+        self._thread_lock.release()
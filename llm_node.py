@@ -3,6 +3,7 @@ import yaml
 import os
 
 from langchain_google_genai import ChatGoogleGenerativeAI
+from llm_cache import SQLiteLLMCache
 
 # Load env + config
 # load_dotenv()
@@ -12,10 +13,14 @@ from langchain_google_genai import ChatGoogleGenerativeAI
 # Use Gemini API key from env
 gemini_api_key = os.getenv("GOOGLE_API_KEY")
 
+# Responses are deterministic (temperature=0), so reruns are served from disk
+llm_cache = SQLiteLLMCache()
+
 # Initialize Gemini LLM
 llm = ChatGoogleGenerativeAI(
     model="gemini-2.5-flash",   # e.g., "gemini-1.5-pro" or "gemini-1.5-flash"
     google_api_key=gemini_api_key,
     temperature=0,
-    max_output_tokens=512
+    max_output_tokens=512,
+    cache=llm_cache
 )
\ No newline at end of file
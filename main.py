@@ -5,11 +5,17 @@
 # if __name__ == "__main__":
 #     main()
 
+import operator
+import sys
+from typing import Annotated
 from langgraph.graph import StateGraph, START, END, MessagesState
 from agents.fetch_article import fetch_relevant_articles
 from agents.categorizer import categorize_node
+from agents.fanout import fetch_candidates, fan_out, process_article, reduce_results
 from IPython.display import Image, display
 
+MAX_CONCURRENCY = 5  # article branches processed at the same time in the fan-out graph
+
 
 # ✅ Define shared state model
 class State(MessagesState):
@@ -22,7 +28,57 @@ class State(MessagesState):
     confidence: float | None = None
 
 
-if __name__ == "__main__":
+# ✅ Map/reduce variant: one branch per candidate article
+class FanOutState(MessagesState):
+    query: str
+    top_k: int
+    candidates: list
+    results: Annotated[list, operator.add]  # each branch appends its processed article
+    articles: list
+    step: str
+
+
+def build_fanout_graph():
+    graph = StateGraph(FanOutState)
+
+    graph.add_node("fetch_candidates", fetch_candidates)
+    graph.add_node("process_article", process_article)
+    graph.add_node("reduce", reduce_results)
+
+    graph.add_edge(START, "fetch_candidates")
+    graph.add_conditional_edges("fetch_candidates", fan_out, ["process_article"])
+    graph.add_edge("process_article", "reduce")
+    graph.add_edge("reduce", END)
+
+    return graph.compile()
+
+
+def run_fanout(query="give me top 5 stocks to buy", top_k=5, max_concurrency=MAX_CONCURRENCY):
+    """
+    Categorizes, summarizes and extracts events for every candidate article
+    in parallel (at most `max_concurrency` branches at once). An empty query
+    processes uncategorized articles instead of retrieval results.
+    """
+    graph = build_fanout_graph()
+    return graph.invoke(
+        {"query": query, "top_k": top_k, "results": []},
+        config={"max_concurrency": max_concurrency},
+    )
+
+
+if __name__ == "__main__" and "--fanout" in sys.argv:
+    print("🚀 Running fan-out LangGraph workflow...")
+    result = run_fanout()
+
+    print("\n✅ Final Results:")
+    print("--------------------------------")
+    for article in result["articles"]:
+        print(f"[{article['rank']}] Article ID: {article['article_id']} | {article['title']}")
+        print(f"    Category: {article.get('category')} ({article.get('confidence')})")
+        print(f"    Summary: {article.get('summary')}")
+        print(f"    Events: {len(article.get('events', []))}")
+
+elif __name__ == "__main__":
     print("🚀 Building LangGraph workflow...")
 
     # ✅ Step 1: Build the graph structure
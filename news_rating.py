@@ -1,5 +1,6 @@
-import psycopg2
 from datetime import datetime
+from db.connection import db_connection
+from db.rating_cache import notify_ratings_changed
 
 # Feedback scoring weights
 OUTCOME_SCORES = {
@@ -9,105 +10,185 @@ OUTCOME_SCORES = {
 }
 
 def update_news_rating(prediction_id, feedback_outcome, star_rating=None):
-    conn = psycopg2.connect(
-        dbname="newsdb",
-        user="youruser",
-        password="yourpass",
-        host="localhost",
-        port="5432"
-    )
-    cur = conn.cursor()
-
-    # Get source_id and category_id from prediction
-    cur.execute("""
-        SELECT source_id, category_id 
-        FROM predictions 
-        WHERE prediction_id = %s
-    """, (prediction_id,))
-    result = cur.fetchone()
-    if not result:
-        print("Prediction not found")
-        return
-    source_id, category_id = result
-
-    # Compute feedback score
-    feedback_score = OUTCOME_SCORES.get(feedback_outcome, 5)
-    if star_rating:
-        # Blend outcome score with user star rating
-        feedback_score = (feedback_score + (star_rating * 2)) / 2  
-
-    # Fetch current rating
-    cur.execute("""
-        SELECT rating, rating_count 
-        FROM news_ratings 
-        WHERE source_id = %s AND category_id = %s
-    """, (source_id, category_id))
-    row = cur.fetchone()
-
-    if row:
-        old_rating, rating_count = row
-        new_rating = ((old_rating * rating_count) + feedback_score) / (rating_count + 1)
+    with db_connection() as conn:
+        cur = conn.cursor()
 
+        # Get source_id and category_id from prediction
         cur.execute("""
-            UPDATE news_ratings 
-            SET rating = %s, rating_count = rating_count + 1, last_updated = %s
-            WHERE source_id = %s AND category_id = %s
-        """, (new_rating, datetime.now(), source_id, category_id))
-    else:
-        # If no entry yet, insert one
+            SELECT source_id, category_id 
+            FROM predictions 
+            WHERE prediction_id = %s
+        """, (prediction_id,))
+        result = cur.fetchone()
+        if not result:
+            print("Prediction not found")
+            return
+        source_id, category_id = result
+
+        # Compute feedback score
+        feedback_score = OUTCOME_SCORES.get(feedback_outcome, 5)
+        if star_rating:
+            # Blend outcome score with user star rating
+            feedback_score = (feedback_score + (star_rating * 2)) / 2  
+
+        # Fetch current rating
         cur.execute("""
-            INSERT INTO news_ratings (source_id, category_id, rating, rating_count, last_updated)
-            VALUES (%s, %s, %s, 1, %s)
-        """, (source_id, category_id, feedback_score, datetime.now()))
-
-    conn.commit()
-    cur.close()
-    conn.close()
+            SELECT rating, rating_count 
+            FROM news_ratings 
+            WHERE source_id = %s AND category_id = %s
+        """, (source_id, category_id))
+        row = cur.fetchone()
+
+        if row:
+            old_rating, rating_count = row
+            new_rating = ((old_rating * rating_count) + feedback_score) / (rating_count + 1)
+
+            cur.execute("""
+                UPDATE news_ratings 
+                SET rating = %s, rating_count = rating_count + 1, last_updated = %s
+                WHERE source_id = %s AND category_id = %s
+            """, (new_rating, datetime.now(), source_id, category_id))
+        else:
+            # If no entry yet, insert one
+            cur.execute("""
+                INSERT INTO news_ratings (source_id, category_id, rating, rating_count, last_updated)
+                VALUES (%s, %s, %s, 1, %s)
+            """, (source_id, category_id, feedback_score, datetime.now()))
+
+        notify_ratings_changed(cur)
+        conn.commit()
+        cur.close()
 
     print(f"Updated rating for source_id={source_id}, category_id={category_id}")
 
-# Example usage:
-# After user feedback on prediction 12:
-update_news_rating(prediction_id=12, feedback_outcome="Correct", star_rating=4)
 
+OUTCOME_SCORES = {"Correct": 10, "Partial": 5, "Wrong": 0}
 
+def update_rating(prediction_id, outcome):
+    with db_connection() as conn:
+        cur = conn.cursor()
+
+        cur.execute("SELECT source_id, category_id FROM predictions WHERE prediction_id = %s", (prediction_id,))
+        row = cur.fetchone()
+        if not row:
+            raise ValueError("prediction not found")
+        source_id, category_id = row
+
+        cur.execute("SELECT rating, rating_count FROM news_ratings WHERE source_id=%s AND category_id=%s",
+                    (source_id, category_id))
+        r = cur.fetchone()
+
+        obs = OUTCOME_SCORES.get(outcome, 5)
+        if r:
+            old_rating, count = r
+            alpha = 1.0 / (1 + count)
+            new_rating = old_rating * (1 - alpha) + obs * alpha
+            cur.execute("""
+                UPDATE news_ratings SET rating=%s, rating_count=rating_count+1, last_updated=%s
+                WHERE source_id=%s AND category_id=%s
+            """, (new_rating, datetime.utcnow(), source_id, category_id))
+        else:
+            cur.execute("""
+                INSERT INTO news_ratings (source_id, category_id, rating, rating_count, last_updated)
+                VALUES (%s, %s, %s, 1, %s)
+            """, (source_id, category_id, obs, datetime.utcnow()))
+
+        notify_ratings_changed(cur)
+        conn.commit()
+        cur.close()
+    return True
 
 
-import psycopg2
-from datetime import datetime
+# T+1 batch job: every unapplied feedback row is folded into news_ratings by a
+# single statement. alpha = 1 / (1 + rating_count) applied once per observation
+# is a running mean, so k observations for a (source, category) combine exactly as
+#   new_rating = (old_rating * rating_count + sum(o)) / (rating_count + k)
+APPLY_FEEDBACK_SQL = """
+    WITH claimed AS (
+        UPDATE feedback
+        SET applied_at = now()
+        WHERE applied_at IS NULL
+        RETURNING prediction_id, outcome, rating
+    ),
+    credited AS (
+        -- the prediction's source, plus every source that carried the same story
+        -- as one of its articles (near-duplicate cluster, see db/simhash.py)
+        SELECT p.prediction_id, p.source_id, p.category_id
+        FROM predictions p
+        WHERE p.prediction_id IN (SELECT prediction_id FROM claimed)
+        UNION
+        SELECT p.prediction_id, m.source_id, p.category_id
+        FROM predictions p
+        JOIN prediction_sources ps ON ps.prediction_id = p.prediction_id
+        JOIN news_articles a ON a.url = ps.article_url
+        JOIN news_articles m ON m.cluster_id = a.cluster_id
+        WHERE p.prediction_id IN (SELECT prediction_id FROM claimed)
+    ),
+    observations AS (
+        SELECT cr.source_id, cr.category_id,
+               CASE c.outcome WHEN 'Correct' THEN %(correct)s
+                              WHEN 'Partial' THEN %(partial)s
+                              WHEN 'Wrong' THEN %(wrong)s
+                              ELSE %(partial)s END AS score,
+               c.rating AS stars
+        FROM claimed c
+        JOIN credited cr ON cr.prediction_id = c.prediction_id
+        WHERE cr.source_id IS NOT NULL AND cr.category_id IS NOT NULL
+    ),
+    aggregated AS (
+        -- blend with the user's star rating the same way update_news_rating does
+        SELECT source_id, category_id,
+               SUM(CASE WHEN stars IS NULL THEN score ELSE (score + stars * 2) / 2.0 END) AS score_sum,
+               COUNT(*) AS n
+        FROM observations
+        GROUP BY source_id, category_id
+    ),
+    upserted AS (
+        INSERT INTO news_ratings (source_id, category_id, rating, rating_count, last_updated)
+        SELECT source_id, category_id, score_sum / n, n, now()
+        FROM aggregated
+        ON CONFLICT (source_id, category_id) DO UPDATE
+        SET rating = (news_ratings.rating * news_ratings.rating_count
+                      + EXCLUDED.rating * EXCLUDED.rating_count)
+                     / (news_ratings.rating_count + EXCLUDED.rating_count),
+            rating_count = news_ratings.rating_count + EXCLUDED.rating_count,
+            last_updated = EXCLUDED.last_updated
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM claimed), (SELECT COUNT(*) FROM upserted);
+"""
+
+
+def apply_pending_feedback():
+    """
+    Applies all newly resolved feedback to news_ratings atomically, in one
+    round trip. Concurrent runs cannot double-count: a feedback row is only
+    claimed once (applied_at), inside the same statement as the upsert.
+    Every source that syndicated one of the prediction's articles is
+    credited alongside the prediction's own source.
+    Returns (feedback rows applied, rating rows touched).
+    """
+    with db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(APPLY_FEEDBACK_SQL, {
+            "correct": OUTCOME_SCORES["Correct"],
+            "partial": OUTCOME_SCORES["Partial"],
+            "wrong": OUTCOME_SCORES["Wrong"],
+        })
+        applied, ratings = cur.fetchone()
+        if ratings:
+            notify_ratings_changed(cur)
+        conn.commit()
+        cur.close()
+
+    print(f"Applied {applied} feedback rows to {ratings} source/category ratings")
+    return applied, ratings
 
-OUTCOME_SCORES = {"Correct": 10, "Partial": 5, "Wrong": 0}
 
-def update_rating(prediction_id, outcome):
-    conn = psycopg2.connect(dbname="newsdb", user="youruser", password="pwd", host="localhost")
-    cur = conn.cursor()
-
-    cur.execute("SELECT source_id, category_id FROM predictions WHERE prediction_id = %s", (prediction_id,))
-    row = cur.fetchone()
-    if not row:
-        raise ValueError("prediction not found")
-    source_id, category_id = row
-
-    cur.execute("SELECT rating, rating_count FROM news_ratings WHERE source_id=%s AND category_id=%s",
-                (source_id, category_id))
-    r = cur.fetchone()
-
-    obs = OUTCOME_SCORES.get(outcome, 5)
-    if r:
-        old_rating, count = r
-        alpha = 1.0 / (1 + count)
-        new_rating = old_rating * (1 - alpha) + obs * alpha
-        cur.execute("""
-            UPDATE news_ratings SET rating=%s, rating_count=rating_count+1, last_updated=%s
-            WHERE source_id=%s AND category_id=%s
-        """, (new_rating, datetime.utcnow(), source_id, category_id))
-    else:
-        cur.execute("""
-            INSERT INTO news_ratings (source_id, category_id, rating, rating_count, last_updated)
-            VALUES (%s, %s, %s, 1, %s)
-        """, (source_id, category_id, obs, datetime.utcnow()))
+# Example usage:
+# After user feedback on prediction 12:
+# update_news_rating(prediction_id=12, feedback_outcome="Correct", star_rating=4)
 
-    conn.commit()
-    cur.close()
-    conn.close()
-    return True
+# T+1 job: fold in everything resolved since the last run
+if __name__ == "__main__":
+    apply_pending_feedback()
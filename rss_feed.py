@@ -61,12 +61,13 @@
 #         schedule.run_pending()
 #         time.sleep(1)
 
-import feedparser
-from bs4 import BeautifulSoup
 from datetime import datetime
 import pandas as pd
 import os
-from db.insertion import insert_articles
+from db.partitions import ensure_partitions
+from agents.feed_fetcher import iter_feed_entries
+from agents.feed_state import FeedStateStore
+from agents.rss_feed import store_feed_entries
 
 # Step 1: RSS feed URLs
 RSS_FEED_URLS = [
@@ -101,11 +102,6 @@ RSS_FEED= {
 
 CSV_FILE = "rssfeeds.csv"
 
-# Step 2: Function to clean text
-def clean_text(html_text):
-    soup = BeautifulSoup(html_text, "html.parser")
-    return soup.get_text().strip()
-
 # Step 3: Fetch and save all RSS feeds
 def ingest_all_feeds():
 
@@ -113,25 +109,15 @@ def ingest_all_feeds():
 
     print(f"🔄 Running ingestion at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
-    for source, urls in RSS_FEED.items():
-        print(f"Source: {source}")
-        for url in urls:
-            print(f"  URL: {url}")
-            print(f"📡 Fetching from: {url}")
-            feed = feedparser.parse(url)
-
-            for entry in feed.entries[:20]:  # Limit to last 20 per feed
-                source=source
-                title=clean_text(entry.title)
-                summary=clean_text(entry.get("summary", ""))
-                link=entry.link
-                published=entry.get("published", datetime.now().isoformat())
-
-                article_id= insert_articles(source,url,title,link,published,summary)
-                cnt += 1
-                print(f"    ✅ Inserted article ID: {article_id} | Title: {title}")
-
+    # Today's news_articles partition must exist before inserting
+    ensure_partitions()
 
+    # Feeds are downloaded concurrently and handed over as soon as each one is parsed.
+    # ETag / Last-Modified and the newest seen entry are remembered per feed,
+    # so unchanged feeds cost a 304 and only new entries are inserted
+    for source, url, entries in iter_feed_entries(RSS_FEED, state_store=FeedStateStore()):
+        print(f"📡 Fetched {len(entries)} entries from: {url} ({source})")
+        cnt += store_feed_entries(source, url, entries)
 
     print(f"✅ Ingestion complete. Total articles inserted: {cnt}")
 
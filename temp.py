@@ -1,9 +1,6 @@
-from sentence_transformers import SentenceTransformer
+from embedding_node import embedder
 import psycopg2
 
-# Load model
-model = SentenceTransformer('all-MiniLM-L6-v2')
-
 # Connect to PostgreSQL
 conn = psycopg2.connect("dbname=news user=postgres password=secret")
 cur = conn.cursor()
@@ -11,7 +8,7 @@ cur = conn.cursor()
 # Example article
 title = "New AI breakthrough"
 content = "Researchers developed a new AI model..."
-embedding = model.encode(content).tolist()  # convert numpy array to list
+embedding = embedder.embed_documents([f"{title}\n\n{content}"])[0]  # cached by content hash
 
 # Insert article
 cur.execute("""
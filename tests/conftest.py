@@ -0,0 +1,111 @@
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psycopg2
+import pytest
+
+import db.connection as connection
+from db.creation import migrate
+
+os.environ.setdefault("GOOGLE_API_KEY", "test")  # llm_node builds its client at import time
+
+
+def rss(items):
+    """RSS document for `items`: (guid, title, published epoch seconds or None), in document order."""
+    blocks = []
+    for guid, title, published in items:
+        date = f"<pubDate>{formatdate(published)}</pubDate>" if published is not None else ""
+        blocks.append(f"<item><guid>{guid}</guid><title>{title}</title>"
+                      f"<link>http://example.com/{guid}</link><description>{title} body</description>{date}</item>")
+    return f"<rss version='2.0'><channel><title>t</title>{''.join(blocks)}</channel></rss>".encode()
+
+
+class StandIn:
+    """
+    Local HTTP/1.1 server for fetch tests. `routes` maps a path to
+    (status, headers, body) or to a callable(handler) returning one (or None
+    when it wrote the response itself); every request is recorded as
+    (path, request headers, time.monotonic()).
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                stand_in.requests.append((self.path, dict(self.headers), time.monotonic()))
+                route = stand_in.routes.get(self.path, (404, {}, b""))
+                if callable(route):
+                    route = route(self)
+                    if route is None:
+                        return
+                status, headers, body = route
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_port
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path, host="127.0.0.1"):
+        """`host` may be "localhost" to reach the same server as a different host."""
+        return f"http://{host}:{self.port}{path}"
+
+    def requested(self, path):
+        return [r for r in self.requests if r[0] == path]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+TEST_SCHEMA = "pipeline_test"
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """
+    A freshly migrated schema on the configured database (dbname/user/host
+    env vars), so tests never touch real rows. Skipped without a database.
+    """
+    try:
+        conn = connection.get_connection()
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"no database: {e}")
+    conn.autocommit = True
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {TEST_SCHEMA} CASCADE; CREATE SCHEMA {TEST_SCHEMA};")
+
+    # A pool of its own whose connections resolve tables in the test schema
+    monkeypatch.setenv("PGOPTIONS", f"-c search_path={TEST_SCHEMA}")
+    monkeypatch.setattr(connection, "_pool", None)
+    monkeypatch.setattr(connection, "_slots", None)
+    migrate()
+
+    yield
+
+    connection._pool.closeall()
+    cur.execute(f"DROP SCHEMA {TEST_SCHEMA} CASCADE;")
+    conn.close()
@@ -0,0 +1,87 @@
+from datetime import datetime
+
+import pytest
+
+import agents.body_fetcher as body_fetcher
+from agents.body_fetcher import MAX_BODY_ATTEMPTS, BodyFetcher, fetch_pending_bodies
+
+PAGE = (b"<html><body><nav>Menu</nav><article><p>"
+        + b"The central bank held rates steady on Tuesday. " * 20
+        + b"</p></article></body></html>")
+HTML = {"Content-Type": "text/html; charset=utf-8"}
+
+
+def _robots(disallow_on_localhost):
+    def route(handler):
+        if disallow_on_localhost and handler.headers["Host"].startswith("localhost"):
+            return 200, {"Content-Type": "text/plain"}, b"User-agent: *\nDisallow: /\n"
+        return 200, {"Content-Type": "text/plain"}, b"User-agent: *\nAllow: /\n"
+    return route
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    return BodyFetcher(host_min_interval=0.0, cache_dir=str(tmp_path))
+
+
+def test_fetches_and_caches_page(stand_in, fetcher):
+    stand_in.routes["/robots.txt"] = _robots(False)
+    stand_in.routes["/story"] = (200, HTML, PAGE)
+
+    result = fetcher.fetch(stand_in.url("/story"))
+    assert result.status == "ok" and "central bank held rates" in result.text
+    assert fetcher.fetch(stand_in.url("/story")) == result
+    assert len(stand_in.requested("/story")) == 1
+
+
+def test_robots_disallow_skips_page(stand_in, fetcher):
+    stand_in.routes["/robots.txt"] = (200, {"Content-Type": "text/plain"}, b"User-agent: *\nDisallow: /private\n")
+    stand_in.routes["/private/story"] = (200, HTML, PAGE)
+
+    assert fetcher.fetch(stand_in.url("/private/story")).status == "skipped"
+    assert stand_in.requested("/private/story") == []
+
+
+def test_cross_host_redirect_checks_target_robots(stand_in, fetcher):
+    stand_in.routes["/robots.txt"] = _robots(disallow_on_localhost=True)
+    stand_in.routes["/moved"] = (301, {"Location": stand_in.url("/story", host="localhost")}, b"")
+    stand_in.routes["/story"] = (200, HTML, PAGE)
+
+    assert fetcher.fetch(stand_in.url("/moved")).status == "skipped"
+    assert stand_in.requested("/story") == []
+    assert [h["Host"].split(":")[0] for _, h, _ in stand_in.requested("/robots.txt")] == ["127.0.0.1", "localhost"]
+
+
+def test_same_host_redirect_is_followed(stand_in, fetcher):
+    stand_in.routes["/robots.txt"] = _robots(False)
+    stand_in.routes["/moved"] = (302, {"Location": "/story"}, b"")
+    stand_in.routes["/story"] = (200, HTML, PAGE)
+    assert fetcher.fetch(stand_in.url("/moved")).status == "ok"
+
+
+def test_server_errors_are_not_cached(stand_in, fetcher):
+    stand_in.routes["/robots.txt"] = _robots(False)
+    stand_in.routes["/flaky"] = (503, {}, b"")
+    assert fetcher.fetch(stand_in.url("/flaky")).status == "error"
+    stand_in.routes["/flaky"] = (200, HTML, PAGE)
+    assert fetcher.fetch(stand_in.url("/flaky")).status == "ok"
+
+
+def test_pending_bodies_back_off_errors_and_reindex_changes(stand_in, fetcher, monkeypatch):
+    stand_in.routes["/robots.txt"] = _robots(False)
+    stand_in.routes["/story"] = (200, HTML, PAGE)
+    stand_in.routes["/down"] = (500, {}, b"")
+    published = datetime(2026, 10, 1, 9, 30)
+    rows = [(1, published, stand_in.url("/story"), "summary"), (2, published, stand_in.url("/down"), "summary")]
+
+    saved, errors, reindexed = [], [], []
+    monkeypatch.setattr(body_fetcher, "fetch_articles_without_body", lambda limit: rows)
+    monkeypatch.setattr(body_fetcher, "save_article_bodies", saved.extend)
+    monkeypatch.setattr(body_fetcher, "save_body_fetch_errors",
+                        lambda articles, max_attempts, base: errors.append((articles, max_attempts)))
+    monkeypatch.setattr("db.vector_db.reindex_in_vector_db", reindexed.extend)
+
+    assert fetch_pending_bodies(fetcher=fetcher) == 1
+    assert [(article_id, body is not None) for article_id, _, body in saved] == [(1, True)]
+    assert errors == [([(2, published)], MAX_BODY_ATTEMPTS)]
+    assert reindexed == [1]
@@ -0,0 +1,81 @@
+from datetime import datetime
+
+import pytest
+
+import db.connection as connection
+from db.categorize_queue import (MAX_ATTEMPTS, categorize_queue_stats, claim_categorize_jobs,
+                                 enqueue_categorize_jobs, fail_categorize_jobs, open_categorize_jobs)
+from db.insertion import save_categories_bulk
+
+PUBLISHED = datetime(2026, 10, 1, 9, 30)
+
+
+@pytest.fixture
+def queue(database):
+    def add_articles(n):
+        with connection.db_connection() as c:
+            jobs_cur = c.cursor()
+            jobs_cur.execute("""
+                INSERT INTO news_articles (title, content, url, published_at)
+                SELECT 'Headline ' || i, 'Body ' || i, 'http://example.com/' || i, %s
+                FROM generate_series(1, %s) AS i
+                RETURNING article_id, published_at;
+            """, (PUBLISHED, n))
+            articles = sorted(jobs_cur.fetchall())
+            enqueue_categorize_jobs(jobs_cur, articles)
+        return [article_id for article_id, _ in articles]
+
+    def make_visible():
+        with connection.db_connection() as c:
+            c.cursor().execute("UPDATE categorize_jobs SET visible_at = now() - interval '1 second';")
+
+    return add_articles, make_visible
+
+
+def test_workers_claim_disjoint_jobs(queue):
+    add_articles, _ = queue
+    ids = add_articles(5)
+    first = claim_categorize_jobs("w1", limit=3)
+    second = claim_categorize_jobs("w2", limit=3)
+    assert [j[0] for j in first] == ids[:3]
+    assert [j[0] for j in second] == ids[3:]
+    assert claim_categorize_jobs("w3", limit=3) == []
+    assert categorize_queue_stats() == {"leased": 5}
+
+
+def test_expired_lease_is_reclaimed_and_stale_worker_ignored(queue):
+    add_articles, _ = queue
+    (article_id,) = add_articles(1)
+    assert [j[0] for j in claim_categorize_jobs("w1", limit=1, lease_seconds=0)] == [article_id]
+
+    # w1 stalled past its lease: the job goes to w2, and w1 can no longer release it
+    assert [j[0] for j in claim_categorize_jobs("w2", limit=1)] == [article_id]
+    assert fail_categorize_jobs("w1", [article_id], "late") == 0
+    assert fail_categorize_jobs("w2", [article_id], "LLM error") == 1
+    assert categorize_queue_stats() == {"waiting": 1}  # backing off
+
+
+def test_failed_jobs_retry_until_out_of_attempts(queue):
+    add_articles, make_visible = queue
+    (article_id,) = add_articles(1)
+    for _ in range(MAX_ATTEMPTS):
+        assert [j[0] for j in claim_categorize_jobs("w1", limit=1)] == [article_id]
+        fail_categorize_jobs("w1", [article_id], "LLM error")
+        make_visible()
+    assert claim_categorize_jobs("w1", limit=1) == []
+    assert categorize_queue_stats() == {"failed": 1}
+
+
+def test_categorized_articles_leave_the_queue(queue):
+    add_articles, make_visible = queue
+    ids = add_articles(2)
+    jobs = claim_categorize_jobs("w1", limit=2, lease_seconds=0)
+    assert [a[0] for a in open_categorize_jobs(jobs)] == ids
+
+    # Saving a category removes the job; a job already categorized is settled on claim
+    save_categories_bulk([(ids[0], "Finance", 0.9, "llm", PUBLISHED)])
+    with connection.db_connection() as c:
+        c.cursor().execute("UPDATE news_articles SET category_id = 1 WHERE article_id = %s;", (ids[1],))
+    make_visible()
+    assert open_categorize_jobs(claim_categorize_jobs("w2", limit=2)) == []
+    assert categorize_queue_stats() == {}
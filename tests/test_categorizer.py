@@ -0,0 +1,107 @@
+import json
+import re
+from datetime import datetime
+from typing import Any
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import agents.categorizer as categorizer
+from agents.categorizer import categorize_batch, parse_batch_response
+
+
+class FakeChatModel(BaseChatModel):
+    """Local stand-in for the Gemini chat model: `respond(article_ids)` returns the reply text or raises."""
+
+    respond: Any
+
+    @property
+    def _llm_type(self):
+        return "fake"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        article_ids = [int(a) for a in re.findall(r"\[article_id=(\d+)\]", messages[-1].content)]
+        content = self.respond(article_ids)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+
+def _reply(article_ids, category="Finance"):
+    return json.dumps([{"article_id": a, "category": category, "confidence": 0.9} for a in article_ids])
+
+
+class _EscalateAll:
+    def classify_many(self, texts):
+        return [None] * len(texts)
+
+    def escalation_rate(self):
+        return 1.0
+
+
+@pytest.fixture
+def saved(monkeypatch):
+    rows = []
+    monkeypatch.setattr(categorizer, "fast_classifier", _EscalateAll())
+    monkeypatch.setattr(categorizer, "save_categories_bulk", lambda results: rows.extend(results))
+    return rows
+
+
+PUBLISHED = datetime(2026, 10, 1, 9, 30)
+ARTICLES = [(i, f"Headline {i}", f"Body {i}", PUBLISHED) for i in range(1, 7)]
+
+
+def test_complete_responses_are_saved(saved):
+    results = categorize_batch(ARTICLES, batch_size=3, model=FakeChatModel(respond=_reply))
+    assert set(results) == {1, 2, 3, 4, 5, 6}
+    assert sorted(saved) == [(i, "Finance", 0.9, "llm", PUBLISHED) for i in range(1, 7)]
+
+
+def test_articles_missing_from_response_stay_uncategorized(saved):
+    model = FakeChatModel(respond=lambda ids: _reply([a for a in ids if a != 2]))
+    results = categorize_batch(ARTICLES, batch_size=3, model=model)
+    assert set(results) == {1, 3, 4, 5, 6}
+    assert 2 not in {article_id for article_id, *_ in saved}
+
+
+def test_malformed_response_saves_nothing_for_its_batch(saved):
+    model = FakeChatModel(respond=lambda ids: "Sure! Finance, I think." if 1 in ids else _reply(ids))
+    results = categorize_batch(ARTICLES, batch_size=3, model=model)
+    assert set(results) == {4, 5, 6}
+
+
+def test_failed_prompt_saves_nothing_for_its_batch(saved):
+    def respond(ids):
+        if 4 in ids:
+            raise RuntimeError("429 quota exceeded")
+        return _reply(ids)
+
+    results = categorize_batch(ARTICLES, batch_size=3, model=FakeChatModel(respond=respond))
+    assert set(results) == {1, 2, 3}
+    assert {article_id for article_id, *_ in saved} == {1, 2, 3}
+
+
+def test_claimed_articles_left_uncategorized_are_released(saved, monkeypatch):
+    released = []
+    monkeypatch.setattr(categorizer, "fail_categorize_jobs",
+                        lambda worker, ids, error: released.append((worker, list(ids))))
+    model = FakeChatModel(respond=lambda ids: _reply([a for a in ids if a != 2]))
+    results = categorizer.categorize_claimed("w1", ARTICLES, batch_size=3, model=model)
+    assert set(results) == {1, 3, 4, 5, 6}
+    assert released == [("w1", [2])]
+
+
+def test_claimed_batches_report_the_escalation_rate(saved, monkeypatch, capsys):
+    monkeypatch.setattr(categorizer, "fail_categorize_jobs", lambda worker, ids, error: 0)
+    categorizer.categorize_claimed("w1", ARTICLES, batch_size=3, model=FakeChatModel(respond=_reply))
+    assert "Fast-path escalation rate: 100.0%" in capsys.readouterr().out
+
+
+def test_parse_batch_response():
+    reply = ('Here you go: [{"article_id": 1, "category": "Sports", "confidence": 0.8},'
+             ' {"article_id": 2, "category": "Weather", "confidence": "0.6"},'
+             ' {"article_id": 9, "category": "Finance", "confidence": 0.9},'
+             ' {"category": "Finance"}]')
+    assert parse_batch_response(reply, [1, 2, 3]) == {1: ("Sports", 0.8), 2: ("Other", 0.6)}
+    assert parse_batch_response("[{broken", [1]) == {}
+    assert parse_batch_response("no json at all", [1]) == {}
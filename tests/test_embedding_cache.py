@@ -0,0 +1,58 @@
+import hashlib
+import multiprocessing
+
+import numpy as np
+
+from embedding_node import EMBEDDING_MODEL, EmbeddingCache, model_cache_dir
+
+DIM = 8
+
+
+def _vector(key):
+    return np.frombuffer(hashlib.sha256(key.encode()).digest(), dtype=np.uint32)[:DIM].astype(np.float32)
+
+
+def _writer(cache_dir, worker):
+    cache = EmbeddingCache(cache_dir, DIM)
+    for i in range(100):
+        keys = [f"k{(worker * 37 + i * 7 + j) % 300}" for j in range(5)]
+        cache.put_many(keys, np.stack([_vector(k) for k in keys]))
+
+
+def test_concurrent_processes_keep_rows_aligned(tmp_path):
+    processes = [multiprocessing.Process(target=_writer, args=(str(tmp_path), w)) for w in range(4)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    assert [p.exitcode for p in processes] == [0] * 4
+
+    cache = EmbeddingCache(str(tmp_path), DIM)
+    keys = list(cache._rows)
+    assert len(keys) == 300
+    found = cache.get_many(keys)
+    assert all(np.array_equal(found[k], _vector(k)) for k in keys)
+
+
+def test_sees_rows_appended_by_another_instance(tmp_path):
+    reader = EmbeddingCache(str(tmp_path), DIM)
+    EmbeddingCache(str(tmp_path), DIM).put_many(["a"], _vector("a")[None, :])
+    assert np.array_equal(reader.get_many(["a"])["a"], _vector("a"))
+
+
+def test_truncates_vectors_left_without_keys(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), DIM)
+    cache.put_many(["a"], _vector("a")[None, :])
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        f.write(_vector("crashed").tobytes())  # vector written, key never was
+    cache.put_many(["b"], _vector("b")[None, :])
+    assert np.array_equal(EmbeddingCache(str(tmp_path), DIM).get_many(["b"])["b"], _vector("b"))
+
+
+def test_cache_directory_per_model(tmp_path):
+    default_dir = model_cache_dir(str(tmp_path), EMBEDDING_MODEL)
+    other_dir = model_cache_dir(str(tmp_path), "org/other-model")
+    assert default_dir != other_dir
+    EmbeddingCache(default_dir, DIM).put_many(["a"], _vector("a")[None, :])
+    assert "a" in EmbeddingCache(default_dir, DIM).get_many(["a"])
+    assert EmbeddingCache(other_dir, DIM).get_many(["a"]) == {}
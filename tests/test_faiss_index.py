@@ -0,0 +1,73 @@
+import faiss
+import numpy as np
+import pytest
+
+import db.faiss_index as faiss_index
+from db.faiss_index import (FLAT_MAX_VECTORS, HNSW_MAX_VECTORS, MIN_TRAIN_PER_CENTROID, PQ_BITS, choose_index_type,
+                            index_type_of, live_search_params, new_index, train_index, tune_for_search)
+
+DIM = 8
+
+
+def _index(index_type, n, seed=0):
+    vectors = np.random.default_rng(seed).random((n, DIM), dtype=np.float32)
+    index = new_index(DIM, index_type, n)
+    train_index(index, vectors)
+    index.add(vectors)
+    return tune_for_search(index), vectors
+
+
+def test_live_params_ignore_rows_past_the_bitmap():
+    # A retriever can pair an older, shorter row-id array with a grown index
+    index, vectors = _index("flat", 100)
+    live = np.ones(10, dtype=bool)
+    live[3] = False
+    params = live_search_params(index, live)
+    assert params.referenced_objects[0].n == 2  # bytes, not bits
+
+    _, rows = index.search(vectors[:20], 20, params=params)
+    found = set(rows[rows >= 0].tolist())
+    assert found == set(range(10)) - {3}
+
+
+@pytest.mark.parametrize("n_vectors, index_type, expected", [
+    (10, "auto", "flat"),
+    (FLAT_MAX_VECTORS, "auto", "flat"),
+    (FLAT_MAX_VECTORS + 1, "auto", "hnsw"),
+    (HNSW_MAX_VECTORS, "auto", "hnsw"),
+    (HNSW_MAX_VECTORS + 1, "auto", "ivfpq"),
+    (10, "hnsw", "hnsw"),                                         # explicit type wins
+    (MIN_TRAIN_PER_CENTROID * 2 ** PQ_BITS - 1, "ivfpq", "flat"),  # too few to train on
+    (MIN_TRAIN_PER_CENTROID * 2 ** PQ_BITS, "ivfpq", "ivfpq"),
+])
+def test_choose_index_type(n_vectors, index_type, expected):
+    assert choose_index_type(n_vectors, index_type) == expected
+
+
+def test_unknown_index_type_is_rejected():
+    with pytest.raises(ValueError):
+        choose_index_type(10, "annoy")
+
+
+@pytest.mark.parametrize("index_type, params_type", [
+    ("flat", faiss.SearchParameters),
+    ("hnsw", faiss.SearchParametersHNSW),
+    ("ivfpq", faiss.SearchParametersIVF),
+])
+def test_live_params_per_index_type(monkeypatch, index_type, params_type):
+    monkeypatch.setattr(faiss_index, "MIN_TRAIN_PER_CENTROID", 1)
+    monkeypatch.setattr(faiss_index, "PQ_BITS", 4)  # trainable on a few hundred vectors
+    index, vectors = _index(index_type, 400)
+    assert index_type_of(faiss.deserialize_index(faiss.serialize_index(index))) == index_type
+
+    live = np.ones(400, dtype=bool)
+    live[::2] = False
+    params = live_search_params(index, live, ef_search=40, nprobe=3)
+    assert type(params) is params_type
+    if index_type == "hnsw":
+        assert params.efSearch == 40
+    elif index_type == "ivfpq":
+        assert params.nprobe == 3
+
+    _, rows = index.search(vectors[:10], 5, params=params)
+    assert (rows[rows >= 0] % 2 == 1).all()  # deleted (even) rows never come back
@@ -0,0 +1,137 @@
+import time
+
+import pytest
+
+from agents.feed_fetcher import CHUNK_SIZE, HostRateLimiter, fetch_feed, iter_feed_entries
+from tests.conftest import rss
+
+FEED = rss([("a3", "Third", None), ("a2", "Second", None), ("a1", "First", None)])
+
+
+def test_fetch_feed_parses_and_skips_unchanged(stand_in):
+    stand_in.routes["/feed"] = (200, {"Content-Type": "application/rss+xml", "ETag": '"v1"'}, FEED)
+
+    first = fetch_feed(stand_in.url("/feed"))
+    assert first.status == "updated"
+    assert [e.title for e in first.entries] == ["Third", "Second", "First"]
+
+    again = fetch_feed(stand_in.url("/feed"), state=first.validators)
+    assert again.status == "unchanged" and again.entries == []
+    assert stand_in.requested("/feed")[-1][1]["If-None-Match"] == '"v1"'
+
+
+def test_fetch_feed_not_modified(stand_in):
+    stand_in.routes["/feed"] = (304, {}, b"")
+    assert fetch_feed(stand_in.url("/feed"), state={"etag": '"v1"'}).status == "not_modified"
+
+
+def test_fetch_feed_deadline_bounds_whole_download(stand_in):
+    def trickle(handler):
+        # Every chunk arrives well within the socket timeout, the whole body doesn't
+        handler.send_response(200)
+        handler.send_header("Content-Length", str(CHUNK_SIZE * 20))
+        handler.end_headers()
+        for _ in range(20):
+            handler.wfile.write(b" " * CHUNK_SIZE)
+            handler.wfile.flush()
+            time.sleep(0.1)
+
+    stand_in.routes["/slow"] = trickle
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        fetch_feed(stand_in.url("/slow"), timeout=0.5)
+    assert time.monotonic() - start < 1.5
+
+
+def test_rate_limiter_reserves_spaced_slots():
+    limiter = HostRateLimiter(min_interval=1.0)
+    delays = [limiter.reserve("http://a.example/feed") for _ in range(3)]
+    assert delays[0] == pytest.approx(0.0, abs=0.01)
+    assert delays[1] == pytest.approx(1.0, abs=0.05)
+    assert delays[2] == pytest.approx(2.0, abs=0.05)
+    assert limiter.reserve("http://b.example/feed") == pytest.approx(0.0, abs=0.01)
+    assert limiter.reserve("http://a.example/other", min_interval=5.0) == pytest.approx(3.0, abs=0.05)
+
+
+def test_iter_feed_entries_spaces_requests_per_host(stand_in):
+    for path in ("/a1", "/a2", "/a3", "/b1"):
+        stand_in.routes[path] = (200, {"Content-Type": "application/rss+xml"}, FEED)
+    feeds = {
+        "a": [stand_in.url("/a1"), stand_in.url("/a2"), stand_in.url("/a3")],
+        "b": [stand_in.url("/b1", host="localhost")],
+    }
+
+    start = time.monotonic()
+    results = list(iter_feed_entries(feeds, max_concurrency=1, host_min_interval=0.4))
+    assert len(results) == 4
+
+    host_a = sorted(t for path, _, t in stand_in.requests if path.startswith("/a"))
+    assert all(later - earlier >= 0.35 for earlier, later in zip(host_a, host_a[1:]))
+    # The single worker is not parked on host a's rate limit: host b goes right away
+    (_, _, b_time), = stand_in.requested("/b1")
+    assert b_time - start < 0.3
+
+
+def test_iter_feed_entries_yields_fast_feeds_first(stand_in):
+    def slow(handler):
+        time.sleep(1.0)
+        return 200, {"Content-Type": "application/rss+xml"}, FEED
+
+    stand_in.routes["/slow"] = slow
+    stand_in.routes["/fast"] = (200, {"Content-Type": "application/rss+xml"}, FEED)
+    feeds = {"slow": [stand_in.url("/slow")], "fast": [stand_in.url("/fast", host="localhost")]}
+
+    start = time.monotonic()
+    stream = iter_feed_entries(feeds, max_concurrency=2, host_min_interval=0.0)
+    source, _, entries = next(stream)
+    assert source == "fast" and len(entries) == 3
+    assert time.monotonic() - start < 0.8  # yielded while the slow feed is still downloading
+    assert [source for source, _, _ in stream] == ["slow"]
+
+
+def test_iter_feed_entries_skips_failed_feeds(stand_in):
+    stand_in.routes["/ok"] = (200, {"Content-Type": "application/rss+xml"}, FEED)
+    stand_in.routes["/broken"] = (500, {}, b"")
+    feeds = {"ok": [stand_in.url("/ok")], "broken": [stand_in.url("/broken", host="localhost")]}
+    assert [source for source, _, _ in iter_feed_entries(feeds, host_min_interval=0.0)] == ["ok"]
+
+
+def _poll(stand_in, items, state):
+    # Distinct bodies every poll, so the body-hash shortcut never kicks in
+    stand_in.routes["/feed"] = (200, {"Content-Type": "application/rss+xml"}, rss(items))
+    result = fetch_feed(stand_in.url("/feed"), state=state)
+    state.update(result.validators)
+    return [e.title for e in result.entries]
+
+
+def test_oldest_first_feed_yields_new_entries(stand_in):
+    state = {}
+    assert _poll(stand_in, [("a1", "First", None), ("a2", "Second", None)], state) == ["First", "Second"]
+    assert _poll(stand_in, [("a1", "First", None), ("a2", "Second", None), ("a3", "Third", None)],
+                 state) == ["Third"]
+
+
+def test_reordered_feed_yields_only_unseen_entries(stand_in):
+    state = {}
+    _poll(stand_in, [("a3", "Third", None), ("a2", "Second", None), ("a1", "First", None)], state)
+    # A new entry lands in the middle and the rest get shuffled
+    assert _poll(stand_in, [("a2", "Second", None), ("a4", "Fourth", None), ("a1", "First", None),
+                            ("a3", "Third", None)], state) == ["Fourth"]
+    # Dropping out of the feed and coming back does not make an entry new again
+    _poll(stand_in, [("a4", "Fourth", None)], state)
+    assert _poll(stand_in, [("a1", "First", None), ("a4", "Fourth", None), ("a5", "Fifth", None)],
+                 state) == ["Fifth"]
+
+
+def test_store_feed_entries_stores_every_new_entry(stand_in, monkeypatch):
+    import agents.rss_feed as rss_feed
+
+    batches = []
+    monkeypatch.setattr(rss_feed, "insert_articles_bulk",
+                        lambda batch: batches.append(batch) or {"inserted": batch, "skipped": []})
+    # A first poll (or a burst) brings more entries than the old 20-per-feed cap
+    stand_in.routes["/feed"] = (200, {"Content-Type": "application/rss+xml"},
+                                rss([(f"a{i}", f"Story {i}", None) for i in range(30)]))
+    entries = fetch_feed(stand_in.url("/feed")).entries
+    assert rss_feed.store_feed_entries("src", stand_in.url("/feed"), entries) == 30
+    assert [row[2] for row in batches[0]] == [f"Story {i}" for i in range(30)]
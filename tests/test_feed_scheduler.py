@@ -0,0 +1,93 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import agents.feed_scheduler as feed_scheduler
+from agents.feed_fetcher import FeedFetch
+from agents.feed_scheduler import (DEFAULT_POLL_INTERVAL, MAX_ERROR_BACKOFF, MAX_POLL_INTERVAL,
+                                   MIN_POLL_INTERVAL, RATE_SMOOTHING, FeedJob, FeedScheduler)
+from agents.feed_state import FeedStateStore
+
+URL = "http://a.example/feed"
+
+
+@pytest.fixture
+def poll(tmp_path, monkeypatch):
+    """poll(job, n_new, at): one FeedJob.run at wall-clock `at` finding `n_new` new entries."""
+    store = FeedStateStore(str(tmp_path / "feed_state.json"))
+    store.update(URL, seen_entry_ids=["a0"])  # not a first poll
+    scheduler = SimpleNamespace(state_store=store, timeout=1)
+    monkeypatch.setattr(feed_scheduler, "store_feed_entries", lambda source, url, entries: len(entries))
+
+    def poll(job, n_new, at):
+        entries = [{"id": f"e{i}"} for i in range(n_new)]
+        monkeypatch.setattr(feed_scheduler, "fetch_feed",
+                            lambda url, timeout, state=None: FeedFetch(entries, "updated", {}))
+        monkeypatch.setattr(feed_scheduler.time, "time", lambda: at)
+        return job.run(scheduler)
+    return poll
+
+
+def _job(last_polled=1000.0):
+    job = FeedJob("src", URL, {})
+    job.last_polled = last_polled
+    return job
+
+
+def test_interval_follows_smoothed_publish_rate(poll):
+    job = _job()
+    assert poll(job, 6, at=1600.0) == pytest.approx(100.0)  # 6 entries in 600 s: one per 100 s
+    assert job.rate == pytest.approx(0.01)
+
+    # A quiet poll pulls the average down instead of resetting it
+    assert poll(job, 0, at=1700.0) == pytest.approx(1 / ((1 - RATE_SMOOTHING) * 0.01))
+
+
+def test_interval_is_clamped(poll):
+    assert poll(_job(), 500, at=1100.0) == MIN_POLL_INTERVAL
+    assert poll(_job(), 1, at=1000.0 + 100 * MAX_POLL_INTERVAL) == MAX_POLL_INTERVAL
+
+
+def test_feed_with_no_new_entries_falls_back_to_max_interval(poll):
+    job = _job()
+    assert poll(job, 0, at=1600.0) == MAX_POLL_INTERVAL
+    assert job.rate == 0
+
+
+def test_failures_back_off_exponentially_until_a_success(poll):
+    job = _job()
+    assert [job.failed(OSError("down")) for _ in range(3)] == [
+        DEFAULT_POLL_INTERVAL * 2, DEFAULT_POLL_INTERVAL * 4, DEFAULT_POLL_INTERVAL * 8]
+    assert max(job.failed(OSError("down")) for _ in range(10)) == MAX_ERROR_BACKOFF
+
+    poll(job, 6, at=1600.0)
+    assert job.failed(OSError("down")) == job.interval * 2
+
+
+def test_scheduler_reserves_host_slots_instead_of_sleeping(tmp_path, monkeypatch):
+    fetched = {}
+    done = threading.Event()
+
+    def fetch_feed(url, timeout, state=None):
+        fetched[url] = time.monotonic()
+        if len(fetched) == 3:
+            done.set()
+        return FeedFetch([], "unchanged", {})
+
+    monkeypatch.setattr(feed_scheduler, "fetch_feed", fetch_feed)
+    monkeypatch.setattr(feed_scheduler, "ensure_partitions", lambda: None)
+    feeds = {"a": ["http://a.example/1", "http://a.example/2"], "b": ["http://b.example/1"]}
+    scheduler = FeedScheduler(feeds, max_workers=1, host_min_interval=0.3,
+                              state_store=FeedStateStore(str(tmp_path / "feed_state.json")), fetch_bodies=False)
+
+    runner = threading.Thread(target=scheduler.run)
+    runner.start()
+    assert done.wait(5)
+    scheduler.stop()
+    runner.join()
+
+    # The single worker is not parked on host a's slot: host b goes first
+    assert fetched["http://b.example/1"] < fetched["http://a.example/2"]
+    assert fetched["http://a.example/2"] - fetched["http://a.example/1"] >= 0.25
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+import pytest
+
+import db.connection as connection
+import db.fetch as fetch
+from db.fetch import fetch_articles_by_ids
+
+PUBLISHED = datetime(2026, 10, 1, 9, 30)
+
+
+@pytest.fixture
+def article(database, monkeypatch):
+    monkeypatch.setattr(fetch, "article_cache", fetch._ArticleCache())
+    with connection.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO news_articles (title, content, url, published_at) VALUES ('Headline', 'summary', %s, %s)
+            RETURNING article_id;
+        """, ("http://example.com/a", PUBLISHED))
+        article_id = cur.fetchone()[0]
+
+    def update(sql):
+        # A write from another process: this process' cache is not told about it
+        with connection.db_connection() as conn:
+            conn.cursor().execute(sql, (article_id,))
+    return article_id, update
+
+
+def test_body_written_elsewhere_is_seen(article):
+    article_id, update = article
+    assert fetch_articles_by_ids([article_id])[0][2] == "summary"
+    assert fetch.article_cache.get_many([article_id]) == {}  # body still pending: not cached
+
+    update("UPDATE news_articles SET content = 'full body', body_fetched_at = now() WHERE article_id = %s;")
+    assert fetch_articles_by_ids([article_id], [PUBLISHED])[0][2] == "full body"
+    assert fetch.article_cache.get_many([article_id])[article_id][2] == "full body"
+
+
+def test_final_rows_are_served_from_the_cache(article):
+    article_id, update = article
+    update("UPDATE news_articles SET url = NULL WHERE article_id = %s;")  # never body-fetched
+    row = fetch_articles_by_ids([article_id])[0]
+    assert row == (article_id, "Headline", "summary", None, PUBLISHED)
+
+    update("DELETE FROM news_articles WHERE article_id = %s;")
+    assert fetch_articles_by_ids([article_id]) == [row]
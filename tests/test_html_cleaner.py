@@ -0,0 +1,81 @@
+import random
+import warnings
+
+import pytest
+
+from agents.html_cleaner import clean_text
+
+bs4 = pytest.importorskip("bs4")
+
+# clean_text must match the BeautifulSoup version on all of these
+GOLDEN = [
+    "",
+    "   plain headline, no markup   ",
+    "Sensex up 500 pts; Nifty at record high",
+    "<p>Markets <b>rallied</b> today.</p>",
+    "<p>Para one</p>\n\n   <p>Para two</p>",
+    "<div> </div><div>\t</div>x",
+    "<pre>  keep   \n  spacing </pre>",
+    "<textarea>\n\n</textarea>|<span>\n\n</span>|",
+    "AT&T and M&M shares &amp; bonds",
+    "Tom &amp Jerry &notanentity; &copy 2024 &nbsp;&nbsp;end",
+    "&lt;b&gt;not a tag&lt;/b&gt; &quot;quoted&quot; &#39;single&#39;",
+    "&#8377; 1,200 crore &#x20B9; &#X20b9; &#128; &#150; &#129; &#0; &#1114112; &#xD800;",
+    "&#12abc; &#xzz; &# &#; & ; &&",
+    "<![CDATA[Reliance Q2 <results> & more]]>",
+    "<![CDATA[   ]]>after",
+    "<!-- comment --> visible <!-- another -->",
+    "<!DOCTYPE html><html><body>doc</body></html>",
+    "<?xml version='1.0'?><p>pi</p>",
+    "<script>var x = '<b>no</b>';</script>after script",
+    "<style>p { color: red; }</style>after style",
+    "<template><p>hidden</p>still hidden</template>shown",
+    "<ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby>",
+    "line<br>break<br/>again<br />done</br> tail",
+    "<br>a</br>  </br>b",
+    "<img src='x.jpg' alt='chart'/>Caption &raquo; more",
+    "<p>unclosed <b>bold <i>italic</p> after",
+    "</span>stray end tags</div>",
+    "a < b and c > d, 5<6",
+    "<p title='a > b'>attr with gt</p>",
+    "<a href=\"https://www.moneycontrol.com/news/x.html\"><img src=\"https://img.x/y.jpg\" align=\"left\" /></a>"
+    "Shares of Infosys rose 3% on Monday after the company reported&nbsp;a 12% jump in net profit.",
+    "<p>The Reserve Bank of India (RBI) on Friday kept the repo rate unchanged at 6.5&#37;.</p>"
+    "<p>&nbsp;</p><p>Governor said&hellip;</p>",
+    "Nifty50 &#8211; Top gainers: Tata Motors (+4.2%), Adani Ports (+3.1%)\r\n",
+    "<p>\n  Multi\n  line\n</p>",
+    "<table><tr><td>1</td><td>2</td></tr></table>",
+    "<p>caf&eacute; na&iuml;ve r&eacute;sum&eacute; &euro;5 &pound;3 &yen;</p>",
+    "trailing ampersand &",
+    "trailing tag <b",
+    "<script>unterminated script",
+    "<!-- unterminated comment",
+]
+
+FUZZ_FRAGMENTS = [
+    "<p>", "</p>", "<b>", "</b>", "<br>", "</br>", "<br/>", "<pre>", "</pre>", "<script>x<y</script>",
+    "<style>s</style>", "<template>", "</template>", "<rt>", "</rt>", "<!--c-->", "<![CDATA[d]]>",
+    "<!DOCTYPE x>", "&amp;", "&amp", "&foo;", "&#65;", "&#x41;", "&#150;", "&", "<", ">", " ", "  ",
+    "\n", "\t", "word", "Sensex", "&nbsp;", "<img src=a>", "<a href='b'>", "</a>", "</div>",
+]
+
+
+def _fuzz_corpus(n, seed=0):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(FUZZ_FRAGMENTS) for _ in range(rng.randint(1, 25))) for _ in range(n)]
+
+
+def _bs4_text(html_text):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # bs4 warns about XML-looking and URL-looking inputs
+        return bs4.BeautifulSoup(html_text, "html.parser").get_text().strip()
+
+
+@pytest.mark.parametrize("html_text", GOLDEN)
+def test_clean_text_matches_bs4_on_golden_corpus(html_text):
+    assert clean_text(html_text) == _bs4_text(html_text)
+
+
+def test_clean_text_matches_bs4_on_fuzzed_markup():
+    mismatches = [html_text for html_text in _fuzz_corpus(2000) if clean_text(html_text) != _bs4_text(html_text)]
+    assert mismatches == []
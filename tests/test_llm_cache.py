@@ -0,0 +1,78 @@
+import importlib
+import os
+
+import pytest
+from langchain_core.outputs import Generation
+
+import llm_cache
+from llm_cache import SQLiteLLMCache
+
+LLM = "gemini-2.5-flash temperature=0"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(llm_cache.time, "time", lambda: now[0])
+    return now
+
+
+def _answer(text):
+    return [Generation(text=text)]
+
+
+def test_database_is_created_on_first_use(tmp_path):
+    path = tmp_path / "cache" / "responses.sqlite"
+    cache = SQLiteLLMCache(str(path))
+    assert not path.exists()
+    assert cache.lookup("prompt", LLM) is None
+    assert path.exists()
+
+
+def test_hits_are_keyed_by_prompt_and_model(tmp_path):
+    cache = SQLiteLLMCache(str(tmp_path / "responses.sqlite"))
+    cache.update("prompt", LLM, _answer("Finance"))
+    assert cache.lookup("prompt", LLM) == _answer("Finance")
+    assert cache.lookup("prompt", "other-model") is None
+    assert cache.lookup("other prompt", LLM) is None
+
+    # Persisted: a new process sees it
+    assert SQLiteLLMCache(str(tmp_path / "responses.sqlite")).lookup("prompt", LLM) == _answer("Finance")
+    assert cache.stats == {"hits": 1, "misses": 2, "expired": 0, "evictions": 0}
+    assert cache.hit_rate() == pytest.approx(1 / 3)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = SQLiteLLMCache(str(tmp_path / "responses.sqlite"), ttl=60)
+    cache.update("prompt", LLM, _answer("Finance"))
+    clock[0] += 60
+    assert cache.lookup("prompt", LLM) == _answer("Finance")
+    clock[0] += 1
+    assert cache.lookup("prompt", LLM) is None
+    assert cache.stats["expired"] == 1
+
+    # Gone for good, not just hidden
+    clock[0] = 1000.0
+    assert cache.lookup("prompt", LLM) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = SQLiteLLMCache(str(tmp_path / "responses.sqlite"), max_entries=2)
+    for prompt in ("a", "b"):
+        cache.update(prompt, LLM, _answer(prompt))
+        clock[0] += 1
+    cache.lookup("a", LLM)  # "b" is now the least recently used
+    clock[0] += 1
+    cache.update("c", LLM, _answer("c"))
+
+    assert cache.lookup("b", LLM) is None
+    assert cache.lookup("a", LLM) == _answer("a") and cache.lookup("c", LLM) == _answer("c")
+    assert cache.stats["evictions"] == 1
+
+
+def test_importing_llm_node_creates_no_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import llm_node
+    importlib.reload(llm_node)  # builds the shared llm and its cache again, from here
+    assert isinstance(llm_node.llm_cache, SQLiteLLMCache)
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,86 @@
+from datetime import date, datetime
+
+import pytest
+
+import db.connection as connection
+from news_rating import apply_pending_feedback
+
+PUBLISHED = datetime(2026, 10, 1, 9, 30)
+
+
+def _ids(cur, sql, rows):
+    ids = []
+    for row in rows:
+        cur.execute(sql, row)
+        ids.append(cur.fetchone()[0])
+    return ids
+
+
+@pytest.fixture
+def prediction(database):
+    """
+    A prediction of source s1 citing article a1, whose story s2 syndicated
+    (a2, same cluster); s3 published an unrelated article. (s1, Finance)
+    already has a rating of 6.0 from 2 votes.
+    """
+    with connection.db_connection() as conn:
+        cur = conn.cursor()
+        sources = _ids(cur, "INSERT INTO news_sources (source_name) VALUES (%s) RETURNING source_id;",
+                       [("s1",), ("s2",), ("s3",)])
+        category_id, = _ids(cur, "INSERT INTO categories (category_name) VALUES (%s) RETURNING category_id;",
+                            [("Finance",)])
+        a1, a2, a3 = _ids(cur, """
+            INSERT INTO news_articles (source_id, title, url, published_at) VALUES (%s, %s, %s, %s)
+            RETURNING article_id;
+        """, [(sources[0], "story", "http://s1/a", PUBLISHED), (sources[1], "story", "http://s2/a", PUBLISHED),
+              (sources[2], "other", "http://s3/a", PUBLISHED)])
+        cur.execute("UPDATE news_articles SET cluster_id = %s WHERE article_id IN (%s, %s);", (a1, a1, a2))
+        cur.execute("UPDATE news_articles SET cluster_id = %s WHERE article_id = %s;", (a3, a3))
+        cur.execute("""
+            INSERT INTO news_ratings (source_id, category_id, rating, rating_count) VALUES (%s, %s, 6.0, 2);
+        """, (sources[0], category_id))
+        prediction_id, = _ids(cur, """
+            INSERT INTO predictions (source_id, category_id, stock_symbol, target_date) VALUES (%s, %s, 'INFY', %s)
+            RETURNING prediction_id;
+        """, [(sources[0], category_id, date(2026, 10, 2))])
+        cur.execute("INSERT INTO prediction_sources (prediction_id, source_id, article_url) VALUES (%s, %s, %s);",
+                    (prediction_id, sources[0], "http://s1/a"))
+    return prediction_id, sources, category_id
+
+
+def _add_feedback(prediction_id, outcome, stars):
+    with connection.db_connection() as conn:
+        conn.cursor().execute("INSERT INTO feedback (prediction_id, outcome, rating) VALUES (%s, %s, %s);",
+                              (prediction_id, outcome, stars))
+
+
+def _ratings(category_id):
+    with connection.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT s.source_name, r.rating, r.rating_count
+            FROM news_ratings r JOIN news_sources s ON s.source_id = r.source_id
+            WHERE r.category_id = %s ORDER BY 1;
+        """, (category_id,))
+        return cur.fetchall()
+
+
+def test_feedback_updates_running_mean_and_credits_the_cluster(prediction):
+    prediction_id, _, category_id = prediction
+    _add_feedback(prediction_id, "Correct", 4)   # (10 + 4 * 2) / 2 = 9
+    _add_feedback(prediction_id, "Wrong", None)  # 0
+
+    assert apply_pending_feedback() == (2, 2)
+    # s1: (6.0 * 2 + 9 + 0) / 4; s2 carried the same story and gets the same votes; s3 is untouched
+    assert _ratings(category_id) == [("s1", pytest.approx(5.25), 4), ("s2", pytest.approx(4.5), 2)]
+
+
+def test_feedback_is_applied_once(prediction):
+    prediction_id, _, category_id = prediction
+    _add_feedback(prediction_id, "Partial", None)
+    assert apply_pending_feedback() == (1, 2)
+    assert apply_pending_feedback() == (0, 0)
+
+    _add_feedback(prediction_id, "Correct", None)
+    assert apply_pending_feedback() == (1, 2)
+    assert _ratings(category_id) == [("s1", pytest.approx((12 + 5 + 10) / 4), 4), ("s2", pytest.approx(7.5), 2)]
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+
+import db.connection as connection
+from db.rating_cache import DEFAULT_RATING, RatingCache, notify_ratings_changed
+
+
+@pytest.fixture
+def ratings(database):
+    with connection.db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("INSERT INTO news_sources (source_name) VALUES ('livemint') RETURNING source_id;")
+        source_id = cur.fetchone()[0]
+        cur.execute("INSERT INTO categories (category_name) VALUES ('Finance') RETURNING category_id;")
+        category_id = cur.fetchone()[0]
+
+    def write(rating, notify=True):
+        with connection.db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                INSERT INTO news_ratings (source_id, category_id, rating) VALUES (%s, %s, %s)
+                ON CONFLICT (source_id, category_id) DO UPDATE SET rating = EXCLUDED.rating;
+            """, (source_id, category_id, rating))
+            if notify:
+                notify_ratings_changed(cur)
+
+    cache = RatingCache()
+    yield cache, (source_id, category_id), write
+    if cache._listener is not None:
+        cache._listener.close()
+
+
+def _eventually(check, timeout=2.0):
+    # NOTIFY reaches the listener's socket shortly after the commit
+    deadline = time.monotonic() + timeout
+    while not check() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return check()
+
+
+def test_ratings_are_served_from_memory_until_notified(ratings):
+    cache, pair, write = ratings
+    assert cache.get(*pair) == DEFAULT_RATING
+    write(8.0, notify=False)
+    assert cache.get(*pair) == DEFAULT_RATING and cache.reloads == 1
+
+    write(7.5)
+    assert _eventually(lambda: cache.get(*pair) == 7.5)
+    assert cache.reloads == 2
+    assert cache.get_many([pair, (pair[0], -1)]) == [7.5, DEFAULT_RATING]
+    assert cache.reloads == 2  # one reload per notification
+
+
+def test_lost_listener_reloads_and_listens_again(ratings):
+    cache, pair, write = ratings
+    cache.get(*pair)
+    cache._listener.close()
+    write(9.0, notify=False)  # written while nobody was listening
+    assert cache.get(*pair) == 9.0
+    assert not cache._listener.closed
+
+    write(3.0)
+    assert _eventually(lambda: cache.get(*pair) == 3.0)
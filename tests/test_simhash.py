@@ -0,0 +1,76 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from db.simhash import CLUSTER_WINDOW, MAX_DISTANCE, SimHashIndex, hamming, match_distance, simhash
+
+PUBLISHED = datetime(2026, 10, 1, 9, 30)
+STOCKS = [("Infosys", 120), ("HDFC Bank", 250), ("Reliance", 512), ("TCS", 480), ("Tata Motors", 600)]
+
+# Same template, different story: a false match would silently drop the article
+TEMPLATED = (
+    [f"Sensex rises {points} points as {stock} gains\n" for stock, points in STOCKS]
+    + [f"Sensex rises {points} points as {stock} gains\nThe BSE Sensex rose {points} points on Monday, "
+       f"led by gains in {stock} shares." for stock, points in STOCKS]
+    + [f"Rupee ends at 83.{i} against US dollar\n" for i in range(8)]
+)
+
+INFOSYS = ("Infosys shares rise 3% after Q2 profit beats estimates\nShares of Infosys rose 3% on Monday after "
+           "the IT major reported a 12% jump in net profit for the September quarter, beating analyst estimates.")
+RBI = ("RBI keeps repo rate unchanged at 6.5%\nThe Reserve Bank of India on Friday kept the repo rate unchanged "
+       "at 6.5% for the tenth consecutive meeting, the governor said.")
+SENSEX = ("Sensex rises 512 points as Reliance gains\nThe BSE Sensex rose 512 points on Tuesday, led by gains "
+          "in Reliance shares.")
+# The same wire copy as it shows up on other feeds
+REPOSTS = [
+    (INFOSYS, INFOSYS + " (PTI)"),
+    (INFOSYS, INFOSYS.replace("analyst", "analysts'").replace("beats", "beats Street")),
+    (INFOSYS, INFOSYS.replace(", beating analyst estimates.", "...")),
+    (RBI, RBI.replace("at 6.5% for", "at 6.5 per cent for")),
+    (SENSEX, SENSEX + " (Reuters)"),
+    (SENSEX, SENSEX.replace(",", "").rstrip(".")),
+    ("Sensex rises 512 points as Reliance gains\n", "Sensex Rises 512 Points As Reliance Gains.\n"),
+]
+
+
+def _clusters(texts, index=None):
+    index = index or SimHashIndex()
+    index._loaded_at = float("inf")  # nothing to load: no database
+    return index.assign(None, [(i, simhash(text), PUBLISHED, match_distance(text))
+                               for i, text in enumerate(texts)])
+
+
+def test_templated_headlines_stay_apart():
+    clusters = _clusters(TEMPLATED)
+    assert [cluster_id for cluster_id, _ in clusters.values()] == list(range(len(TEMPLATED)))
+
+
+@pytest.mark.parametrize("original, repost", REPOSTS)
+def test_reposts_join_the_first_copy(original, repost):
+    assert _clusters([original, repost])[1] == (0, PUBLISHED)
+
+
+def test_short_texts_only_match_identical_words():
+    assert match_distance("Rupee ends at 83.1 against US dollar") == 0
+    assert match_distance(INFOSYS) == MAX_DISTANCE
+
+
+def test_every_fingerprint_within_max_distance_is_found():
+    fingerprint = simhash(INFOSYS)
+    index = SimHashIndex()
+    index._loaded_at = float("inf")
+    index._add(fingerprint, (1, PUBLISHED))
+    for bits in range(0, 64, 4):
+        near = fingerprint ^ sum(1 << (bits + 16 * i) % 64 for i in range(MAX_DISTANCE))
+        assert hamming(fingerprint, near) == MAX_DISTANCE
+        assert index._find(near, PUBLISHED, MAX_DISTANCE) == (1, PUBLISHED)
+        assert index._find(near, PUBLISHED, 0) is None
+
+
+def test_clusters_stay_within_the_window():
+    late = PUBLISHED + CLUSTER_WINDOW + timedelta(hours=1)
+    index = SimHashIndex()
+    index._loaded_at = float("inf")
+    clusters = index.assign(None, [(1, simhash(SENSEX), PUBLISHED, MAX_DISTANCE),
+                                   (2, simhash(SENSEX), late, MAX_DISTANCE)])
+    assert clusters == {1: (1, PUBLISHED), 2: (2, late)}
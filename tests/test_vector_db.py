@@ -0,0 +1,64 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import db.vector_db as vector_db
+from db.fetch import Article
+from file_lock import FileLock
+
+DIM = 4
+PUBLISHED = datetime(2026, 10, 1, 9, 30)
+
+
+def _embed(texts):
+    # Article i sits at distance i from the origin, so a query for "0" ranks by id
+    return np.array([[float(t.split("\n")[0]), 0, 0, 0] for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    articles = {i: Article(i, str(i), "body", f"http://example.com/{i}", PUBLISHED) for i in range(1, 41)}
+    path = str(tmp_path)
+    monkeypatch.setattr(vector_db, "INDEX_PATH", path)
+    monkeypatch.setattr(vector_db, "INDEX_FILE", str(tmp_path / "vectors.faiss"))
+    monkeypatch.setattr(vector_db, "ROW_IDS_FILE", str(tmp_path / "row_ids.npy"))
+    monkeypatch.setattr(vector_db, "ROW_DATES_FILE", str(tmp_path / "row_dates.npy"))
+    monkeypatch.setattr(vector_db, "STATE_PATH", str(tmp_path / "index_state.json"))
+    monkeypatch.setattr(vector_db, "index_lock", FileLock(str(tmp_path / ".lock")))
+    monkeypatch.setattr(vector_db, "EMBED_BATCH", 10)
+    monkeypatch.setattr(vector_db, "fetch_articles_after",
+                        lambda after_id, limit: [a for i, a in sorted(articles.items()) if i > after_id][:limit])
+    monkeypatch.setattr(vector_db, "fetch_articles_by_ids",
+                        lambda ids, published_at=None: [articles[int(i)] for i in ids if int(i) in articles])
+    monkeypatch.setattr(vector_db.embedder, "embed_array", _embed)
+    monkeypatch.setattr(vector_db.embedder, "embed_query", lambda query: _embed([query])[0])
+    return articles
+
+
+def test_search_skips_deleted_rows(store):
+    vector_db.store_in_vector_db()
+    retriever = vector_db.VectorRetriever()
+    assert retriever.search("0", top_k=3) == [(1, PUBLISHED), (2, PUBLISHED), (3, PUBLISHED)]
+
+    vector_db.delete_from_vector_db([1, 2, 3, 5])
+    assert [a for a, _ in retriever.search("0", top_k=3)] == [4, 6, 7]
+
+
+def test_delete_during_store_is_not_lost(store, monkeypatch):
+    def slow_embed(texts):
+        time.sleep(0.05)
+        return _embed(texts)
+
+    monkeypatch.setattr(vector_db.embedder, "embed_array", slow_embed)
+    writer = threading.Thread(target=vector_db.store_in_vector_db)
+    writer.start()
+    time.sleep(0.08)  # first batch saved, the rest still embedding
+    vector_db.delete_from_vector_db([2, 25])
+    writer.join()
+
+    row_ids = np.load(vector_db.ROW_IDS_FILE)
+    assert 2 not in row_ids and 25 not in row_ids
+    assert [a for a, _ in vector_db.VectorRetriever().search("0", top_k=2)] == [1, 3]
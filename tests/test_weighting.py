@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from agents.weighting import RECENCY_LAMBDA, article_weights, vote_stocks
+
+NOW = datetime(2026, 10, 18, 12, 0)
+
+
+def test_weights_combine_rating_confidence_and_recency():
+    weights = article_weights(
+        [NOW, NOW - timedelta(hours=10), NOW],
+        [10.0, 10.0, 5.0],
+        [1.0, 1.0, 0.5],
+        now=NOW,
+    )
+    raw = np.array([1.0, np.exp(-RECENCY_LAMBDA * 10), 0.25])
+    assert weights == pytest.approx(raw / raw.sum())
+    assert weights.sum() == pytest.approx(1.0)
+
+
+def test_undated_and_future_articles():
+    weights = article_weights([None, NOW + timedelta(hours=5), NOW], [8.0, 8.0, 8.0], [1.0, 1.0, 1.0], now=NOW)
+    assert weights == pytest.approx([0.0, 0.5, 0.5])  # no date: no weight; future: no decay
+
+
+def test_all_zero_weights_stay_zero():
+    weights = article_weights([NOW, NOW], [0.0, 7.0], [0.9, 0.0], now=NOW)
+    assert weights.tolist() == [0.0, 0.0]
+
+
+def test_vote_sums_weights_per_company():
+    weights = np.array([0.5, 0.3, 0.2])
+    votes = vote_stocks([0, 0, 1, 2, 2], ["INFY", "TCS", "INFY", "TCS", "SBIN"], weights, top_k=2)
+    assert votes == [("INFY", pytest.approx(0.8)), ("TCS", pytest.approx(0.7))]
+    assert vote_stocks([], [], weights) == []
+
+
+def test_vote_with_integer_symbol_ids():
+    names = np.array(["INFY", "SBIN", "TCS"])
+    votes = vote_stocks([0, 1, 2], [2, 2, 0], np.array([0.5, 0.3, 0.2]), top_k=2, symbol_names=names)
+    assert votes == [("TCS", pytest.approx(0.8)), ("INFY", pytest.approx(0.2))]
+
+
+def test_ties_rank_alphabetically_including_at_the_cutoff():
+    symbols = ["WIPRO", "TCS", "SBIN", "RELIANCE", "ITC", "INFY", "HDFC", "BHARTI"]
+    weights = np.full(len(symbols), 1 / len(symbols))
+    top = vote_stocks(range(len(symbols)), symbols, weights, top_k=3)
+    assert [symbol for symbol, _ in top] == ["BHARTI", "HDFC", "INFY"]
+
+    # A clear winner first, then the tied ones in order
+    weights[0] *= 2
+    top = vote_stocks(range(len(symbols)), symbols, weights, top_k=3)
+    assert [symbol for symbol, _ in top] == ["WIPRO", "BHARTI", "HDFC"]